@@ -0,0 +1,130 @@
+import asyncio
+import random
+from collections import deque
+from contextlib import suppress
+from typing import List, Optional, Set
+
+
+class FakeReinhardt:
+    """Эмулятор станции Reinhardt за портом MOXA (ASCII-протокол).
+
+    На каждую команду, оканчивающуюся \\r, отвечает «<команда>= <число>\\r»
+    с задержкой latency ± jitter. Ответы уходят строго по порядку команд,
+    но задержки не складываются, поэтому конвейерный режим выигрывает так
+    же, как на реальной линии. loss — доля команд без ответа, split — доля
+    ответов, приходящих двумя кусками.
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.01,
+            jitter: float = 0.0,
+            loss: float = 0.0,
+            split: float = 0.0,
+            seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.split = split
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+        self.port: Optional[int] = None
+
+        # Счётчики
+        self.requests = 0
+        self.dropped = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Открытые соединения сервер не закрывает: обработчики
+            # останавливаются здесь, а не отменой при выходе из цикла
+            handlers = list(self._handlers)
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            with suppress(Exception):
+                await self._server.wait_closed()
+
+    def _reply(self, command: bytes) -> bytes:
+        return command + f"= {self._random.uniform(-40.0, 110.0):.3f}\r".encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        ready = asyncio.Event()
+        sender = asyncio.create_task(self._send(writer, pending, ready))
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    data = await reader.readuntil(b"\r")
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+                    # Отмена — остановка эмулятора: соединение закрывается штатно
+                    break
+                self.requests += 1
+                if self._random.random() < self.loss:
+                    self.dropped += 1
+                    continue
+                delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+                pending.append((loop.time() + delay, self._reply(data[:-1])))
+                ready.set()
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            sender.cancel()
+            with suppress(asyncio.CancelledError):
+                await sender
+            writer.close()
+            # При остановке цикла ожидание закрытия тоже может быть отменено
+            with suppress(Exception, asyncio.CancelledError):
+                await writer.wait_closed()
+
+    async def _send(self, writer, pending: deque, ready: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not pending:
+                ready.clear()
+                await ready.wait()
+                continue
+            due, reply = pending[0]
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.popleft()
+            if self._random.random() < self.split:
+                cut = self._random.randint(1, len(reply) - 1)
+                writer.write(reply[:cut])
+                await writer.drain()
+                await asyncio.sleep(0.001)
+                reply = reply[cut:]
+            writer.write(reply)
+            await writer.drain()
+
+
+class DeviceFarm:
+    """N эмуляторов на локальных портах."""
+
+    def __init__(self, count: int, **options):
+        self.devices: List[FakeReinhardt] = [
+            FakeReinhardt(seed=i, **options) for i in range(count)
+        ]
+
+    async def start(self) -> List[int]:
+        return [await device.start() for device in self.devices]
+
+    async def stop(self) -> None:
+        for device in self.devices:
+            await device.stop()
+
+    def stats(self) -> dict:
+        return {
+            "requests": sum(d.requests for d in self.devices),
+            "dropped": sum(d.dropped for d in self.devices),
+        }
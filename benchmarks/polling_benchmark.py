@@ -0,0 +1,213 @@
+"""Бенчмарк опроса на эмулированной ферме станций.
+
+Поднимает N эмуляторов Reinhardt, заполняет временную SQLite-конфигурацию,
+запускает PollingService/DevicePoller и печатает JSON-отчёт: циклы/с,
+p50/p99 задержки параметра, CPU и RSS. Пример:
+
+    python -m benchmarks.polling_benchmark --devices 200 --duration 30 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.device_farm import DeviceFarm
+from core.service.device_poller import DevicePoller
+from core.service.polling_service import PollingService
+from core.service.scheduler import PollScheduler
+from infrastructure.db.config_cache import ConfigCache, SyncConfigSource
+from infrastructure.db.executor import DBExecutor
+from infrastructure.db.models.models import Base, Device, DeviceType, Parameter, Threshold
+from infrastructure.db.postgres import PostgresDB
+
+COMMANDS = ["T", "H", "P", "WS", "WD", "CVF", "DP", "RN"]
+
+
+class TimedDevicePoller(DevicePoller):
+    """Опросчик, который меряет циклы и задержки параметров."""
+
+    cycle_times = []
+    parameter_times = []
+    errors = 0
+
+    async def poll_once(self, parameters=None):
+        start = time.perf_counter()
+        polled = await super().poll_once(parameters)
+        TimedDevicePoller.cycle_times.append(time.perf_counter() - start)
+        return polled
+
+    async def _poll_parameter(self, param):
+        start = time.perf_counter()
+        try:
+            return await super()._poll_parameter(param)
+        except Exception:
+            TimedDevicePoller.errors += 1
+            raise
+        finally:
+            TimedDevicePoller.parameter_times.append(time.perf_counter() - start)
+
+    async def _poll_pipelined(self, parameters) -> list:
+        start = time.perf_counter()
+        results = await super()._poll_pipelined(parameters)
+        # В конвейере задержка параметра — доля общего обмена
+        share = (time.perf_counter() - start) / max(len(parameters), 1)
+        TimedDevicePoller.parameter_times.extend([share] * len(parameters))
+        TimedDevicePoller.errors += sum(isinstance(r, Exception) for r in results)
+        return results
+
+
+class CountingSink:
+    def __init__(self):
+        self.readings = 0
+
+    def put(self, *row) -> None:
+        self.readings += 1
+
+
+def seed_config(db: PostgresDB, ports, parameters: int, interval: float, pipelined: bool) -> None:
+    Base.metadata.create_all(db.engine)
+    with db.session_scope() as session:
+        device_type = DeviceType(
+            name="Reinhardt (эмулятор)", is_pipelined=pipelined, command_gap=0.0, reply_echo=True)
+        session.add(device_type)
+        session.flush()
+        params = [
+            Parameter(name=f"Параметр {cmd}", command=cmd, metric="ед", device_type_id=device_type.id)
+            for cmd in COMMANDS[:parameters]
+        ]
+        session.add_all(params)
+        session.flush()
+        for i, port in enumerate(ports):
+            device = Device(
+                name=f"Reinhardt#{i + 1}", ip_address="127.0.0.1", port=port,
+                is_enable=True, poll_interval=interval, device_type_id=device_type.id,
+            )
+            session.add(device)
+            session.flush()
+            session.add_all(
+                Threshold(low_value=-30.0, high_value=100.0, is_enable=True,
+                          parameter_id=p.id, device_id=device.id)
+                for p in params
+            )
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    farm = DeviceFarm(
+        args.devices, latency=args.latency, jitter=args.jitter,
+        loss=args.loss, split=args.split,
+    )
+    ports = await farm.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PostgresDB(f"sqlite:///{os.path.join(tmp, 'config.db')}")
+        seed_config(db, ports, args.parameters, args.interval, args.pipelined)
+
+        config_cache = ConfigCache(SyncConfigSource(DBExecutor(db.session_scope)), full_refresh_interval=0)
+        sink = CountingSink()
+        service = PollingService(
+            config_cache,
+            measurement_writer=sink,
+            scheduler=PollScheduler(max_concurrency=args.concurrency),
+            poll_interval=args.interval,
+            adaptive=args.adaptive,
+        )
+        service.poller_class = TimedDevicePoller
+        service.CHECK_INTERVAL = 1.0
+
+        await service.start()
+        await asyncio.sleep(args.warmup)
+
+        # Замер только после разгона
+        TimedDevicePoller.cycle_times.clear()
+        TimedDevicePoller.parameter_times.clear()
+        TimedDevicePoller.errors = 0
+        readings_before = sink.readings
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        cycles = list(TimedDevicePoller.cycle_times)
+        latencies = list(TimedDevicePoller.parameter_times)
+        readings = sink.readings - readings_before
+        errors = TimedDevicePoller.errors
+
+        await service.stop()
+        db.engine.dispose()
+    await farm.stop()
+
+    return {
+        "benchmark": "polling",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "cycles": len(cycles),
+        "cycles_per_s": len(cycles) / wall,
+        "readings_per_s": readings / wall,
+        "errors": errors,
+        "cycle_time_p50_ms": percentile(cycles, 0.50) * 1e3,
+        "cycle_time_p99_ms": percentile(cycles, 0.99) * 1e3,
+        "param_latency_p50_ms": percentile(latencies, 0.50) * 1e3,
+        "param_latency_p99_ms": percentile(latencies, 0.99) * 1e3,
+        "cpu_s": cpu,
+        "cpu_utilization": cpu / wall,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "farm": farm.stats(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк опроса на эмулированной ферме станций")
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--parameters", type=int, default=6, choices=range(1, len(COMMANDS) + 1))
+    parser.add_argument("--interval", type=float, default=1.0, help="период опроса, с")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=3.0, help="разгон перед замером, с")
+    parser.add_argument("--latency", type=float, default=0.01, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.002, help="разброс задержки, с")
+    parser.add_argument("--loss", type=float, default=0.0, help="доля команд без ответа")
+    parser.add_argument("--split", type=float, default=0.1, help="доля ответов двумя кусками")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--pipelined", action="store_true", help="конвейерный режим типа устройства")
+    parser.add_argument("--adaptive", action="store_true", help="адаптивный период (эмулятор шлёт случайные значения)")
+    parser.add_argument("--output", help="файл для JSON-отчёта (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,73 @@ class Settings(BaseSettings):
     # Параметры пула
     DB_POOL_SIZE: int = Field(5, env="DB_POOL_SIZE")
     DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    # Асинхронный драйвер (asyncpg); иначе — синхронные репозитории в пуле потоков
+    DB_ASYNC: bool = Field(False, env="DB_ASYNC")
+    DB_EXECUTOR_WORKERS: int = Field(4, env="DB_EXECUTOR_WORKERS")
+    # Размер пула и число потоков DBExecutor — по числу опрашиваемых устройств
+    # (DB_POOL_SIZE тогда служит нижней границей)
+    DB_POOL_AUTO: bool = Field(True, env="DB_POOL_AUTO")
 
     LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
     LOG_FILE: str = Field("reinhardt_monitor.log", env="LOG_FILE")
+    # Формат файла журнала: JSON-строки (иначе — текст как в консоли)
+    LOG_JSON: bool = Field(True, env="LOG_JSON")
+    # Ротация: по времени, если задан LOG_ROTATE_WHEN ("midnight", "H", ...), иначе по размеру
+    LOG_ROTATE_BYTES: int = Field(50 * 1024 * 1024, env="LOG_ROTATE_BYTES")
+    LOG_ROTATE_WHEN: str = Field("", env="LOG_ROTATE_WHEN")
+    LOG_BACKUP_COUNT: int = Field(10, env="LOG_BACKUP_COUNT")
+    # Прореживание записей о показаниях: каждая N-я и не чаще раза в S секунд
+    # на пару (устройство, параметр); смены статуса пишутся всегда
+    LOG_READING_EVERY: int = Field(1, env="LOG_READING_EVERY")
+    LOG_READING_MIN_INTERVAL: float = Field(0.0, env="LOG_READING_MIN_INTERVAL")
+
+    # Планировщик опроса
+    POLL_INTERVAL: float = Field(5.0, env="POLL_INTERVAL")
+    POLL_MAX_CONCURRENCY: int = Field(100, env="POLL_MAX_CONCURRENCY")
+    # Подстройка периода под динамику значений (в пределах min/max_poll_interval
+    # устройства и параметров; без них — от 1/4 до 4 базовых периодов)
+    POLL_ADAPTIVE: bool = Field(True, env="POLL_ADAPTIVE")
+    # Число процессов опроса (>1 — режим супервизора с шардированием устройств)
+    POLL_SHARDS: int = Field(1, env="POLL_SHARDS")
+    # Одновременных проб подключения при проверке связи (ограничивает число сокетов)
+    CHECK_MAX_CONCURRENCY: int = Field(256, env="CHECK_MAX_CONCURRENCY")
+
+    # Запись показаний (write-behind)
+    MEASUREMENT_BATCH_SIZE: int = Field(5000, env="MEASUREMENT_BATCH_SIZE")
+    MEASUREMENT_FLUSH_INTERVAL: float = Field(1.0, env="MEASUREMENT_FLUSH_INTERVAL")
+    MEASUREMENT_MAX_QUEUE: int = Field(100_000, env="MEASUREMENT_MAX_QUEUE")
+    MEASUREMENT_SPILL_FILE: str = Field("measurements.spill.csv", env="MEASUREMENT_SPILL_FILE")
+    # Сжатие рядов: предел «тишины» для параметров без своего max_silence, с
+    MEASUREMENT_MAX_SILENCE: float = Field(300.0, env="MEASUREMENT_MAX_SILENCE")
+
+    # Агрегаты min/max/avg за минуту, час и сутки (measurement_1m/1h/1d)
+    ROLLUP_ENABLED: bool = Field(True, env="ROLLUP_ENABLED")
+    ROLLUP_FLUSH_INTERVAL: float = Field(10.0, env="ROLLUP_FLUSH_INTERVAL")
+    # Ожидание опоздавших показаний после конца интервала, с
+    ROLLUP_GRACE: float = Field(5.0, env="ROLLUP_GRACE")
+    # Глубина восстановления агрегатов из сырых показаний при запуске, сут
+    ROLLUP_BACKFILL_DAYS: float = Field(31.0, env="ROLLUP_BACKFILL_DAYS")
+
+    # Метрики Prometheus: HTTP /metrics (0 — выключено; шард N — порт + 1 + N)
+    # и/или файл для textfile-сборщика node_exporter (пусто — выключено)
+    METRICS_HOST: str = Field("127.0.0.1", env="METRICS_HOST")
+    METRICS_PORT: int = Field(9108, env="METRICS_PORT")
+    METRICS_TEXTFILE: str = Field("", env="METRICS_TEXTFILE")
+
+    # Сторож цикла событий: порог остановки, после которого снимаются стеки, с
+    LOOP_STALL_THRESHOLD: float = Field(0.25, env="LOOP_STALL_THRESHOLD")
+    # Профилирование по SIGUSR1: "sample" (выборка стеков) или "cprofile"
+    PROFILE_MODE: str = Field("sample", env="PROFILE_MODE")
+    PROFILE_DIR: str = Field("profiles", env="PROFILE_DIR")
+    # Цикл событий: "asyncio", "uvloop" или "auto" (uvloop, если установлен)
+    EVENT_LOOP: str = Field("asyncio", env="EVENT_LOOP")
+
+    # Частота обновления окна живыми показаниями, кадров/с
+    UI_MAX_FPS: float = Field(10.0, env="UI_MAX_FPS")
+
+    # Журнал событий: ёмкость окна текущих событий и каталог архива на диске
+    EVENT_LOG_CAPACITY: int = Field(10_000, env="EVENT_LOG_CAPACITY")
+    EVENT_STORE_DIR: str = Field("events", env="EVENT_STORE_DIR")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,120 @@
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Автомат отключения для недоступного устройства.
+
+    CLOSED — обычная работа; после failure_threshold неудач подряд —
+    OPEN: обращения не делаются, а задержка до следующей пробы растёт
+    экспоненциально от base_delay до max_delay. По истечении задержки
+    allow() пропускает ровно одну пробу (HALF_OPEN): успех закрывает
+    автомат, неудача снова открывает его с удвоенной задержкой.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 3,
+            base_delay: float = 5.0,
+            max_delay: float = 300.0,
+            multiplier: float = 2.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.state = CLOSED
+        self.failures = 0
+        self.delay = base_delay
+        self._retry_at = 0.0
+
+        # Счётчики
+        self.opened = 0
+        self.probes = 0
+
+    def allow(self) -> bool:
+        """Можно ли обращаться к устройству сейчас."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self._retry_at:
+            self.state = HALF_OPEN
+            self.probes += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.delay = self.base_delay
+
+    def record_failure(self) -> float:
+        """Учитывает неудачу; возвращает задержку до следующей попытки, с."""
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != CLOSED:
+                self.delay = min(self.max_delay, self.delay * self.multiplier)
+            else:
+                self.opened += 1
+            self.state = OPEN
+            self._retry_at = time.monotonic() + self.delay
+        return self.delay
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CLOSED
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "delay": self.delay,
+            "opened": self.opened,
+            "probes": self.probes,
+        }
+
+
+class AdaptiveInterval:
+    """Период опроса группы параметров, подстраивающийся под данные.
+
+    urgency() цикла (0 — значения стоят на месте далеко от порогов,
+    1 — быстрое изменение, близость к порогу или тревога) сдвигает
+    период: при высокой срочности он делится пополам до min_interval,
+    при низкой — плавно растёт до max_interval.
+    """
+
+    SPEEDUP = 0.5
+    SLOWDOWN = 1.25
+    # Границы срочности: выше HIGH — ускоряемся, ниже LOW — замедляемся
+    HIGH = 0.5
+    LOW = 0.1
+
+    def __init__(self, base: float, min_interval: Optional[float] = None, max_interval: Optional[float] = None):
+        self.base = base
+        self.min_interval = min_interval or base
+        self.max_interval = max(max_interval or base, self.min_interval)
+        self.interval = min(max(base, self.min_interval), self.max_interval)
+
+    def update(self, urgency: float) -> float:
+        if urgency >= self.HIGH:
+            self.interval = max(self.min_interval, self.interval * self.SPEEDUP)
+        elif urgency <= self.LOW:
+            self.interval = min(self.max_interval, self.interval * self.SLOWDOWN)
+        return self.interval
+
+
+def urgency(change: float, proximity: float, alarm: bool,
+            fast_change: float = 0.05, near: float = 0.1) -> float:
+    """Срочность показания в [0, 1].
+
+    change    — изменение за цикл в долях диапазона порога
+    proximity — расстояние до ближайшей границы в долях диапазона
+    """
+    if alarm:
+        return 1.0
+    by_change = min(1.0, change / fast_change) if fast_change > 0 else 0.0
+    by_proximity = 1.0 - min(1.0, proximity / near) if near > 0 else 0.0
+    return max(by_change, by_proximity)
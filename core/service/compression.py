@@ -0,0 +1,145 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Настройки сжатия берутся из строки Parameter:
+#   compression       — "deadband" | "swinging_door" (NULL — без сжатия)
+#   deadband          — допуск: абсолютный или в % от последнего сохранённого значения
+#   deadband_percent  — допуск задан в процентах
+#   max_silence       — не дольше этого, с, без сохранённой точки
+
+DEADBAND = "deadband"
+SWINGING_DOOR = "swinging_door"
+
+Row = Tuple[int, int, float, float, str]
+
+
+class _Series:
+    __slots__ = ("archived", "last", "slope_low", "slope_high", "last_forwarded")
+
+    def __init__(self):
+        self.archived: Optional[Row] = None  # последняя переданная точка
+        self.last: Optional[Row] = None  # последняя принятая, ещё не переданная
+        self.slope_low = -math.inf
+        self.slope_high = math.inf
+        self.last_forwarded = 0.0
+
+
+class Compressor:
+    """Передача только значимых изменений между опросчиком и приёмниками.
+
+    deadband       — точка передаётся, если отличается от последней
+                     переданной больше чем на допуск;
+    swinging_door  — точки, лежащие в коридоре ±допуск/2 вокруг прямой от
+                     последней переданной точки, отбрасываются; когда
+                     коридор схлопывается, передаётся предыдущая точка.
+                     Линейная интерполяция между переданными точками
+                     отличается от исходного ряда не больше чем на допуск.
+    Смена статуса и max_silence без передачи всегда дают точку.
+    """
+
+    def __init__(self, default_max_silence: float = 300.0):
+        self.default_max_silence = default_max_silence
+        self._series: Dict[Tuple[int, int], _Series] = {}
+        self.received = 0
+        self.forwarded = 0
+
+    def offer(self, device_id: int, param, timestamp: float, value: float, status: str) -> List[Row]:
+        """Принимает показание; возвращает строки, которые надо передать дальше."""
+        self.received += 1
+        row = (device_id, param.id, timestamp, value, status)
+        mode = getattr(param, "compression", None)
+        tolerance = getattr(param, "deadband", None)
+        if not mode or tolerance is None:
+            self.forwarded += 1
+            return [row]
+
+        series = self._series.get((device_id, param.id))
+        if series is None:
+            series = self._series[(device_id, param.id)] = _Series()
+
+        archived = series.archived
+        max_silence = getattr(param, "max_silence", None) or self.default_max_silence
+        if (
+                archived is None
+                or status != archived[4]
+                or timestamp - series.last_forwarded >= max_silence
+        ):
+            out = []
+            # Перед вынужденной точкой отдаём отложенную, чтобы не потерять излом
+            if series.last is not None and mode == SWINGING_DOOR:
+                out.append(series.last)
+            out.append(row)
+            self._archive(series, row)
+            return self._forward(out)
+
+        if getattr(param, "deadband_percent", False):
+            tolerance = abs(archived[3]) * tolerance / 100.0
+
+        if mode == DEADBAND:
+            if abs(value - archived[3]) > tolerance:
+                self._archive(series, row)
+                return self._forward([row])
+            return []
+
+        # Вращающаяся дверь
+        dt = timestamp - archived[2]
+        if dt <= 0:
+            series.last = row
+            return []
+        # Коридор вдвое уже допуска: прямая между сохранёнными (реальными)
+        # точками тогда отклоняется от отброшенных не больше чем на допуск
+        half = tolerance / 2
+        series.slope_high = min(series.slope_high, (value + half - archived[3]) / dt)
+        series.slope_low = max(series.slope_low, (value - half - archived[3]) / dt)
+        if series.slope_low <= series.slope_high:
+            series.last = row
+            return []
+
+        # Коридор схлопнулся: передаём предыдущую точку и открываем новую дверь
+        pivot = series.last
+        self._archive(series, pivot)
+        dt = timestamp - pivot[2]
+        if dt > 0:
+            series.slope_high = (value + half - pivot[3]) / dt
+            series.slope_low = (value - half - pivot[3]) / dt
+        series.last = row
+        return self._forward([pivot])
+
+    def flush(self) -> List[Row]:
+        """Отложенные точки всех рядов (при остановке опроса)."""
+        out = []
+        for series in self._series.values():
+            if series.last is not None:
+                out.append(series.last)
+                self._archive(series, series.last)
+        return self._forward(out)
+
+    def forget(self, device_id: int, parameter_ids=None) -> List[Row]:
+        """Снимает ряды устройства (или только параметров parameter_ids),
+        отдавая отложенные точки."""
+        out = []
+        for key in [k for k in self._series
+                    if k[0] == device_id and (parameter_ids is None or k[1] in parameter_ids)]:
+            series = self._series.pop(key)
+            if series.last is not None:
+                out.append(series.last)
+        return self._forward(out)
+
+    @staticmethod
+    def _archive(series: _Series, row: Row) -> None:
+        series.archived = row
+        series.last = None
+        series.slope_low = -math.inf
+        series.slope_high = math.inf
+        series.last_forwarded = row[2]
+
+    def _forward(self, rows: List[Row]) -> List[Row]:
+        self.forwarded += len(rows)
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "ratio": self.received / self.forwarded if self.forwarded else 0.0,
+        }
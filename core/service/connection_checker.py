@@ -1,9 +1,23 @@
 import asyncio
+import logging
 import socket
+import time
+from typing import Dict, Iterable, Optional, Tuple
 
+logger = logging.getLogger("connection_checker")
+
+Endpoint = Tuple[str, int]
+
+
+async def check_device_connection(device, timeout: float = 2.0, connections=None) -> bool:
+    """Проверяет подключение к устройству по TCP.
+
+    Если передан ConnectionManager, проверка идёт по общему долгоживущему
+    сокету, без отдельного подключения.
+    """
+    if connections is not None:
+        return await connections.for_device(device).check()
 
-async def check_device_connection(device, timeout: float = 2.0) -> bool:
-    """Проверяет подключение к устройству по TCP"""
     try:
         # Создаем соединение с таймаутом
         reader, writer = await asyncio.wait_for(
@@ -15,6 +29,156 @@ async def check_device_connection(device, timeout: float = 2.0) -> bool:
         return True
     except (socket.gaierror, ConnectionRefusedError, asyncio.TimeoutError, OSError):
         return False
-    except Exception as e:
+    except Exception:
         # Ловим все остальные исключения
         return False
+
+
+class RttEstimator:
+    """Сглаженное время подключения к адресу и срок ожидания по нему
+    (как RTO в TCP: srtt + 4·rttvar в пределах [min, max])."""
+
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+
+    def observe(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, min_timeout: float, max_timeout: float) -> float:
+        if self.srtt is None:
+            return max_timeout
+        return min(max(self.srtt + 4 * self.rttvar, min_timeout), max_timeout)
+
+
+class ReachabilityScanner:
+    """Проверка доступности всех устройств одним вызовом.
+
+    Устройства на одном адресе (ip, port) проверяются одной пробой;
+    одновременно идёт не больше max_concurrency подключений, поэтому
+    число открываемых сокетов ограничено даже после сбоя сети на всём
+    объекте. Срок ожидания подключения у каждого адреса свой — по
+    истории времени подключения: устройство, которое обычно отвечает за
+    миллисекунды, не держит пробу две секунды.
+
+    С ConnectionManager проба — это подключение общего долгоживущего
+    сокета (опросчик затем работает по нему) и подтверждение связи по
+    нему (DeviceConnection.confirm); адрес, по которому недавно приходили
+    ответы, считается доступным без пробы, адрес в паузе после неудачи — нет.
+    """
+
+    def __init__(
+            self,
+            connections=None,
+            max_concurrency: int = 256,
+            min_timeout: float = 0.5,
+            max_timeout: float = 2.0,
+    ):
+        self.connections = connections
+        self.max_concurrency = max_concurrency
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._rtt: Dict[Endpoint, RttEstimator] = {}
+
+        # Счётчики
+        self.scans = 0
+        self.probes = 0
+        self.timeouts = 0
+        self.last_duration = 0.0
+
+    def timeout_for(self, endpoint: Endpoint) -> float:
+        estimator = self._rtt.get(endpoint)
+        if estimator is None:
+            return self.max_timeout
+        return estimator.timeout(self.min_timeout, self.max_timeout)
+
+    def forget(self, endpoint: Endpoint) -> None:
+        self._rtt.pop(endpoint, None)
+
+    async def scan(self, devices: Iterable) -> Dict[int, bool]:
+        """Доступность устройств: {device_id: True/False}."""
+        started = time.perf_counter()
+        by_endpoint: Dict[Endpoint, list] = {}
+        for device in devices:
+            by_endpoint.setdefault((device.ip_address, device.port), []).append(device.id)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        endpoints = list(by_endpoint)
+        results = await asyncio.gather(
+            *(self._probe(endpoint, semaphore) for endpoint in endpoints),
+            return_exceptions=True,
+        )
+
+        status = {}
+        for endpoint, result in zip(endpoints, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Ошибка проверки {endpoint[0]}:{endpoint[1]}: {result}")
+                result = False
+            for device_id in by_endpoint[endpoint]:
+                status[device_id] = result
+
+        self.scans += 1
+        self.last_duration = time.perf_counter() - started
+        return status
+
+    async def _probe(self, endpoint: Endpoint, semaphore: asyncio.Semaphore) -> bool:
+        conn = self.connections.get(*endpoint) if self.connections is not None else None
+        connecting = True
+        if conn is not None:
+            if conn.in_backoff:
+                return False
+            if conn.is_active:
+                # Опрос недавно получал ответы — связь есть без пробы
+                return True
+            connecting = not conn.is_connected
+
+        timeout = self.timeout_for(endpoint)
+        async with semaphore:
+            self.probes += 1
+            started = time.perf_counter()
+            if conn is not None:
+                connected = await conn.ensure_connected(timeout)
+            else:
+                connected = await self._connect(endpoint, timeout)
+            elapsed = time.perf_counter() - started
+            # Проба по открытому сокету в срок подключения не входит
+            ok = connected and (conn is None or await conn.confirm(connecting, timeout))
+
+        if connected:
+            # Срок ожидания — по времени подключения (если оно было)
+            if connecting:
+                estimator = self._rtt.get(endpoint)
+                if estimator is None:
+                    estimator = self._rtt[endpoint] = RttEstimator()
+                estimator.observe(elapsed)
+        elif elapsed >= timeout * 0.9:
+            self.timeouts += 1
+        return ok
+
+    @staticmethod
+    async def _connect(endpoint: Endpoint, timeout: float) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(*endpoint), timeout=timeout)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "scans": self.scans,
+            "probes": self.probes,
+            "timeouts": self.timeouts,
+            "endpoints": len(self._rtt),
+            "last_duration": self.last_duration,
+        }
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from core.service.link_protocol import LinkProtocol
+
+logger = logging.getLogger("connection_manager")
+
+
+def _ignore_frame(_, frame) -> None:
+    """Ответ на пробу связи: важно только, что кадр пришёл."""
+
+
+class LinkQueue:
+    """Очередь доступа к одной физической линии (порт MOXA).
+
+    Линией владеет один обмен за раз. Ожидающие получают её по кругу по
+    владельцам (устройствам): устройство, только что отработавшее свой
+    цикл, встаёт в конец, поэтому одно устройство с несколькими группами
+    параметров не занимает линию подряд, а команды каждого цикла идут
+    без перемежения с чужими — на линии меньше смен адресата.
+    """
+
+    def __init__(self):
+        self._busy = False
+        self._owner: Optional[Hashable] = None
+        self._waiting: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._released_at = 0.0
+
+        # Счётчики
+        self.turns = 0
+        self.waits = 0
+        self.handoffs = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    @asynccontextmanager
+    async def turn(self, owner: Hashable, gap: float = 0.0):
+        """Исключительный доступ к линии; gap — пауза после чужого обмена, с."""
+        if self._busy or self._waiting:
+            future = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(owner, deque()).append(future)
+            self.waits += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Очередь уже передана нам — отдаём дальше
+                    self._release()
+                else:
+                    self._discard(owner, future)
+                raise
+        else:
+            self._busy = True
+
+        if self._owner != owner:
+            self.handoffs += 1
+            # Смена адресата на линии: выдерживаем паузу после чужого обмена
+            wait = self._released_at + gap - time.monotonic()
+            if self._owner is not None and wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    self._release()
+                    raise
+        self._owner = owner
+        self.turns += 1
+        try:
+            yield
+        finally:
+            self._released_at = time.monotonic()
+            self._release()
+
+    def _discard(self, owner: Hashable, future: asyncio.Future) -> None:
+        queue = self._waiting.get(owner)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiting[owner]
+
+    def _release(self) -> None:
+        while self._waiting:
+            owner, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(owner)
+            else:
+                del self._waiting[owner]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+
+class DeviceConnection:
+    """Долгоживущее TCP-соединение с одним портом MOXA (ip, port)."""
+
+    # Ожидание ответа на пробу связи, с
+    PROBE_TIMEOUT = 2.0
+
+    def __init__(
+            self,
+            ip_address: str,
+            port: int,
+            connect_timeout: float = 2.0,
+            backoff_initial: float = 1.0,
+            backoff_max: float = 60.0,
+            max_idle: float = 30.0,
+    ):
+        self.ip_address = ip_address
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        # Ответы не старше max_idle секунд подтверждают связь без пробы
+        self.max_idle = max_idle
+        # Команда для пробы связи (ставит опросчик устройства на линии);
+        # None — проверять нечем, сокет переоткрывается
+        self.probe: Optional[bytes] = None
+
+        # Приём кадров прямо в буфер протокола (см. LinkProtocol)
+        self.protocol: Optional[LinkProtocol] = None
+        # Сериализует обмен командами по линии: по циклу устройства за раз
+        self.link = LinkQueue()
+        self._connect_lock = asyncio.Lock()
+
+        # Счётчики
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.frames = 0  # кадров прежних соединений
+        self.garbled = 0
+        self.connected_at: Optional[float] = None
+
+        self._backoff = backoff_initial
+        self._next_attempt = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        return self.protocol is not None and self.protocol.is_open
+
+    def turn(self, owner: Hashable, gap: float = 0.0):
+        """Доступ к линии на один обмен (async with conn.turn(device_id): ...)."""
+        return self.link.turn(owner, gap)
+
+    @property
+    def is_active(self) -> bool:
+        """Соединение открыто и ответы с линии приходили не позже max_idle секунд назад."""
+        return self.is_connected and self.protocol.idle < self.max_idle
+
+    @property
+    def in_backoff(self) -> bool:
+        """Пауза после неудачного подключения: ensure_connected() сразу вернёт False."""
+        return not self.is_connected and time.monotonic() < self._next_attempt
+
+    @property
+    def age(self) -> float:
+        """Сколько секунд живёт текущее соединение."""
+        if not self.is_connected or self.connected_at is None:
+            return 0.0
+        return time.monotonic() - self.connected_at
+
+    async def ensure_connected(self, timeout: Optional[float] = None) -> bool:
+        """Открывает соединение, если его нет (с учётом backoff);
+        timeout — срок подключения вместо connect_timeout."""
+        if self.is_connected:
+            return True
+
+        async with self._connect_lock:
+            if self.is_connected:
+                return True
+
+            now = time.monotonic()
+            if now < self._next_attempt:
+                return False
+
+            await self._close_transport()
+            try:
+                _, self.protocol = await asyncio.wait_for(
+                    asyncio.get_running_loop().create_connection(LinkProtocol, self.ip_address, self.port),
+                    timeout=timeout or self.connect_timeout
+                )
+            except (asyncio.TimeoutError, OSError) as e:
+                self.failures += 1
+                self._next_attempt = now + self._backoff
+                logger.debug(
+                    f"Нет соединения с {self.ip_address}:{self.port} ({e}), "
+                    f"повтор через {self._backoff:.1f} с"
+                )
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+                return False
+
+            if self.connects:
+                self.reconnects += 1
+            self.connects += 1
+            self.connected_at = time.monotonic()
+            self._backoff = self.backoff_initial
+            self._next_attempt = 0.0
+            return True
+
+    async def check(self, timeout: Optional[float] = None) -> bool:
+        """Проверка доступности по тому же сокету, без отдельного подключения.
+
+        Открытый сокет сам по себе ничего не доказывает: зависшая станция
+        держит TCP, но не отвечает. Связь подтверждают ответы за последние
+        max_idle секунд, иначе — проба (см. confirm()).
+        """
+        fresh = not self.is_connected
+        if not await self.ensure_connected(timeout):
+            return False
+        return await self.confirm(fresh, timeout)
+
+    async def confirm(self, fresh: bool = False, timeout: Optional[float] = None) -> bool:
+        """Подтверждение связи по уже открытому сокету: ответы за последние
+        max_idle секунд или проба — команда probe и ожидание любого ответа.
+        Без команды пробы сокет переоткрывается (полуоткрытое соединение не
+        переживёт подключения заново); fresh — сокет только что открыт, и
+        этого достаточно.
+        """
+        if self.is_active:
+            return True
+
+        # Линию берём как обычный обмен, чтобы не вклиниться в опрос
+        async with self.turn("probe"):
+            if self.probe is None:
+                if fresh:
+                    return True
+                await self.invalidate()
+                return await self.ensure_connected(timeout)
+            if not self.is_connected:
+                return False
+            protocol = self.protocol
+            try:
+                protocol.write(self.probe)
+                await protocol.drain()
+                await protocol.read_frame(_ignore_frame, None, self.PROBE_TIMEOUT)
+                return True
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
+                # Опоздавший ответ сбил бы следующий обмен — сокет сбрасываем
+                logger.debug(f"Нет ответа на пробу {self.ip_address}:{self.port} ({e!r})")
+                await self.invalidate()
+                return False
+
+    async def invalidate(self) -> None:
+        """Закрывает сокет после ошибки обмена; следующий вызов переподключится."""
+        await self._close_transport()
+
+    async def close(self) -> None:
+        await self._close_transport()
+        self.connected_at = None
+
+    async def _close_transport(self) -> None:
+        protocol, self.protocol = self.protocol, None
+        if protocol is not None:
+            self.frames += protocol.frames
+            self.garbled += protocol.garbled
+            with suppress(Exception):
+                await protocol.close()
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.is_connected,
+            "age": self.age,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "turns": self.link.turns,
+            "handoffs": self.link.handoffs,
+            "waiting": self.link.waiting,
+            "frames": self.frames + (self.protocol.frames if self.protocol else 0),
+            "garbled": self.garbled + (self.protocol.garbled if self.protocol else 0),
+        }
+
+
+class ConnectionManager:
+    """Общий пул соединений: один сокет на (ip, port)."""
+
+    def __init__(
+            self,
+            connect_timeout: float = 2.0,
+            backoff_initial: float = 1.0,
+            backoff_max: float = 60.0,
+            max_idle: float = 30.0,
+    ):
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_idle = max_idle
+        self._connections: Dict[Tuple[str, int], DeviceConnection] = {}
+
+    def get(self, ip_address: str, port: int) -> DeviceConnection:
+        key = (ip_address, port)
+        conn = self._connections.get(key)
+        if conn is None:
+            conn = DeviceConnection(
+                ip_address, port,
+                connect_timeout=self.connect_timeout,
+                backoff_initial=self.backoff_initial,
+                backoff_max=self.backoff_max,
+                max_idle=self.max_idle,
+            )
+            self._connections[key] = conn
+        return conn
+
+    def for_device(self, device) -> DeviceConnection:
+        return self.get(device.ip_address, device.port)
+
+    async def release(self, ip_address: str, port: int) -> None:
+        """Закрывает и забывает соединение (устройство выключено)."""
+        conn = self._connections.pop((ip_address, port), None)
+        if conn is not None:
+            await conn.close()
+
+    async def close_all(self) -> None:
+        for conn in list(self._connections.values()):
+            await conn.close()
+        self._connections.clear()
+
+    def links_by_converter(self) -> Dict[str, List[DeviceConnection]]:
+        """Линии, сгруппированные по конвертеру (IP-адресу MOXA)."""
+        converters: Dict[str, List[DeviceConnection]] = {}
+        for (ip_address, _), conn in self._connections.items():
+            converters.setdefault(ip_address, []).append(conn)
+        return converters
+
+    def stats(self) -> Dict[Tuple[str, int], dict]:
+        return {key: conn.stats() for key, conn in self._connections.items()}
@@ -1,131 +1,644 @@
 import asyncio
 import logging
-import re
-from contextlib import suppress
+import math
+import time
+from collections import defaultdict
+from functools import partial
 
-from infrastructure.db.repositories.repositories import ParameterRepository, ThresholdRepository
+from core.service.adaptive import AdaptiveInterval, CircuitBreaker, urgency
+from core.service.compression import Compressor
+from core.service.connection_manager import ConnectionManager
+from core.service.link_protocol import FrameError
+from core.service.parsers import ParserRegistry, StructParser
+from core.service.reading_bus import EVENTS, Event, ReadingBus
+from core.service.scheduler import PollScheduler
+from core.service.threshold_engine import ALARM, STATUS_NAMES, ThresholdEngine
+from infrastructure.metrics import REGISTRY
 
 logger = logging.getLogger("device_poller")
 
+DEFAULT_COMMAND_GAP = 0.05
+RESPONSE_TIMEOUT = 2.0
+# Время разбора замеряется у каждого (PARSE_SAMPLE_MASK + 1)-го ответа
+PARSE_SAMPLE_MASK = 31
+
+EXCHANGE_SECONDS = REGISTRY.histogram(
+    "reinhardt_exchange_seconds",
+    "Время обмена с устройством: команда до ответа (конвейер — окно целиком)",
+    ["device_id"],
+)
+REQUEST_TIMEOUTS = REGISTRY.counter(
+    "reinhardt_request_timeouts_total", "Параметры без ответа за RESPONSE_TIMEOUT", ["device_id"])
+REQUEST_ERRORS = REGISTRY.counter(
+    "reinhardt_request_errors_total", "Прочие ошибки опроса параметров", ["device_id"])
+PARSE_ERRORS = REGISTRY.counter(
+    "reinhardt_parse_errors_total", "Ответы, которые не удалось разобрать", ["device_id"])
+PARSE_SECONDS = REGISTRY.histogram(
+    "reinhardt_parse_seconds", "Время разбора ответа (выборочно)",
+    buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 1e-3),
+)
+READINGS = REGISTRY.counter("reinhardt_readings_total", "Полученные показания", ["device_id"])
+CYCLE_SECONDS = REGISTRY.histogram(
+    "reinhardt_poll_cycle_seconds", "Длительность цикла опроса группы параметров", ["device_id"])
+CYCLE_OVERRUNS = REGISTRY.counter(
+    "reinhardt_poll_cycle_overruns_total", "Циклы опроса дольше периода группы", ["device_id"])
+
+
+def forget_device_metrics(device_id: int) -> None:
+    """Снимает ряды метрик устройства, выведенного из опроса."""
+    for metric in (EXCHANGE_SECONDS, REQUEST_TIMEOUTS, REQUEST_ERRORS, PARSE_ERRORS,
+                   READINGS, CYCLE_SECONDS, CYCLE_OVERRUNS):
+        metric.remove(device_id)
+
+
+def describe(exc: BaseException) -> str:
+    """Текст ошибки для журнала (у TimeoutError() он пустой)."""
+    text = str(exc)
+    return f"{type(exc).__name__}: {text}" if text else type(exc).__name__
+
 
 class DevicePoller:
-    def __init__(self, device, db_session, poll_interval: float = 5.0):
+    # Границы адаптивного периода по умолчанию, в долях базового периода
+    # (перекрываются min/max_poll_interval устройства и параметров)
+    MIN_INTERVAL_FACTOR = 0.25
+    MAX_INTERVAL_FACTOR = 4.0
+
+    def __init__(
+            self,
+            device,
+            config_cache,
+            scheduler: PollScheduler,
+            poll_interval: float = 5.0,
+            connections: ConnectionManager = None,
+            measurement_writer=None,
+            parsers: ParserRegistry = None,
+            threshold_engine: ThresholdEngine = None,
+            bus: ReadingBus = None,
+            breaker: CircuitBreaker = None,
+            adaptive: bool = True,
+            compressor: Compressor = None,
+    ):
         self.device = device
-        self.db_session = db_session
-        self.interval = poll_interval
+        # Конфигурация берётся только из кеша — без обращений к БД
+        self.config_cache = config_cache
+        self.measurement_writer = measurement_writer
+        # Сжатие рядов перед записью (только значимые изменения)
+        self.compressor = compressor or Compressor()
+        # Рассылка показаний цикла (например, в GUI)
+        self.bus = bus
+        # Сроки опроса ведёт общий планировщик; период — устройства или по умолчанию
+        self.scheduler = scheduler
+        self._default_interval = poll_interval
         self._is_running = False
-        self._task = None
+        # Задачи планировщика: ключ → (параметры группы, адаптивный период)
+        self._groups = {}
+
+        # Недоступное устройство опрашивается всё реже; автомат закрывается
+        # только успешным опросом (у проверки связи в PollingService свой)
+        self.breaker = breaker or CircuitBreaker()
+        self.adaptive = adaptive
+        self._last_values = {}
+
+        # Долгоживущее соединение из общего пула (одно на ip:port)
+        self.connections = connections or ConnectionManager()
+        self._conn = self.connections.for_device(device)
+
+        # Метрики устройства: дочерние ищутся один раз, а не на каждое показание
+        self._m_exchange = EXCHANGE_SECONDS.labels(device.id)
+        self._m_timeouts = REQUEST_TIMEOUTS.labels(device.id)
+        self._m_errors = REQUEST_ERRORS.labels(device.id)
+        self._m_parse_errors = PARSE_ERRORS.labels(device.id)
+        self._m_readings = READINGS.labels(device.id)
+        self._m_cycle = CYCLE_SECONDS.labels(device.id)
+        self._m_overruns = CYCLE_OVERRUNS.labels(device.id)
+        self._parsed = 0
+
+        # Период, параметры, режим обмена и разбор ответов (см. reconfigure)
+        self.parsers = parsers or ParserRegistry()
+        self._apply_config(device)
+
+        # Оценка порогов с состоянием тревоги; без общего движка —
+        # собственный по порогам этого устройства
+        if threshold_engine is None:
+            threshold_engine = ThresholdEngine()
+            threshold_engine.load(config_cache.get_threshold_map(device.id).values())
+        self.threshold_engine = threshold_engine
+
+    def _apply_config(self, device) -> None:
+        """Настройки опроса из устройства и кеша конфигурации."""
+        self.device = device
+        self.interval = getattr(device, "poll_interval", None) or self._default_interval
+        self.parameters = self.config_cache.get_parameters(device.device_type_id)
+
+        # Режим обмена задаётся типом устройства
+        device_type = getattr(device, "device_type", None)
+        self.is_pipelined = bool(getattr(device_type, "is_pipelined", False))
+        self.pipeline_window = getattr(device_type, "pipeline_window", None) or 0
+        gap = getattr(device_type, "command_gap", None)
+        self.command_gap = DEFAULT_COMMAND_GAP if gap is None else gap
+        self.reply_echo = bool(getattr(device_type, "reply_echo", False))
+        # Эхо команды в начале ответа (при reply_echo)
+        self._echo = {param.id: self._command_bytes(param)[:-1] for param in self.parameters}
+
+        # Скомпилированный разбор ответа на каждый параметр
+        self._parsers = {
+            param.id: self.parsers.for_parameter(device_type, param)
+            for param in self.parameters
+        }
+        # Бинарный ответ читается по длине кадра (в нём может оказаться \r); у текстовых — None
+        self._frame_size = {
+            param_id: bound.parser.frame_size if isinstance(bound.parser, StructParser) else None
+            for param_id, bound in self._parsers.items()
+        }
+        # Параметры с одной командой и общим периодом — один обмен: команда
+        # уходит один раз (от ведущего параметра), ответ раздаётся по полям
+        self._exchange = {}
+        self._followers = set()
+        for params in self._parameter_groups().values():
+            leads = {}
+            for param in params:
+                key = (self._command_bytes(param), self._frame_size[param.id])
+                lead = leads.setdefault(key, param)
+                self._exchange.setdefault(lead.id, []).append(param)
+                if lead is not param:
+                    self._followers.add(param.id)
+        # Проверка связи по линии шлёт команду первого текстового параметра
+        probe = next((param for param in self.parameters if self._frame_size[param.id] is None), None)
+        if probe is not None:
+            self._conn.probe = self._command_bytes(probe)
 
-        # Для одного соединения
-        self._reader = None
-        self._writer = None
-        self._conn_lock = asyncio.Lock()
+    def reconfigure(self, device) -> dict:
+        """Применяет новую конфигурацию к работающему опросу, не трогая
+        соединение (адрес устройства тот же).
 
-        # Загружаем список параметров один раз
-        self.parameters = ParameterRepository(db_session) \
-            .get_parameters_by_device_type(device.device_type_id)
+        Группа с прежним периодом остаётся той же задачей планировщика:
+        меняется только список параметров, фаза и адаптивный период
+        сохраняются. Опустевшие группы снимаются; группа нового периода
+        наследует ближайший срок групп, из которых пришли её параметры
+        (новые параметры — случайную фазу). Возвращает сводку изменений.
+        """
+        previous = {param.id: param for param in self.parameters}
+        old_parsers, old_sizes, old_echo = self._parsers, self._frame_size, self._echo
+        old_exchange = self._exchange
+        self._apply_config(device)
+
+        current = {param.id for param in self.parameters}
+        added = current - previous.keys()
+        removed = previous.keys() - current
+        # Цикл, начатый до изменения, ещё может разбирать ответы снятых
+        # параметров и прежних групп обмена; их разборы и группы уйдут при
+        # следующей перенастройке
+        for param_id in removed:
+            self._parsers[param_id] = old_parsers[param_id]
+            self._frame_size[param_id] = old_sizes[param_id]
+            self._echo[param_id] = old_echo[param_id]
+            self._last_values.pop(param_id, None)
+        for lead_id, group in old_exchange.items():
+            self._exchange.setdefault(lead_id, group)
+        if removed and self.measurement_writer is not None:
+            for row in self.compressor.forget(self.device.id, removed):
+                self.measurement_writer.put(*row)
+
+        summary = {"added": sorted(added), "removed": sorted(removed), "groups_added": 0, "groups_removed": 0}
+        if not self._is_running:
+            # Группы построит start()
+            return summary
+
+        old_groups, self._groups = self._groups, {}
+        # Ближайший срок группы, где параметр опрашивался до изменения
+        due = {}
+        for key, (params, _) in old_groups.items():
+            remaining = self.scheduler.time_to_next(key)
+            for param in params:
+                due[param.id] = remaining
+
+        for interval, params in self._parameter_groups().items():
+            key = ("poll", self.device.id, interval)
+            controller = self._interval_controller(interval, params)
+            old = old_groups.get(key)
+            if old is not None:
+                # Адаптивный период — прежний, в новых границах
+                controller.interval = min(max(old[1].interval, controller.min_interval), controller.max_interval)
+                self._groups[key] = (params, controller)
+                # Открытый автомат сам держит увеличенный интервал
+                if not self.breaker.is_open:
+                    self.scheduler.set_interval(key, controller.interval)
+            else:
+                phases = [due[p.id] for p in params if due.get(p.id) is not None]
+                phase = min(min(phases), controller.interval) if phases else None
+                self._groups[key] = (params, controller)
+                self.scheduler.add(key, partial(self._poll_group, key), controller.interval, phase)
+                summary["groups_added"] += 1
+
+        for key in old_groups.keys() - self._groups.keys():
+            self.scheduler.remove(key)
+            summary["groups_removed"] += 1
+        return summary
+
+    def _parameter_groups(self) -> dict:
+        """Параметры, сгруппированные по периоду опроса."""
+        groups = defaultdict(list)
+        for param in self.parameters:
+            groups[getattr(param, "poll_interval", None) or self.interval].append(param)
+        return groups
+
+    def _interval_controller(self, interval: float, params) -> AdaptiveInterval:
+        """Границы периода группы: самые строгие из заданных у параметров,
+        иначе — у устройства, иначе — доли базового периода."""
+        if not self.adaptive:
+            return AdaptiveInterval(interval)
+
+        def bound(name, factor):
+            values = [getattr(p, name, None) for p in params]
+            values = [v for v in values if v] or [getattr(self.device, name, None)]
+            return min(v for v in values if v) if any(values) else interval * factor
+
+        return AdaptiveInterval(
+            interval,
+            bound("min_poll_interval", self.MIN_INTERVAL_FACTOR),
+            bound("max_poll_interval", self.MAX_INTERVAL_FACTOR),
+        )
 
     async def start(self):
         if self._is_running:
             return
         self._is_running = True
-        self._task = asyncio.create_task(self._run())
+        # Одна задача планировщика на каждую группу параметров с общим периодом
+        for interval, params in self._parameter_groups().items():
+            key = ("poll", self.device.id, interval)
+            controller = self._interval_controller(interval, params)
+            self._groups[key] = (params, controller)
+            self.scheduler.add(key, partial(self._poll_group, key), controller.interval)
         logger.info(f"Опрос {self.device.name} запущен")
 
     async def stop(self):
         if not self._is_running:
             return
         self._is_running = False
-        if self._task:
-            self._task.cancel()
-            with suppress(asyncio.CancelledError):
-                await self._task
-
-        if self._writer:
-            self._writer.close()
-            with suppress(Exception):
-                await self._writer.wait_closed()
+        for key in self._groups:
+            self.scheduler.remove(key)
+        self._groups = {}
 
+        # Сокет не закрываем: он общий и им управляет ConnectionManager
         logger.info(f"Опрос {self.device.name} остановлен")
 
-    async def _run(self):
-        while self._is_running:
-            try:
-                # 1) Открываем соединение
-                self._reader, self._writer = await asyncio.open_connection(
-                    self.device.ip_address, self.device.port
-                )
+    async def _poll_group(self, key):
+        """Задача планировщика: цикл опроса группы и подстройка периодов."""
+        group = self._groups.get(key)
+        if group is None:
+            return
+        params, controller = group
+        # Открытый автомат пропускает только одну пробу по истечении задержки
+        if not self.breaker.allow():
+            return
 
-                # 2) Подгружаем все активные пороги для устройства
-                thr_repo = ThresholdRepository(self.db_session)
-                thresholds = thr_repo.get_active_thresholds_by_device_id(self.device.id)
-                # Словарь parameter_id → Threshold
-                thr_map = {t.parameter_id: t for t in thresholds}
-
-                # 3) Параллельно опрашиваем параметры (с lock’ом)
-                tasks = [
-                    asyncio.create_task(self._poll_parameter(param))
-                    for param in self.parameters
-                ]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                # 4) Обрабатываем результаты
-                for param, res in zip(self.parameters, results):
-                    if isinstance(res, Exception):
-                        logger.error(f"Ошибка {param.name}: {res}")
-                        continue
+        started = time.perf_counter()
+        polled = await self.poll_once(params)
+        elapsed = time.perf_counter() - started
+        self._m_cycle.observe(elapsed)
+        if elapsed > controller.interval:
+            self._m_overruns.inc()
+        if not polled:
+            was_open = self.breaker.is_open
+            delay = self.breaker.record_failure()
+            if self.breaker.is_open:
+                if not was_open:
+                    logger.warning(f"{self.device.name}: опрос приостановлен, проба через {delay:g} с")
+                for job_key, (_, group_controller) in self._groups.items():
+                    self.scheduler.set_interval(job_key, max(delay, group_controller.interval))
+            return
+
+        if self.breaker.is_open:
+            logger.info(f"{self.device.name}: связь восстановлена, обычный опрос")
+            self.breaker.record_success()
+            for job_key, (_, group_controller) in self._groups.items():
+                self.scheduler.set_interval(job_key, group_controller.interval, reschedule=True)
+            return
+        self.breaker.record_success()
+
+        previous = controller.interval
+        interval = controller.update(self._urgency(polled))
+        if interval != previous:
+            logger.debug(f"{self.device.name}: период группы {key[2]} с → {interval:g} с")
+            self.scheduler.set_interval(key, interval, reschedule=interval < previous)
+
+    def _urgency(self, polled) -> float:
+        """Наибольшая срочность среди показаний цикла."""
+        distance, span = self.threshold_engine.proximity(
+            [self.device.id] * len(polled),
+            [param.id for param, _, _ in polled],
+            [value for _, value, _ in polled],
+        )
+        score = 0.0
+        for (param, value, code), d, s in zip(polled, distance.tolist(), span.tolist()):
+            previous = self._last_values.get(param.id)
+            self._last_values[param.id] = value
+            # Без порога масштаб изменения — само значение
+            scale = s if math.isfinite(s) and s > 0 else max(abs(value), 1e-9)
+            change = 0.0 if previous is None else abs(value - previous) / scale
+            proximity = d / s if math.isfinite(s) and s > 0 else math.inf
+            score = max(score, urgency(change, proximity, code == ALARM))
+        return score
+
+    async def poll_once(self, parameters=None):
+        """Один цикл опроса.
+
+        Возвращает [(параметр, значение, код статуса)] по успешно
+        опрошенным параметрам или None, если связи нет.
+        """
+        parameters = self.parameters if parameters is None else parameters
+        try:
+            # 1) Берём соединение из пула (переподключение с backoff)
+            if not await self._conn.ensure_connected():
+                logger.warning(f"Нет соединения с {self.device.name}, пропуск цикла")
+                return None
 
-                    value, metric = res
-                    # Поиск порога
-                    thr = thr_map.get(param.id)
+            # 2) Опрашиваем параметры за один доступ к линии: конвейером или
+            #    по одному; параметры с общей командой — одним обменом ведущего.
+            #    Устройства на той же линии MOXA ждут своей очереди
+            leads = [param for param in parameters if param.id not in self._followers]
+            exchange = self._exchange
+            async with self._conn.turn(self.device.id, self.command_gap):
+                if self.is_pipelined:
+                    results = await self._poll_pipelined(leads)
+                else:
+                    results = await self._poll_sequential(leads)
 
-                    # Определяем статус
-                    status = "OK"
-                    if thr:
-                        if not (thr.low_value <= value <= thr.high_value):
-                            status = "ALARM"
+            # 3) Обрабатываем результаты
+            timestamp = time.time()
+            polled = []
+            for lead, res in zip(leads, results):
+                for param in exchange[lead.id]:
+                    if isinstance(res, Exception):
+                        value = res
+                    elif param.id in res:
+                        value = res[param.id]
                     else:
-                        # нет порога — можно залогировать или считать OK
-                        logger.debug(f"Порог не найден для {param.name} на {self.device.name}")
+                        # Группа изменилась за время цикла (reconfigure)
+                        continue
+                    if isinstance(value, Exception):
+                        if isinstance(value, asyncio.TimeoutError):
+                            self._m_timeouts.inc()
+                        elif isinstance(value, ValueError):
+                            self._m_parse_errors.inc()
+                        else:
+                            self._m_errors.inc()
+                        logger.error(f"Ошибка {param.name}: {describe(value)}")
+                        continue
+                    polled.append((param, value, param.metric))
+            if not polled:
+                return []
+            self._m_readings.inc(len(polled))
+
+            # 4) Пороги — одной пачкой; движок помнит состояние тревоги
+            statuses, transitions = self.threshold_engine.evaluate(
+                [self.device.id] * len(polled),
+                [param.id for param, _, _ in polled],
+                [value for _, value, _ in polled],
+                timestamp,
+            )
 
-                    # Логируем и/или пишем в БД/Firebird
+            log_readings = logger.isEnabledFor(logging.INFO)
+            published = []
+            codes = statuses.tolist()
+            for (param, value, metric), code in zip(polled, codes):
+                status = STATUS_NAMES[code]
+                # Логируем (форматирует поток записи логов) и ставим в очередь записи в БД
+                if log_readings:
                     logger.info(
-                        f"{self.device.name} | {param.name} ({param.command}): "
-                        f"{value} {metric} -> {status}"
+                        "%s | %s (%s): %s %s -> %s",
+                        self.device.name, param.name, param.command, value, metric, status,
+                        extra={"reading": True, "device_id": self.device.id,
+                               "parameter_id": param.id, "value": value, "status": status},
                     )
 
-                    # здесь же вызвать FirebirdWriter или передать в UI
-                    # await self._write_to_firebird(param.id, value, status)
+                if self.measurement_writer is not None:
+                    for row in self.compressor.offer(self.device.id, param, timestamp, value, status):
+                        self.measurement_writer.put(*row)
+                if self.bus is not None:
+                    published.append((self.device.id, param.id, timestamp, value, status))
+
+            if published:
+                self.bus.publish(published)
+
+            # Смены статуса (вход в тревогу и возврат в норму)
+            names = {param.id: param.name for param, _, _ in polled}
+            events = []
+            for transition in transitions:
+                name = names[transition.parameter_id]
+                if self.bus is not None:
+                    state = "тревога" if transition.status == "ALARM" else "норма"
+                    events.append(Event(
+                        transition.timestamp, transition.device_id, transition.parameter_id,
+                        transition.status, transition.value,
+                        f"{self.device.name}: {name} — {state} ({transition.value:g})",
+                    ))
+                logger.warning(
+                    "%s | %s: %s -> %s",
+                    self.device.name, name, transition.value, transition.status,
+                    extra={"transition": True, "device_id": transition.device_id,
+                           "parameter_id": transition.parameter_id,
+                           "value": transition.value, "status": transition.status},
+                )
+            if events:
+                self.bus.publish(events, topic=EVENTS)
+
+            return [(param, value, code) for (param, value, _), code in zip(polled, codes)]
 
-                # 5) Закрываем соединение
-                self._writer.close()
-                await self._writer.wait_closed()
+        except Exception as e:
+            logger.error(f"Ошибка цикла опроса {self.device.name}: {describe(e)}")
+            return None
 
+    async def _poll_sequential(self, parameters) -> list:
+        """Команды по одной с паузой command_gap; список результатов
+        (значения группы обмена или исключение) в порядке параметров."""
+        results = []
+        for i, param in enumerate(parameters):
+            if i and self.command_gap:
+                await asyncio.sleep(self.command_gap)
+            try:
+                results.append(await self._poll_parameter(param))
             except Exception as e:
-                logger.error(f"Ошибка цикла опроса {self.device.name}: {e}")
+                results.append(e)
+        return results
+
+    async def _poll_parameter(self, param) -> dict:
+        """Запрос одного параметра (и параметров с той же командой);
+        вызывается, когда линия уже занята этим опросчиком.
+        Возвращает {parameter_id: значение или ValueError}."""
+        conn = self._conn
+        if not conn.is_connected:
+            raise ConnectionError(f"Соединение с {self.device.name} закрыто")
+        try:
+            protocol = conn.protocol
+            started = time.perf_counter()
+            protocol.write(self._command_bytes(param))
+            await protocol.drain()
+
+            # Эхо проверяется только у текстовых ответов
+            echoed = self.reply_echo and self._frame_size[param.id] is None
+            parse = self._parse_echoed if echoed else self._parse_response
+            values = await self._read_reply(protocol, parse, param, param)
+            self._m_exchange.observe(time.perf_counter() - started)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError):
+            # Поток мог рассинхронизироваться (FrameError тоже OSError) — сбрасываем сокет
+            await conn.invalidate()
+            raise
+        return values
+
+    async def _poll_pipelined(self, parameters) -> list:
+        """Конвейерный опрос: команды окна уходят одной записью, ответы
+        читаются из потока. Возвращает список результатов (значения группы
+        обмена или исключение) в порядке параметров. Линия уже занята."""
+        conn = self._conn
+        results = []
+        window = self.pipeline_window or len(parameters) or 1
+
+        for start in range(0, len(parameters), window):
+            chunk = parameters[start:start + window]
+            if not conn.is_connected:
+                err = ConnectionError(f"Соединение с {self.device.name} закрыто")
+                results.extend([err] * (len(parameters) - start))
+                break
+
+            replies = {}
+            try:
+                protocol = conn.protocol
+                started = time.perf_counter()
+                protocol.write(b"".join(self._command_bytes(p) for p in chunk))
+                await protocol.drain()
+                if self.reply_echo:
+                    await self._read_echoed(protocol, chunk, replies)
+                else:
+                    await self._read_in_order(protocol, chunk, replies)
+                self._m_exchange.observe(time.perf_counter() - started)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
+                # Опоздавшие ответы сбили бы следующий опрос — сбрасываем сокет;
+                # остаток окна и цикла считаем ошибкой
+                await conn.invalidate()
+                results.extend(replies.get(p.id, e) for p in chunk)
+                results.extend([e] * (len(parameters) - len(results)))
+                break
+            results.extend(replies[p.id] for p in chunk)
+
+            if self.command_gap and start + window < len(parameters):
+                await asyncio.sleep(self.command_gap)
 
-            # 6) Ждём перед следующим циклом
-            await asyncio.sleep(self.interval)
+        return results
 
-    async def _poll_parameter(self, param):
-        """Запрос одного параметра через общий сокет + lock."""
-        async with self._conn_lock:
-            cmd = param.command if param.command.endswith('\r') else param.command + '\r'
-            self._writer.write(cmd.encode())
-            await self._writer.drain()
+    async def _read_in_order(self, protocol, chunk, replies: dict) -> None:
+        """Ответы окна по порядку команд (устройство без эха).
 
-            data = await asyncio.wait_for(self._reader.readuntil(b'\r'), timeout=2.0)
-            resp = data.decode().strip()
+        Потерянный ответ сдвигает все следующие на чужие параметры, а
+        заметен только тайм-аутом в конце окна или ошибкой разбора, поэтому
+        любая ошибка отбрасывает окно целиком.
+        """
+        try:
+            for param in chunk:
+                replies[param.id] = await self._read_reply(protocol, self._parse_response, param, param)
+        except ValueError as e:
+            replies.clear()
+            raise FrameError(f"Ответы окна отброшены: порядок не подтверждён ({e})") from e
+        except BaseException:
+            replies.clear()
+            raise
 
-            # небольшая пауза для безопасности
-            await asyncio.sleep(0.05)
+    async def _read_echoed(self, protocol, chunk, replies: dict) -> None:
+        """Ответы окна, сопоставленные с командами по эху.
 
-        val = self._parse_response(resp)
-        return val, param.metric
+        Ответ, пришедший раньше ответов на предыдущие команды окна, значит,
+        что те потеряны: они получают TimeoutError, следующие ответы
+        разбираются как обычно. Ответ без подходящей команды — FrameError.
+        Бинарный ответ эха не несёт и читается строго по порядку: потери
+        перед ним ищутся только среди текстовых команд до него.
+        """
+        pending = list(chunk)
+        while pending:
+            param = pending[0]
+            if self._frame_size[param.id] is not None:
+                try:
+                    replies[param.id] = await self._read_reply(protocol, self._parse_response, param, param)
+                except ValueError as e:
+                    replies[param.id] = e
+                del pending[0]
+                continue
+            index, result = await self._read_reply(protocol, self._match_echo, pending, param)
+            for lost in pending[:index]:
+                replies[lost.id] = asyncio.TimeoutError(f"Нет ответа на {lost.command}")
+            replies[pending[index].id] = result
+            del pending[:index + 1]
 
-    def _parse_response(self, response: str) -> float:
-        clean = re.sub(r'[^\d\.\-]', ' ', response)
-        nums = re.findall(r'[-+]?\d*\.\d+|\d+', clean)
-        if not nums:
-            raise ValueError(f"Не удалось распарсить '{response}'")
-        return float(nums[0])
+    def _match_echo(self, pending, frame):
+        """(номер команды в pending, значения группы обмена или ValueError) по
+        эху в начале ответа. Из команд-префиксов друг друга («T», «T2»)
+        выбирается самое длинное совпавшее эхо; разбирается ответ без эха."""
+        index, length = -1, -1
+        for i, param in enumerate(pending):
+            if self._frame_size[param.id] is not None:
+                break
+            echo = self._echo[param.id]
+            if len(echo) > length and frame[:len(echo)] == echo:
+                index, length = i, len(echo)
+        if index < 0:
+            raise FrameError(f"Ответ не соответствует командам окна: {bytes(frame[:64])!r}")
+        try:
+            return index, self._parse_response(pending[index], frame[length:])
+        except ValueError as e:
+            return index, e
+
+    def _read_reply(self, protocol, parse, arg, param):
+        """Чтение ответа на команду param: бинарного — ровно frame_size байт,
+        текстового — до терминатора; результат — parse(arg, кадр)."""
+        size = self._frame_size[param.id]
+        return protocol.read_frame(parse, arg, RESPONSE_TIMEOUT, size is None, size)
+
+    @staticmethod
+    def _command_bytes(param) -> bytes:
+        cmd = param.command if param.command.endswith('\r') else param.command + '\r'
+        return cmd.encode()
+
+    def _parse_echoed(self, lead, frame) -> dict:
+        """Разбор ответа с проверкой эха: чужой ответ — рассинхронизация потока."""
+        echo = self._echo[lead.id]
+        if frame[:len(echo)] != echo:
+            raise FrameError(f"Ответ не на {lead.command}: {bytes(frame[:64])!r}")
+        return self._parse_response(lead, frame[len(echo):])
+
+    def _parse_response(self, lead, frame) -> dict:
+        """Значения группы обмена ведущего параметра lead по одному ответу
+        (memoryview в буфер линии, без терминатора и эха):
+        {parameter_id: значение или ValueError}.
+
+        Время разбора замеряется у каждого (PARSE_SAMPLE_MASK + 1)-го ответа.
+        """
+        self._parsed += 1
+        if self._parsed & PARSE_SAMPLE_MASK:
+            return self._parse_group(lead, frame)
+        started = time.perf_counter()
+        values = self._parse_group(lead, frame)
+        PARSE_SECONDS.observe(time.perf_counter() - started)
+        return values
+
+    def _parse_group(self, lead, frame) -> dict:
+        """Каждый объект разбора группы разбирает ответ один раз (parse()),
+        параметры берут из результата свои поля. Если не получилось ни
+        одного значения — ValueError, как у одиночного параметра.
+        """
+        group = self._exchange[lead.id]
+        if len(group) == 1:
+            return {lead.id: self._parsers[lead.id](frame)}
+
+        parsed = {}
+        values = {}
+        for param in group:
+            bound = self._parsers[param.id]
+            try:
+                fields = parsed.get(bound.parser)
+                if fields is None:
+                    fields = parsed[bound.parser] = bound.parser.parse(frame)
+                values[param.id] = bound.pick(fields)
+            except ValueError as e:
+                values[param.id] = e
+        if all(isinstance(value, ValueError) for value in values.values()):
+            raise values[lead.id]
+        return values
@@ -0,0 +1,280 @@
+import asyncio
+import re
+import time
+from typing import Callable, Optional
+
+# Текстовый кадр: печатный ASCII, пробел, табуляция и перевод строки.
+# Остальное (нули и 0xFF от помех на линии, обрывки бинарных кадров)
+# означает, что поток испорчен
+_GARBLED = re.compile(rb"[^\x09\x0a\x20-\x7e]")
+
+
+class FrameError(ConnectionError):
+    """Кадр не по протоколу (слишком длинный или с мусором): поток рассинхронизирован."""
+
+
+class LinkProtocol(asyncio.BufferedProtocol):
+    """Чтение кадров с линии MOXA без промежуточных копий.
+
+    Ядро пишет принятые байты прямо в постоянный bytearray (get_buffer),
+    кадры (до терминатора) выделяются поиском в буфере без срезов, а
+    разбор получает memoryview кадра на месте. Прочитанное место
+    переиспользуется: когда всё разобрано, указатели просто обнуляются,
+    иначе хвост сдвигается в начало.
+
+    Кадр фиксированной длины (бинарный ответ без терминатора) читается
+    тем же read_frame с size: ровно size байт от начала непрочитанного.
+
+    Незаконченный кадр при обрыве связи — IncompleteReadError, кадр длиннее
+    max_frame или с непечатными байтами — FrameError; в обоих случаях
+    поток рассинхронизирован и соединение надо сбросить.
+    """
+
+    def __init__(self, terminator: bytes = b"\r", max_frame: int = 1024, buffer_size: int = 65536):
+        self.terminator = terminator
+        self.max_frame = max_frame
+        self._buffer = bytearray(max(buffer_size, 2 * max_frame))
+        self._start = 0  # начало непрочитанных данных
+        self._end = 0  # конец принятых данных
+        self._scan = 0  # до куда уже искали терминатор
+        self._bad = -1  # первый непечатный байт среди непрочитанных или -1
+        self._size = 0  # длина ожидаемого кадра фиксированной длины или 0
+        self._transport: Optional[asyncio.Transport] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._paused = False
+        self._exc: Optional[BaseException] = None
+        self._closed: Optional[asyncio.Future] = None
+        # Когда с линии последний раз пришли данные (time.monotonic)
+        self.received_at = 0.0
+
+        # Счётчики
+        self.frames = 0
+        self.garbled = 0
+
+    # --- asyncio.BufferedProtocol ---
+
+    def connection_made(self, transport) -> None:
+        self._transport = transport
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._start == self._end:
+            self._start = self._end = self._scan = 0
+            self._bad = -1
+        elif len(self._buffer) - self._end < self.max_frame:
+            # Сдвигаем недочитанный хвост в начало (размер буфера не меняется)
+            size = self._end - self._start
+            self._buffer[:size] = self._buffer[self._start:self._end]
+            self._scan -= self._start
+            if self._bad >= 0:
+                self._bad -= self._start
+            self._start, self._end = 0, size
+            if len(self._buffer) - size < self.max_frame:
+                # Линию никто не читает, а данные идут — поток уже не разобрать
+                self.garbled += 1
+                self._fail(FrameError(f"Переполнен буфер линии ({size} байт не прочитано)"))
+                self._start = self._end = self._scan = 0
+                self._bad = -1
+        return memoryview(self._buffer)[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        # Мусор ищется один раз на принятую порцию, а не на каждый кадр
+        if self._bad < 0:
+            bad = _GARBLED.search(self._buffer, self._end, self._end + nbytes)
+            if bad is not None:
+                self._bad = bad.start()
+        self._end += nbytes
+        self.received_at = time.monotonic()
+        if self._waiter is None or self._waiter.done():
+            return
+        if self._frame_end() >= 0:
+            self._waiter.set_result(None)
+        elif self._end - self._start > self.max_frame:
+            self.garbled += 1
+            self._fail(FrameError(f"Кадр длиннее {self.max_frame} байт без терминатора"))
+
+    def eof_received(self) -> bool:
+        return False
+
+    def connection_lost(self, exc) -> None:
+        if exc is None:
+            partial = bytes(self._buffer[self._start:self._end])
+            exc = asyncio.IncompleteReadError(partial, None) if partial else ConnectionResetError("Соединение закрыто")
+        self._fail(exc)
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_exception(exc)
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+        self._transport = None
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    # --- интерфейс опросчика ---
+
+    @property
+    def is_open(self) -> bool:
+        return self._transport is not None and not self._transport.is_closing() and self._exc is None
+
+    @property
+    def idle(self) -> float:
+        """Сколько секунд с линии ничего не приходило."""
+        return time.monotonic() - self.received_at
+
+    def write(self, data: bytes) -> None:
+        self._transport.write(data)
+
+    async def drain(self) -> None:
+        if self._exc is not None:
+            raise self._exc
+        if self._paused:
+            self._drain_waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._drain_waiter
+            finally:
+                self._drain_waiter = None
+
+    async def read_frame(self, parse: Callable, arg, timeout: float, text: bool = True,
+                         size: Optional[int] = None):
+        """Ждёт следующий кадр и возвращает parse(arg, кадр).
+
+        Кадр (без терминатора) передаётся как memoryview в буфер и
+        действителен только внутри parse. Кадр считается прочитанным и при
+        ошибке разбора — поток остаётся синхронным. size — кадр
+        фиксированной длины: ровно size байт, терминатор не ищется.
+        """
+        if isinstance(self._exc, FrameError):
+            # После рассинхронизации не отдаём и уже принятые кадры
+            raise self._exc
+        if size is not None and not 0 < size <= self.max_frame:
+            raise ValueError(f"Длина кадра {size} вне (0, {self.max_frame}]")
+        self._size = size or 0
+        end = self._frame_end()
+        if end < 0:
+            if self._exc is not None:
+                raise self._exc
+            loop = asyncio.get_running_loop()
+            waiter = self._waiter = loop.create_future()
+            # Срок — прямым таймером, без обёртки wait_for
+            timer = loop.call_later(timeout, self._expire, waiter)
+            try:
+                await waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+            end = self._frame_end()
+
+        view = memoryview(self._buffer)[self._start:end]
+        try:
+            if len(view) > self.max_frame or (text and 0 <= self._bad < end):
+                self.garbled += 1
+                raise FrameError(f"Испорченный кадр: {bytes(view[:64])!r}")
+            self.frames += 1
+            return parse(arg, view)
+        finally:
+            view.release()
+            self._start = self._scan = end + (0 if self._size else len(self.terminator))
+            self._size = 0
+            if 0 <= self._bad < self._start:
+                bad = _GARBLED.search(self._buffer, self._start, self._end)
+                self._bad = -1 if bad is None else bad.start()
+
+    async def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+        if self._closed is not None:
+            await self._closed
+
+    # --- внутреннее ---
+
+    def _frame_end(self) -> int:
+        """Конец первого непрочитанного кадра (без терминатора) или -1."""
+        if self._size:
+            end = self._start + self._size
+            return end if end <= self._end else -1
+        return self._find()
+
+    def _find(self) -> int:
+        """Позиция терминатора первого непрочитанного кадра или -1."""
+        pos = self._buffer.find(self.terminator, max(self._scan, self._start), self._end)
+        if pos < 0:
+            self._scan = max(self._start, self._end - len(self.terminator) + 1)
+        return pos
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_exception(asyncio.TimeoutError())
+
+    def _fail(self, exc: BaseException) -> None:
+        self._exc = exc
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(exc)
+
+
+def benchmark(frames: int = 100_000, per_read: int = 8) -> dict:
+    """Микробенчмарк по локальному сокету: мкс на ответ для прежнего чтения
+    (wait_for(StreamReader.readuntil) + срез) и LinkProtocol.read_frame.
+    Ответы приходят окнами по per_read, как при конвейерном опросе."""
+    from core.service.parsers import GenericParser
+
+    parser = GenericParser()
+    window = b"".join(f"C{i}= {i * 1.25:.3f}\r".encode() for i in range(per_read))
+    rounds = frames // per_read
+
+    async def serve(reader, writer):
+        while await reader.read(1):
+            writer.write(window)
+        writer.close()
+        served.set()
+
+    async def stream_reader(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            writer.write(b"?")
+            for _ in range(per_read):
+                data = await asyncio.wait_for(reader.readuntil(b"\r"), timeout=1.0)
+                parser.value(data[:-1])
+        elapsed = time.perf_counter() - started
+        writer.close()
+        await writer.wait_closed()
+        return elapsed
+
+    async def link_protocol(port):
+        _, protocol = await asyncio.get_running_loop().create_connection(LinkProtocol, "127.0.0.1", port)
+        parse = lambda _, frame: parser.value(frame)  # noqa: E731
+        started = time.perf_counter()
+        for _ in range(rounds):
+            protocol.write(b"?")
+            for _ in range(per_read):
+                await protocol.read_frame(parse, None, 1.0)
+        elapsed = time.perf_counter() - started
+        await protocol.close()
+        return elapsed
+
+    async def run(fn):
+        nonlocal served
+        served = asyncio.Event()
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        async with server:
+            elapsed = await fn(server.sockets[0].getsockname()[1])
+            await served.wait()
+        return elapsed
+
+    served: Optional[asyncio.Event] = None
+
+    return {
+        name: asyncio.run(run(fn)) / (rounds * per_read) * 1e6
+        for name, fn in (("wait_for(readuntil)", stream_reader), ("LinkProtocol.read_frame", link_protocol))
+    }
+
+
+if __name__ == "__main__":
+    for name, us in benchmark().items():
+        print(f"{name:<26} {us:6.2f} мкс/кадр")
@@ -0,0 +1,298 @@
+import asyncio
+import inspect
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import suppress
+from typing import Deque, NamedTuple, Optional, Tuple
+
+from infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger("loop_watchdog")
+
+LOOP_LAG = REGISTRY.histogram(
+    "reinhardt_loop_lag_seconds", "Опоздание пробуждения цикла событий",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+STALLS = REGISTRY.counter("reinhardt_loop_stalls_total", "Остановки цикла событий дольше порога")
+STALL_SECONDS = REGISTRY.histogram(
+    "reinhardt_loop_stall_seconds", "Длительность остановок цикла событий",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SLOW_CALLBACKS = REGISTRY.counter(
+    "reinhardt_slow_callbacks_total", "Медленные колбэки по отчёту отладочного режима asyncio")
+
+# Кадр стека: (файл, строка, функция)
+Frame = Tuple[str, int, str]
+
+SAMPLING = "sample"
+CPROFILE = "cprofile"
+
+
+class Stall(NamedTuple):
+    """Остановка цикла: длительность, задача и самый частый стек за время остановки."""
+    started: float
+    duration: float
+    task: str
+    coroutine: str
+    stack: Tuple[Frame, ...]
+    samples: int
+
+
+def _coroutine_of(frame) -> str:
+    """Самая внешняя корутина стека — та, которую сейчас выполняет задача."""
+    found = ""
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            found = frame.f_code.co_qualname
+        frame = frame.f_back
+    return found
+
+
+def _stack_of(frame, max_depth: int) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        code = frame.f_code
+        stack.append((code.co_filename, frame.f_lineno, code.co_qualname))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def format_stack(stack: Tuple[Frame, ...]) -> str:
+    return "\n".join(f'  File "{f}", line {line}, in {name}' for f, line, name in stack)
+
+
+class _SlowCallbackFilter(logging.Filter):
+    """Считает отчёты asyncio о медленных колбэках (сами записи не трогает)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing"):
+            SLOW_CALLBACKS.inc()
+        return True
+
+
+class LoopWatchdog:
+    """Сторож цикла событий.
+
+    Задача-пульс в цикле просыпается каждые interval секунд и отмечает
+    следующий ожидаемый срок; по опозданию пробуждения считается задержка
+    цикла. Отдельный поток каждые sample_interval секунд сверяет этот срок
+    с часами: если пульс опаздывает больше чем на threshold, цикл чем-то
+    заблокирован — поток снимает стек потока цикла (sys._current_frames)
+    и запоминает текущую задачу. Когда цикл оживает, в журнал уходит самый
+    частый стек остановки, задача и корутина.
+
+    Тот же поток служит выборочным профилировщиком (sampling): пока он
+    включён, стеки цикла копятся независимо от остановок.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.25,
+            interval: float = 0.1,
+            sample_interval: float = 0.02,
+            max_depth: int = 40,
+            history: int = 20,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.max_depth = max_depth
+        self.stalls: Deque[Stall] = deque(maxlen=history)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._deadline = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sampling: Optional[Counter] = None
+        self._slow_filter: Optional[_SlowCallbackFilter] = None
+
+    async def run(self) -> None:
+        """Пульс: запускается задачей в цикле, который нужно сторожить."""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._deadline = time.monotonic() + self.interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                self._deadline = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                LOOP_LAG.observe(max(0.0, loop.time() - expected))
+        finally:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.set_slow_callback_reporting(False)
+
+    def _watch(self) -> None:
+        stall_started = None
+        samples: Counter = Counter()
+        task = coroutine = ""
+        while not self._stop.wait(self.sample_interval):
+            now = time.monotonic()
+            overdue = now - self._deadline
+            sampling = self._sampling
+            if overdue <= self.threshold and sampling is None:
+                if stall_started is not None:
+                    self._report(stall_started, now, task, coroutine, samples)
+                    stall_started, samples = None, Counter()
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = _stack_of(frame, self.max_depth)
+            if sampling is not None:
+                sampling[stack] += 1
+            if overdue > self.threshold:
+                if stall_started is None:
+                    stall_started = self._deadline
+                    task = self._current_task()
+                    coroutine = _coroutine_of(frame)
+                samples[stack] += 1
+            elif stall_started is not None:
+                self._report(stall_started, now, task, coroutine, samples)
+                stall_started, samples = None, Counter()
+            del frame
+
+    def _current_task(self) -> str:
+        with suppress(Exception):
+            task = asyncio.current_task(self._loop)
+            if task is not None:
+                return f"{task.get_name()} {task.get_coro().__qualname__}"
+        return ""
+
+    def _report(self, started: float, now: float, task: str, coroutine: str, samples: Counter) -> None:
+        stack, count = samples.most_common(1)[0]
+        stall = Stall(started, now - started, task, coroutine, stack, sum(samples.values()))
+        self.stalls.append(stall)
+        STALLS.inc()
+        STALL_SECONDS.observe(stall.duration)
+        logger.warning(
+            f"Цикл событий стоял {stall.duration:.3f} с; задача: {task or '—'}, "
+            f"корутина: {coroutine or '—'}; стек ({count} из {stall.samples} выборок):\n"
+            f"{format_stack(stack)}"
+        )
+
+    def set_slow_callback_reporting(self, enabled: bool) -> None:
+        """Отладочный режим asyncio: отчёт о каждом колбэке дольше порога.
+
+        Дорог (asyncio запоминает место создания каждой задачи и колбэка),
+        поэтому включается только на время расследования.
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        asyncio_logger = logging.getLogger("asyncio")
+        if enabled and self._slow_filter is None:
+            self._slow_filter = _SlowCallbackFilter()
+            asyncio_logger.addFilter(self._slow_filter)
+        elif not enabled and self._slow_filter is not None:
+            asyncio_logger.removeFilter(self._slow_filter)
+            self._slow_filter = None
+
+        def apply():
+            loop.slow_callback_duration = self.threshold
+            loop.set_debug(enabled)
+
+        if threading.get_ident() == self._loop_thread:
+            apply()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(apply)
+
+    @property
+    def slow_callback_reporting(self) -> bool:
+        return self._slow_filter is not None
+
+    def start_sampling(self) -> None:
+        if self._sampling is None:
+            self._sampling = Counter()
+
+    def stop_sampling(self) -> Counter:
+        sampling, self._sampling = self._sampling, None
+        return sampling or Counter()
+
+
+class LoopProfiler:
+    """Профилирование цикла событий по запросу, без перезапуска.
+
+    sample   — стеки потока цикла снимает поток сторожа; результат —
+               свёрнутые стеки (формат flamegraph.pl / speedscope);
+    cprofile — cProfile в потоке цикла; результат — файл .prof и
+               первые строки pstats в журнале.
+    """
+
+    def __init__(self, watchdog: LoopWatchdog, directory: str = ".", mode: str = SAMPLING):
+        self.watchdog = watchdog
+        self.directory = directory
+        self.mode = mode
+        self.active: Optional[str] = None
+        self._profile = None
+        self._started = 0.0
+
+    def toggle(self) -> Optional[str]:
+        """Включает или выключает профилирование; при выключении — путь к результату."""
+        if self.active is None:
+            self.start()
+            return None
+        return self.stop()
+
+    def start(self, mode: Optional[str] = None) -> None:
+        if self.active is not None:
+            return
+        mode = mode or self.mode
+        if mode == CPROFILE:
+            import cProfile
+            # cProfile профилирует вызвавший поток — включаем в потоке цикла
+            self._profile = cProfile.Profile()
+            self._in_loop(self._profile.enable)
+        else:
+            self.watchdog.start_sampling()
+        self.active = mode
+        self._started = time.time()
+        logger.warning(f"Профилирование цикла событий включено ({mode})")
+
+    def stop(self) -> Optional[str]:
+        mode, self.active = self.active, None
+        if mode is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started))
+        base = os.path.join(self.directory, f"profile-{os.getpid()}-{stamp}")
+        if mode == CPROFILE:
+            profile, self._profile = self._profile, None
+            self._in_loop(profile.disable)
+            path = base + ".prof"
+            profile.dump_stats(path)
+            import pstats
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(20)
+            logger.warning(f"Профиль записан в {path}\n{text.getvalue()}")
+        else:
+            samples = self.watchdog.stop_sampling()
+            path = base + ".folded"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(";".join(f"{name} ({os.path.basename(file)}:{line})"
+                                     for file, line, name in stack) + f" {count}\n")
+            logger.warning(f"Профиль записан в {path} ({sum(samples.values())} выборок)")
+        return path
+
+    def _in_loop(self, fn) -> None:
+        loop = self.watchdog._loop
+        if loop is None or threading.get_ident() == self.watchdog._loop_thread:
+            fn()
+        else:
+            # Ждём выполнения, чтобы профиль не остановился раньше, чем запущен
+            done = threading.Event()
+            loop.call_soon_threadsafe(lambda: (fn(), done.set()))
+            done.wait(5.0)
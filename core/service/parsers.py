@@ -0,0 +1,235 @@
+import json
+import re
+import struct
+import timeit
+from typing import Dict, Optional, Tuple
+
+# Спецификация разбора хранится в Parameter.parse_spec (или DeviceType.parse_spec
+# как значение по умолчанию для типа) в виде JSON:
+#   {"type": "slice", "start": 2, "end": 8, "scale": 0.01}
+#   {"type": "regex", "pattern": "T=(?P<t>-?\\d+\\.\\d+) H=(?P<h>\\d+)", "field": "t"}
+#   {"type": "struct", "format": ">hH", "fields": ["t", "h"], "scale": {"t": 0.1}, "field": "t"}
+#   {"type": "struct", "format": ">f", "offset": 2, "size": 8}  # заголовок 2 байта, хвост 2 байта
+# Пустая спецификация — общий разбор «первое число в ответе».
+# Разборы принимают любой буфер байтов: опросчик передаёт memoryview кадра
+# прямо в буфере линии (LinkProtocol), поэтому срезы здесь не копируются.
+
+_NUMBER = re.compile(rb'-?(?:\d*\.\d+|\d+)')
+
+
+class GenericParser:
+    """Первое число в ответе — как прежний разбор, но прямо по байтам и с
+    сохранением знака у целых чисел («-5» раньше давало 5)."""
+
+    fields = ("value",)
+
+    def parse(self, data: bytes) -> Dict[str, float]:
+        return {"value": self.value(data)}
+
+    def value(self, data: bytes, field: Optional[str] = None) -> float:
+        match = _NUMBER.search(data)
+        if match is None:
+            raise ValueError(f"Не удалось распарсить {bytes(data)!r}")
+        return float(match.group())
+
+
+class SliceParser:
+    """Фиксированная позиция поля в ответе."""
+
+    fields = ("value",)
+
+    def __init__(self, start: int, end: Optional[int] = None, scale: float = 1.0):
+        self._slice = slice(start, end)
+        self.scale = scale
+
+    def parse(self, data: bytes) -> Dict[str, float]:
+        return {"value": self.value(data)}
+
+    def value(self, data: bytes, field: Optional[str] = None) -> float:
+        try:
+            return float(data[self._slice]) * self.scale
+        except ValueError:
+            raise ValueError(f"Не удалось распарсить {bytes(data)!r}") from None
+
+
+class RegexParser:
+    """Скомпилированное выражение; именованные группы — отдельные поля."""
+
+    def __init__(self, pattern: str, scale: Optional[Dict[str, float]] = None):
+        self._regex = re.compile(pattern.encode())
+        self.fields = tuple(self._regex.groupindex) or ("value",)
+        self.scale = scale or {}
+        # Без именованных групп значение — первая группа (или всё совпадение)
+        self._default_group = 1 if self._regex.groups else 0
+
+    def parse(self, data: bytes) -> Dict[str, float]:
+        match = self._match(data)
+        if not self._regex.groupindex:
+            return {"value": self._to_float("value", match.group(self._default_group))}
+        return {
+            name: self._to_float(name, raw)
+            for name, raw in match.groupdict().items() if raw is not None
+        }
+
+    def value(self, data: bytes, field: Optional[str] = None) -> float:
+        match = self._match(data)
+        if field is None or not self._regex.groupindex:
+            raw = match.group(self._default_group)
+            field = field or "value"
+        else:
+            raw = match.group(field)
+        return self._to_float(field, raw)
+
+    def _match(self, data: bytes):
+        match = self._regex.search(data)
+        if match is None:
+            raise ValueError(f"Не удалось распарсить {bytes(data)!r}")
+        return match
+
+    def _to_float(self, field: str, raw: bytes) -> float:
+        return float(raw) * self.scale.get(field, 1.0)
+
+
+class StructParser:
+    """Бинарный кадр фиксированного формата (модуль struct).
+
+    Терминатора у такого кадра нет (байт \r может оказаться внутри
+    значения), поэтому он читается по длине: frame_size — заголовок
+    offset + данные формата, либо явно заданная длина size (с хвостом:
+    контрольной суммой, терминатором).
+    """
+
+    def __init__(self, fmt: str, fields=None, offset: int = 0, scale: Optional[Dict[str, float]] = None,
+                 size: Optional[int] = None):
+        self._struct = struct.Struct(fmt)
+        count = len(self._struct.unpack(bytes(self._struct.size)))
+        self.fields = tuple(fields) if fields else tuple(f"f{i}" for i in range(count))
+        self.offset = offset
+        self.scale = scale or {}
+        self.frame_size = max(size or 0, offset + self._struct.size)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+
+    def parse(self, data: bytes) -> Dict[str, float]:
+        values = self._unpack(data)
+        return {name: values[i] * self.scale.get(name, 1.0) for name, i in self._index.items()}
+
+    def value(self, data: bytes, field: Optional[str] = None) -> float:
+        name = field or self.fields[0]
+        try:
+            i = self._index[name]
+        except KeyError:
+            raise ValueError(f"Нет поля {name!r} в формате {self._struct.format}") from None
+        return self._unpack(data)[i] * self.scale.get(name, 1.0)
+
+    def _unpack(self, data: bytes):
+        try:
+            return self._struct.unpack_from(data, self.offset)
+        except struct.error as e:
+            raise ValueError(f"Не удалось распарсить {bytes(data)!r}: {e}") from None
+
+
+def compile_spec(spec):
+    """Спецификация (JSON-строка или dict) → объект разбора."""
+    if not spec:
+        return GenericParser()
+    if isinstance(spec, str):
+        spec = json.loads(spec)
+
+    kind = spec.get("type", "generic")
+    if kind == "generic":
+        return GenericParser()
+    if kind == "slice":
+        return SliceParser(spec["start"], spec.get("end"), spec.get("scale", 1.0))
+    if kind == "regex":
+        return RegexParser(spec["pattern"], spec.get("scale"))
+    if kind == "struct":
+        return StructParser(
+            spec["format"], spec.get("fields"), spec.get("offset", 0), spec.get("scale"), spec.get("size"),
+        )
+    raise ValueError(f"Неизвестный тип разбора: {kind}")
+
+
+class BoundParser:
+    """Разбор конкретного параметра: объект разбора + выбранное поле."""
+
+    __slots__ = ("parser", "field")
+
+    def __init__(self, parser, field: Optional[str] = None):
+        self.parser = parser
+        self.field = field
+
+    def __call__(self, data: bytes) -> float:
+        return self.parser.value(data, self.field)
+
+    def pick(self, values: Dict[str, float]) -> float:
+        """Значение параметра из результата parse() — когда один ответ
+        разбирается для нескольких параметров."""
+        name = self.field or self.parser.fields[0]
+        try:
+            return values[name]
+        except KeyError:
+            raise ValueError(f"Нет поля {name!r} в ответе") from None
+
+
+class ParserRegistry:
+    """Реестр скомпилированных разборов по типу устройства.
+
+    Спецификация параметра имеет приоритет над спецификацией его типа
+    устройства. Скомпилированные объекты (вместе с полем по умолчанию из
+    спецификации) кешируются по (тип, спецификация), поэтому параметры с
+    одинаковым форматом делят один объект.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[tuple, Tuple[object, Optional[str]]] = {}
+
+    def for_parameter(self, device_type, param) -> BoundParser:
+        spec = getattr(param, "parse_spec", None) or getattr(device_type, "parse_spec", None)
+        if isinstance(spec, dict):
+            spec = json.dumps(spec, sort_keys=True)
+        key = (getattr(device_type, "id", None), spec)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            field = json.loads(spec).get("field") if spec else None
+            compiled = self._compiled[key] = (compile_spec(spec), field)
+
+        parser, field = compiled
+        return BoundParser(parser, getattr(param, "parse_field", None) or field)
+
+    def invalidate(self, device_type_id: Optional[int] = None) -> None:
+        if device_type_id is None:
+            self._compiled.clear()
+            return
+        for key in [k for k in self._compiled if k[0] == device_type_id]:
+            del self._compiled[key]
+
+
+def legacy_parse(response: str) -> float:
+    """Прежний разбор DevicePoller._parse_response — для сравнения."""
+    clean = re.sub(r'[^\d\.\-]', ' ', response)
+    nums = re.findall(r'[-+]?\d*\.\d+|\d+', clean)
+    if not nums:
+        raise ValueError(f"Не удалось распарсить '{response}'")
+    return float(nums[0])
+
+
+def benchmark(number: int = 200_000) -> Dict[str, float]:
+    """Микробенчмарк: нс на разбор одного ответа для каждого способа."""
+    text_reply = b"T= 21.38 C\r"
+    binary_reply = struct.pack(">hH", 2138, 5550)
+    cases = {
+        "legacy (decode+re.sub+findall)": lambda: legacy_parse(text_reply.decode().strip()),
+        "generic (bytes, precompiled)": lambda p=GenericParser(): p.value(text_reply),
+        "slice": lambda p=SliceParser(3, 8): p.value(text_reply),
+        "regex (named group)": lambda p=RegexParser(r"T=\s*(?P<t>-?\d+\.\d+)"): p.value(text_reply, "t"),
+        "struct": lambda p=StructParser(">hH", ["t", "h"], scale={"t": 0.01}): p.value(binary_reply, "t"),
+    }
+    return {
+        name: timeit.timeit(fn, number=number) / number * 1e9
+        for name, fn in cases.items()
+    }
+
+
+if __name__ == "__main__":
+    for name, ns in benchmark().items():
+        print(f"{name:<34} {ns:8.1f} нс/ответ")
@@ -1,32 +1,115 @@
 import asyncio
 import logging
+import time
+from contextlib import suppress
 from typing import Dict
 
-from core.service.connection_checker import check_device_connection
-from core.service.device_poller import DevicePoller
+from core.service.adaptive import CircuitBreaker
+from core.service.compression import Compressor
+from core.service.connection_checker import ReachabilityScanner
+from core.service.connection_manager import ConnectionManager
+from core.service.device_poller import DevicePoller, forget_device_metrics
+from core.service.loop_watchdog import SAMPLING, LoopProfiler, LoopWatchdog
+from core.service.parsers import ParserRegistry
+from core.service.reading_bus import ReadingBus
+from core.service.scheduler import PollScheduler
+from core.service.threshold_engine import ThresholdEngine
+from infrastructure.db.config_cache import ConfigCache
 from infrastructure.db.models.models import Device
-from infrastructure.db.repositories.repositories import DeviceRepository
+from infrastructure.metrics import REGISTRY
 
 logger = logging.getLogger("polling_service")
 
+SCAN_SECONDS = REGISTRY.histogram(
+    "reinhardt_connection_scan_seconds", "Время проверки связи со всеми устройствами")
+CHECKS = REGISTRY.counter(
+    "reinhardt_connection_checks_total", "Проверки связи по результату", ["device_id", "result"])
+
 
 class PollingService:
-    def __init__(self, db_session, update_interval: int = 60):
-        self.db_session = db_session
+    # Периоды проверки связи с устройством, с (проверки идут общим
+    # проходом раз в RETRY_DELAY по устройствам, у которых подошёл срок)
+    CHECK_INTERVAL = 30
+    RETRY_DELAY = 5
+    MAX_RETRIES = 3
+    # Предел задержки между пробами недоступного устройства, с
+    MAX_BACKOFF = 300
+    # Класс опросчика (переопределяется, например, в бенчмарке)
+    poller_class = DevicePoller
+    # Пауза перед перенастройкой опроса: строки одной транзакции приходят
+    # отдельными уведомлениями — применяем их одним проходом, с
+    RECONFIGURE_DELAY = 0.5
+
+    def __init__(
+            self,
+            config_cache: ConfigCache,
+            update_interval: int = 60,
+            measurement_writer=None,
+            scheduler: PollScheduler = None,
+            poll_interval: float = 5.0,
+            bus: ReadingBus = None,
+            adaptive: bool = True,
+            max_silence: float = 300.0,
+            stall_threshold: float = 0.25,
+            check_concurrency: int = 256,
+            profile_dir: str = ".",
+            profile_mode: str = SAMPLING,
+    ):
+        # Конфигурация устройств/параметров/порогов в памяти; сессии БД
+        # берутся источником кеша на каждый запрос, общей сессии нет
+        self.config_cache = config_cache
+        self.measurement_writer = measurement_writer
+        # Рассылка показаний подписчикам (GUI); None — без рассылки
+        self.bus = bus
         self.update_interval = update_interval
+        self.poll_interval = poll_interval
+        # Подстройка периода опроса под динамику значений
+        self.adaptive = adaptive
         self.active_devices: Dict[int, Device] = {}
         self.device_status: Dict[int, bool] = {}
         self._is_running = False
-        self._task = None
-        self._connection_tasks: Dict[int, asyncio.Task] = {}
+        # Автоматы отключения на устройство: опроса (закрывается только
+        # успешным циклом опроса) и связи (пауза между проверками линии).
+        # Связь есть — ещё не значит, что устройство отвечает
+        self.breakers: Dict[int, CircuitBreaker] = {}
+        self.link_breakers: Dict[int, CircuitBreaker] = {}
         self._device_pollers: Dict[int, DevicePoller] = {}
+        # Общий пул сокетов для проверки связи и опроса
+        self.connections = ConnectionManager()
+        # Проверка связи всех устройств одним проходом с общим ограничением
+        self.scanner = ReachabilityScanner(self.connections, max_concurrency=check_concurrency)
+        # Срок следующей проверки связи устройства (time.monotonic)
+        self._next_check: Dict[int, float] = {}
+        # Скомпилированные разборы ответов, общие для всех опросчиков
+        self.parsers = ParserRegistry()
+        # Сжатие рядов показаний перед записью (настройки — в строках Parameter)
+        self.compressor = Compressor(default_max_silence=max_silence)
+        # Все активные пороги в одном векторном движке
+        self.threshold_engine = ThresholdEngine()
+        # Все периодические задачи (синхронизация, проверки связи, опрос)
+        self.scheduler = scheduler or PollScheduler()
+        # Сторож цикла событий: задержка, стеки остановок, профилирование по запросу
+        self.watchdog = LoopWatchdog(threshold=stall_threshold)
+        self.profiler = LoopProfiler(self.watchdog, directory=profile_dir, mode=profile_mode)
+        self._watchdog_task = None
+        self._unregister_metrics = None
+        # Перенастройка опроса по изменениям конфигурации
+        self._reconfigure_task = None
+        self._reconfigure_pending = False
+        self._reload_task = None
 
     async def start(self):
         if self._is_running:
             return
 
         self._is_running = True
-        self._task = asyncio.create_task(self._run_polling_loop())
+        self.config_cache.subscribe(self._on_config_change)
+        await self.config_cache.start()
+        self.scheduler.add(("sync",), self._sync_devices, self.update_interval, phase=0)
+        self.scheduler.add(("scan",), self._scan_devices, self.RETRY_DELAY, phase=0)
+        await self.scheduler.start()
+        self._watchdog_task = asyncio.create_task(self.watchdog.run())
+        self._unregister_metrics = REGISTRY.add_collector(self.collect_metrics)
         logger.info("Сервис опроса запущен")
 
     async def stop(self):
@@ -34,58 +117,229 @@ class PollingService:
             return
 
         self._is_running = False
+        for task in (self._reconfigure_task, self._reload_task):
+            if task is not None and not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        if self.profiler.active:
+            self.profiler.stop()
+        if self._watchdog_task is not None:
+            self._watchdog_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._watchdog_task
+            self._watchdog_task = None
+        if self._unregister_metrics is not None:
+            self._unregister_metrics()
+            self._unregister_metrics = None
 
-        # Отменяем все активные задачи
-        for task in self._connection_tasks.values():
-            task.cancel()
+        # Останавливаем планировщик вместе со всеми задачами
+        await self.scheduler.stop()
 
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        for poller in self._device_pollers.values():
+            await poller.stop()
+        # Отложенные точки рядов — в запись, чтобы ряды не обрывались
+        self._write_rows(self.compressor.flush())
+        await self.connections.close_all()
+        await self.config_cache.stop()
         logger.info("Сервис опроса остановлен")
 
-    async def _run_polling_loop(self):
-        while self._is_running:
-            try:
-                # Получаем список активных устройств
-                device_repo = DeviceRepository(self.db_session)
-                active_devices = device_repo.get_devices_by_is_enable_true()
-
-                # Обновляем список активных устройств
-                current_device_ids = {d.id for d in active_devices}
-                self.active_devices = {d.id: d for d in active_devices}
-
-                # Запускаем задачи проверки подключения для новых устройств
-                for device_id, device in self.active_devices.items():
-                    if device_id not in self._connection_tasks or self._connection_tasks[device_id].done():
-                        self._connection_tasks[device_id] = asyncio.create_task(
-                            self._monitor_device_connection(device)  # Проверка подключения только один раз
-                        )
+    def toggle_profiling(self):
+        """Включает/выключает профилирование цикла (например, по сигналу);
+        при выключении возвращает путь к профилю."""
+        return self.profiler.toggle()
+
+    def toggle_slow_callbacks(self) -> bool:
+        """Включает/выключает отчёт asyncio о медленных колбэках."""
+        enabled = not self.watchdog.slow_callback_reporting
+        self.watchdog.set_slow_callback_reporting(enabled)
+        logger.warning(f"Отчёт о медленных колбэках {'включён' if enabled else 'выключен'}")
+        return enabled
+
+    def collect_metrics(self):
+        """Счётчики компонентов сервиса на момент выдачи /metrics."""
+        scheduler = self.scheduler.stats()
+        yield ("reinhardt_scheduler_jobs", "gauge", "Задачи планировщика",
+               [({}, scheduler["jobs"])])
+        yield ("reinhardt_scheduler_running", "gauge", "Выполняющиеся задачи планировщика",
+               [({}, scheduler["running"])])
+        yield ("reinhardt_scheduler_runs_total", "counter", "Выполненные задачи планировщика",
+               [({}, scheduler["runs"])])
+        yield ("reinhardt_scheduler_overruns_total", "counter", "Сроки, пропущенные из-за перегрузки",
+               [({}, scheduler["overruns"])])
+        yield ("reinhardt_scheduler_skipped_total", "counter",
+               "Запуски, пропущенные из-за незаконченного предыдущего",
+               [({}, scheduler["skipped"])])
+        yield ("reinhardt_device_up", "gauge", "Связь с устройством по последней проверке",
+               [({"device_id": str(d)}, float(up)) for d, up in list(self.device_status.items())])
+        yield ("reinhardt_breaker_open", "gauge", "Автомат отключения устройства открыт",
+               [({"device_id": str(d)}, float(b.is_open)) for d, b in list(self.breakers.items())])
+        scanner = self.scanner.stats()
+        yield ("reinhardt_connection_probes_total", "counter", "Пробы подключения при проверке связи",
+               [({}, scanner["probes"])])
+        yield ("reinhardt_connection_probe_timeouts_total", "counter", "Пробы, не дождавшиеся подключения",
+               [({}, scanner["timeouts"])])
+        compression = self.compressor.stats()
+        yield ("reinhardt_compressor_received_total", "counter", "Показания на входе сжатия",
+               [({}, compression["received"])])
+        yield ("reinhardt_compressor_forwarded_total", "counter", "Показания, переданные после сжатия",
+               [({}, compression["forwarded"])])
 
-                # Удаляем задачи для неактивных устройств
-                for device_id in list(self._connection_tasks.keys()):
-                    if device_id not in current_device_ids:
-                        self._connection_tasks[device_id].cancel()
-                        del self._connection_tasks[device_id]
-                        if device_id in self.device_status:
-                            del self.device_status[device_id]
+    def _on_config_change(self, table: str, payload: dict):
+        """Пороги поменялись — перестраиваем движок (состояние тревог
+        сохраняется); устройства, типы или параметры — перенастраиваем опрос."""
+        if table in ("threshold", "*"):
+            self.threshold_engine.load(self.config_cache.iter_thresholds())
+        if table == "parameter":
+            rows = [r for r in (payload.get("new"), payload.get("old")) if r]
+            for device_type_id in {r["device_type_id"] for r in rows}:
+                self.parsers.invalidate(device_type_id)
+        elif table == "*":
+            self.parsers.invalidate()
+        if table in ("device", "parameter", "*"):
+            self._reconfigure_pending = True
+            if self._is_running and (self._reconfigure_task is None or self._reconfigure_task.done()):
+                self._reconfigure_task = asyncio.create_task(self._reconfigure_loop())
 
-                await asyncio.sleep(self.update_interval)
+    async def _reconfigure_loop(self):
+        while self._reconfigure_pending:
+            await asyncio.sleep(self.RECONFIGURE_DELAY)
+            self._reconfigure_pending = False
+            try:
+                await self.reconfigure()
             except Exception as e:
-                logger.error(f"Ошибка в основном цикле опроса: {e}")
-                await asyncio.sleep(5)
+                logger.error(f"Ошибка перенастройки опроса: {e}")
+
+    async def reconfigure(self) -> dict:
+        """Сверяет опрос с кешем конфигурации без перезапуска процесса.
+
+        Новые устройства попадают в ближайшую проверку связи, снятые
+        останавливаются, работающим опросчикам изменения применяются на
+        месте (DevicePoller.reconfigure): соединения и фазы опроса остаются.
+        Заново запускается только опрос устройства, сменившего адрес.
+        """
+        await self._sync_devices()
+        summary = {"reconfigured": 0, "moved": 0}
+        for device_id, poller in list(self._device_pollers.items()):
+            device = self.active_devices.get(device_id)
+            if device is None:
+                continue
+            if (device.ip_address, device.port) != (poller.device.ip_address, poller.device.port):
+                # Другой порт MOXA: опросчик создаст ближайшая проверка связи
+                await self._drop_poller(device_id)
+                self.device_status.pop(device_id, None)
+                self._next_check[device_id] = 0.0
+                summary["moved"] += 1
+                continue
+            changes = poller.reconfigure(device)
+            if changes["added"] or changes["removed"] or changes["groups_added"] or changes["groups_removed"]:
+                summary["reconfigured"] += 1
+                logger.info(
+                    f"{device.name}: параметров +{len(changes['added'])}/-{len(changes['removed'])}, "
+                    f"групп опроса +{changes['groups_added']}/-{changes['groups_removed']}"
+                )
+        if summary["moved"]:
+            self.scheduler.set_interval(("scan",), self.RETRY_DELAY, reschedule=True)
+        return summary
+
+    async def reload_config(self) -> dict:
+        """Команда администратора: перечитать конфигурацию из БД и применить."""
+        await self.config_cache.load_all()
+        return await self.reconfigure()
+
+    def request_reload(self) -> None:
+        """reload_config() в фоне (например, по SIGHUP)."""
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        self._reload_task = asyncio.create_task(self.reload_config())
+        self._reload_task.add_done_callback(self._on_reloaded)
 
-    async def _monitor_device_connection(self, device):
-        """Проверка подключения и запуск опроса для каждого устройства"""
-        retry_count = 0
-        max_retries = 3
-        retry_delay = 5
+    @staticmethod
+    def _on_reloaded(task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"Ошибка перечитывания конфигурации: {task.exception()}")
+        else:
+            logger.warning(f"Конфигурация перечитана: {task.result()}")
+
+    async def _sync_devices(self):
+        """Сверка списка активных устройств с задачами планировщика."""
+        # Получаем список активных устройств из кеша конфигурации
+        active_devices = self.config_cache.get_enabled_devices()
+
+        # Обновляем список активных устройств
+        current_device_ids = {d.id for d in active_devices}
+        previous_device_ids = set(self.active_devices)
+        self.active_devices = {d.id: d for d in active_devices}
+
+        # Новые устройства проверяются ближайшим проходом
+        if current_device_ids - previous_device_ids:
+            self.scheduler.set_interval(("scan",), self.RETRY_DELAY, reschedule=True)
 
+        # Снимаем неактивные устройства
+        for device_id in previous_device_ids - current_device_ids:
+            self._next_check.pop(device_id, None)
+            self.device_status.pop(device_id, None)
+            self.breakers.pop(device_id, None)
+            self.link_breakers.pop(device_id, None)
+            self._write_rows(self.compressor.forget(device_id))
+            forget_device_metrics(device_id)
+            CHECKS.remove(device_id, "ok")
+            CHECKS.remove(device_id, "fail")
+            await self._drop_poller(device_id)
+
+    async def _drop_poller(self, device_id: int) -> None:
+        """Останавливает и забывает опросчик. Сокет закрывается, только если
+        линией (ip, port) не пользуется больше ни одно активное устройство."""
+        poller = self._device_pollers.pop(device_id, None)
+        if poller is None:
+            return
+        await poller.stop()
+        endpoint = (poller.device.ip_address, poller.device.port)
+        if any((d.ip_address, d.port) == endpoint for d in self.active_devices.values()):
+            return
+        await self.connections.release(*endpoint)
+        self.scanner.forget(endpoint)
+
+    def _write_rows(self, rows) -> None:
+        if self.measurement_writer is not None:
+            for row in rows:
+                self.measurement_writer.put(*row)
+
+    def _breaker(self, device_id: int, breakers: Dict[int, CircuitBreaker] = None) -> CircuitBreaker:
+        breakers = self.breakers if breakers is None else breakers
+        breaker = breakers.get(device_id)
+        if breaker is None:
+            breaker = breakers[device_id] = CircuitBreaker(
+                failure_threshold=self.MAX_RETRIES,
+                base_delay=self.RETRY_DELAY,
+                max_delay=self.MAX_BACKOFF,
+            )
+        return breaker
+
+    async def _scan_devices(self):
+        """Проход проверки связи: все устройства, у которых подошёл срок, — одним вызовом."""
+        now = time.monotonic()
+        due = [
+            device for device_id, device in self.active_devices.items()
+            if self._next_check.get(device_id, 0.0) <= now
+        ]
+        if not due:
+            return
+        started = time.perf_counter()
+        # Проверка подключения к MOXA по общим сокетам
+        status = await self.scanner.scan(due)
+        SCAN_SECONDS.observe(time.perf_counter() - started)
+        for device in due:
+            # Устройство могли снять с опроса, пока шла проверка
+            if device.id in self.active_devices:
+                await self._apply_device_status(device, status.get(device.id, False))
+
+    async def _apply_device_status(self, device, is_connected: bool):
+        """Запуск/остановка опроса устройства по результату проверки связи"""
         try:
-            is_connected = await check_device_connection(device)  # Проверка подключение к MOXA
+            CHECKS.labels(device.id, "ok" if is_connected else "fail").inc()
 
             # Обновляем статус устройства
             current_status = self.device_status.get(device.id, None)
@@ -98,26 +352,44 @@ class PollingService:
                 if is_connected:
                     # Создаем и запускаем DevicePoller
                     if device.id not in self._device_pollers:
-                        self._device_pollers[device.id] = DevicePoller(device, self.db_session)
+                        self._device_pollers[device.id] = self.poller_class(
+                            device, self.config_cache, self.scheduler,
+                            poll_interval=self.poll_interval,
+                            connections=self.connections,
+                            measurement_writer=self.measurement_writer,
+                            parsers=self.parsers,
+                            threshold_engine=self.threshold_engine,
+                            bus=self.bus,
+                            breaker=self._breaker(device.id),
+                            adaptive=self.adaptive,
+                            compressor=self.compressor,
+                        )
                     await self._device_pollers[device.id].start()
                 else:
                     # Останавливаем DevicePoller
                     if device.id in self._device_pollers:
                         await self._device_pollers[device.id].stop()
 
-            # Если устройство подключено, то сбрасываем счетчик и ждем перед следующим циклом
+            # Подключено — проверяем редко; нет — проверки сначала раз в
+            # RETRY_DELAY, а после MAX_RETRIES неудач подряд всё реже (каждая
+            # проверка — проба полуоткрытого автомата связи). Автомат опроса
+            # здесь не трогаем: его закрывает только успешный опрос
+            breaker = self._breaker(device.id, self.link_breakers)
             if is_connected:
-                retry_count = 0
-                await asyncio.sleep(30)  # Ждем некоторое время перед следующим опросом
+                breaker.record_success()
+                self._next_check[device.id] = time.monotonic() + self.CHECK_INTERVAL
             else:
-                retry_count += 1
-                if retry_count >= max_retries:
-                    logger.warning(f"Устройство {device.name} недоступно после {max_retries} попыток")
+                was_open = breaker.is_open
+                delay = breaker.record_failure()
+                if breaker.is_open and not was_open:
+                    logger.warning(
+                        f"Устройство {device.name} недоступно после {breaker.failures} попыток, "
+                        f"следующая проверка через {delay:.0f} с"
+                    )
                     if device.id in self._device_pollers:
                         await self._device_pollers[device.id].stop()
                         del self._device_pollers[device.id]
-                await asyncio.sleep(retry_delay)
+                self._next_check[device.id] = time.monotonic() + delay
 
         except Exception as e:
             logger.error(f"Ошибка при проверке подключения к {device.name}: {e}")
-            await asyncio.sleep(retry_delay)
@@ -0,0 +1,93 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+logger = logging.getLogger("reading_bus")
+
+# Показание: (device_id, parameter_id, timestamp, value, status) — тот же
+# кортеж, что уходит в MeasurementWriter и агрегатору шардов
+Reading = Tuple[int, int, float, float, str]
+
+# Темы шины
+READINGS = "readings"
+EVENTS = "events"
+
+
+class Event(NamedTuple):
+    """Событие журнала (смена статуса параметра)."""
+    timestamp: float
+    device_id: int
+    parameter_id: int
+    status: str
+    value: float
+    message: str
+
+
+class ReadingBus:
+    """Внутрипроцессная рассылка показаний и событий подписчикам.
+
+    Опросчик публикует пачку показаний за цикл (тема READINGS) и смены
+    статуса (тема EVENTS); подписчики вызываются синхронно в потоке
+    публикации, поэтому должны быть дешёвыми (например, LatestValues,
+    который только запоминает последнее значение).
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[list], None]]] = defaultdict(list)
+        self.published: Dict[str, int] = defaultdict(int)
+
+    def subscribe(self, callback: Callable[[list], None], topic: str = READINGS) -> Callable[[], None]:
+        """callback(batch) на каждую пачку темы; возвращает функцию отписки."""
+        subscribers = self._subscribers[topic]
+        subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in subscribers:
+                subscribers.remove(callback)
+
+        return unsubscribe
+
+    def publish(self, batch: list, topic: str = READINGS) -> None:
+        if not batch:
+            return
+        self.published[topic] += len(batch)
+        for callback in tuple(self._subscribers[topic]):
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика шины ({topic}): {e}")
+
+    def put(self, device_id: int, parameter_id: int, timestamp: float, value, status: str) -> None:
+        """Одиночное показание — тот же интерфейс, что у MeasurementWriter."""
+        self.publish([(device_id, parameter_id, timestamp, value, status)])
+
+
+class LatestValues:
+    """Подписчик, схлопывающий показания по (устройство, параметр).
+
+    Между двумя drain() хранится только последнее показание каждой пары,
+    поэтому потребитель (GUI) получает не больше одной правки на ячейку
+    за кадр независимо от частоты опроса. Потокобезопасен: публикация и
+    drain() могут идти из разных потоков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, int], Reading] = {}
+        self.received = 0
+        self.coalesced = 0
+
+    def __call__(self, batch: List[Reading]) -> None:
+        with self._lock:
+            pending = self._pending
+            before = len(pending)
+            for row in batch:
+                pending[(row[0], row[1])] = row
+            self.received += len(batch)
+            self.coalesced += len(batch) - (len(pending) - before)
+
+    def drain(self) -> Dict[Tuple[int, int], Reading]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
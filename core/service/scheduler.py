@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+from contextlib import suppress
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("scheduler")
+
+
+class _Job:
+    __slots__ = ("key", "callback", "interval", "deadline", "generation", "running")
+
+    def __init__(self, key, callback, interval: float, deadline: float):
+        self.key = key
+        self.callback = callback
+        self.interval = interval
+        self.deadline = deadline
+        self.generation = 0
+        self.running = False
+
+
+class PollScheduler:
+    """Единый планировщик периодических задач опроса.
+
+    Все дедлайны лежат в одной куче (O(log N) на постановку и выборку),
+    задачи запускаются с фиксированной частотой (следующий срок считается
+    от предыдущего срока, а не от окончания работы), начальные фазы
+    размазываются случайным сдвигом, а число одновременно выполняемых
+    задач ограничено семафором.
+    """
+
+    def __init__(self, max_concurrency: int = 100, jitter: bool = True):
+        """
+        max_concurrency — сколько задач может выполняться одновременно
+        jitter          — случайная начальная фаза в пределах интервала
+        """
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+
+        self._jobs: Dict[Hashable, _Job] = {}
+        self._heap: List[Tuple[float, int, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        # Счётчики
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, key) -> bool:
+        return key in self._jobs
+
+    def add(
+            self,
+            key: Hashable,
+            callback: Callable[[], Awaitable],
+            interval: float,
+            phase: Optional[float] = None,
+    ) -> None:
+        """Регистрирует задачу; phase — задержка первого запуска, с."""
+        if key in self._jobs:
+            self.remove(key)
+        if phase is None:
+            phase = random.uniform(0, interval) if self.jitter else 0.0
+        job = _Job(key, callback, interval, self._now() + phase)
+        self._jobs[key] = job
+        self._push(job)
+
+    def remove(self, key: Hashable) -> None:
+        """Снимает задачу; запись в куче отбрасывается лениво."""
+        self._jobs.pop(key, None)
+
+    def set_interval(self, key: Hashable, interval: float, reschedule: bool = False) -> None:
+        """Меняет интервал задачи. По умолчанию новый интервал действует со
+        следующего срока; reschedule=True переносит ближайший срок."""
+        job = self._jobs.get(key)
+        if job is None or job.interval == interval:
+            return
+        if reschedule:
+            job.deadline = min(job.deadline, self._now() + interval)
+            self._push(job)
+        job.interval = interval
+
+    def get_interval(self, key: Hashable) -> Optional[float]:
+        job = self._jobs.get(key)
+        return job.interval if job else None
+
+    def time_to_next(self, key: Hashable) -> Optional[float]:
+        """Через сколько секунд ближайший запуск задачи (для переноса фазы)."""
+        job = self._jobs.get(key)
+        return max(0.0, job.deadline - self._now()) if job else None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Планировщик запущен (задач {len(self._jobs)}, параллельно до {self.max_concurrency})")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        for task in list(self._running):
+            task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info("Планировщик остановлен")
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self._jobs),
+            "running": len(self._running),
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+        }
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    def _push(self, job: _Job) -> None:
+        job.generation += 1
+        heapq.heappush(self._heap, (job.deadline, next(self._seq), job.generation, job.key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            # Ждём ближайший срок (или добавление более ранней задачи)
+            delay = None
+            while self._heap:
+                deadline, _, generation, key = self._heap[0]
+                job = self._jobs.get(key)
+                if job is None or job.generation != generation:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = deadline - self._now()
+                break
+
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                continue
+
+            heapq.heappop(self._heap)
+            self._reschedule(job)
+
+            if job.running:
+                # Предыдущий запуск ещё не закончился — не наслаиваем
+                self.skipped += 1
+                continue
+
+            await self._semaphore.acquire()
+            if self._jobs.get(job.key) is not job:
+                self._semaphore.release()
+                continue
+            job.running = True
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _reschedule(self, job: _Job) -> None:
+        """Фиксированная частота: следующий срок = предыдущий + интервал;
+        пропущенные из-за перегрузки сроки не догоняются."""
+        now = self._now()
+        next_deadline = job.deadline + job.interval
+        if next_deadline <= now:
+            missed = math.ceil((now - next_deadline) / job.interval)
+            self.overruns += missed
+            next_deadline += missed * job.interval
+        job.deadline = next_deadline
+        self._push(job)
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            await job.callback()
+            self.runs += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка задачи {job.key}: {e}")
+        finally:
+            job.running = False
+            self._semaphore.release()
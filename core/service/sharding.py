@@ -0,0 +1,203 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from contextlib import suppress
+from typing import Callable, List, Optional
+
+from core.service.reading_bus import EVENTS
+
+logger = logging.getLogger("sharding")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Консистентное хеширование устройств по шардам.
+
+    При изменении числа шардов переезжает только ~1/K устройств, а
+    включение/выключение устройства не трогает остальных.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = shards
+        points = sorted(
+            (_hash(f"shard-{shard}-{i}"), shard)
+            for shard in range(shards)
+            for i in range(replicas)
+        )
+        self._keys = [p[0] for p in points]
+        self._shards = [p[1] for p in points]
+
+    def shard_for(self, key) -> int:
+        idx = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._shards[idx]
+
+
+def shard_filter(shard: int, shards: int) -> Callable:
+    """Фильтр устройств для ConfigCache: только устройства своего шарда."""
+    ring = HashRing(shards)
+    return lambda device: ring.shard_for(device.id) == shard
+
+
+class QueueSink:
+    """Приёмник показаний в рабочем процессе.
+
+    Интерфейс как у MeasurementWriter.put: показания копятся пачкой и
+    уходят в межпроцессную очередь по размеру или по сроку. События
+    (подписчик темы EVENTS шины шарда) редки и уходят сразу, с пометкой
+    темы: (EVENTS, [Event, ...]).
+    """
+
+    def __init__(self, results, batch_size: int = 500, flush_interval: float = 0.2):
+        self.results = results
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch = []
+        self._task: Optional[asyncio.Task] = None
+
+    def put(self, device_id: int, parameter_id: int, timestamp: float, value, status: str) -> None:
+        self._batch.append((device_id, parameter_id, timestamp, value, status))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            batch, self._batch = self._batch, []
+            # Сериализация и запись в канал идут в фоновом потоке очереди
+            self.results.put(batch)
+
+    def put_events(self, events: list) -> None:
+        self.results.put((EVENTS, list(events)))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+
+class ShardSupervisor:
+    """Режим супервизора: K рабочих процессов со своим PollingService.
+
+    Устройства делятся между процессами консистентным хешем id (каждый
+    процесс фильтрует свой кеш конфигурации, поэтому включение и
+    выключение устройств перераспределяется само). Показания приходят
+    по очереди в единый агрегатор, который пишет их в БД и раздаёт
+    подписчикам шины bus (GUI); события шардов агрегатор публикует в тему
+    EVENTS той же шины. Упавшие процессы перезапускаются.
+    """
+
+    def __init__(
+            self,
+            shards: int,
+            worker_target: Callable,
+            measurement_writer=None,
+            check_interval: float = 5.0,
+            bus=None,
+    ):
+        """
+        shards             — число рабочих процессов
+        worker_target      — функция процесса: (shard, shards, results, stop_event)
+        measurement_writer — приёмник показаний в процессе-агрегаторе
+        check_interval     — период проверки живости процессов, с
+        bus                — шина показаний и событий процесса-агрегатора
+        """
+        self.shards = shards
+        self.worker_target = worker_target
+        self.measurement_writer = measurement_writer
+        self.check_interval = check_interval
+        self.bus = bus
+
+        self._ctx = mp.get_context("spawn")
+        self._results = None
+        self._stop_event = None
+        self._processes: List[Optional[mp.Process]] = [None] * shards
+        self._aggregator: Optional[threading.Thread] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+
+        # Счётчики
+        self.received = 0
+        self.events = 0
+        self.restarts = 0
+
+    async def start(self) -> None:
+        self._results = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._aggregator = threading.Thread(
+            target=self._aggregate, name="shard-aggregator", daemon=True
+        )
+        self._aggregator.start()
+        for shard in range(self.shards):
+            self._spawn(shard)
+        self._monitor_task = asyncio.create_task(self._monitor())
+        logger.info(f"Запущено {self.shards} процессов опроса")
+
+    async def stop(self, timeout: float = 15.0) -> None:
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._monitor_task
+        self._stop_event.set()
+        for proc in self._processes:
+            if proc is not None:
+                await asyncio.to_thread(proc.join, timeout)
+                if proc.is_alive():
+                    proc.terminate()
+        self._results.put(None)
+        await asyncio.to_thread(self._aggregator.join)
+        logger.info("Процессы опроса остановлены")
+
+    def _spawn(self, shard: int) -> None:
+        proc = self._ctx.Process(
+            target=self.worker_target,
+            args=(shard, self.shards, self._results, self._stop_event),
+            name=f"poller-shard-{shard}",
+            daemon=True,
+        )
+        proc.start()
+        self._processes[shard] = proc
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for shard, proc in enumerate(self._processes):
+                if proc is not None and not proc.is_alive():
+                    logger.warning(f"Процесс шарда {shard} завершился ({proc.exitcode}), перезапуск")
+                    self.restarts += 1
+                    self._spawn(shard)
+
+    def _aggregate(self) -> None:
+        while True:
+            try:
+                batch = self._results.get()
+            except (EOFError, OSError, queue.Empty):
+                break
+            if batch is None:
+                break
+            if isinstance(batch, tuple):
+                topic, events = batch
+                self.events += len(events)
+                if self.bus is not None:
+                    self.bus.publish(events, topic=topic)
+                continue
+            self.received += len(batch)
+            if self.measurement_writer is not None:
+                for row in batch:
+                    self.measurement_writer.put(*row)
+            if self.bus is not None:
+                self.bus.publish(batch)
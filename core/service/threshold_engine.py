@@ -0,0 +1,189 @@
+import logging
+from typing import Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger("threshold_engine")
+
+NO_THRESHOLD = -1
+OK = 0
+ALARM = 1
+
+STATUS_NAMES = {NO_THRESHOLD: "OK", OK: "OK", ALARM: "ALARM"}
+
+
+class Transition(NamedTuple):
+    device_id: int
+    parameter_id: int
+    status: str
+    value: float
+    timestamp: float
+
+
+def _pack(device_ids, parameter_ids) -> np.ndarray:
+    """Ключ пары (устройство, параметр) — одно int64."""
+    return (np.asarray(device_ids, dtype=np.int64) << 32) | np.asarray(parameter_ids, dtype=np.int64)
+
+
+class ThresholdEngine:
+    """Векторная оценка порогов с состоянием тревоги.
+
+    Активные пороги лежат в массивах NumPy, упорядоченных по ключу
+    (устройство, параметр); пачка показаний сопоставляется с ними через
+    searchsorted и оценивается за один проход. Поддерживаются:
+      - гистерезис: из тревоги возвращаемся, только войдя в диапазон
+        [low + h, high - h];
+      - подавление дребезга: смена статуса после debounce подряд идущих
+        показаний с новым статусом;
+      - скорость изменения: |Δvalue / Δt| > max_rate — тревога.
+    Наружу отдаются только смены статуса.
+    """
+
+    def __init__(self):
+        self._keys = np.empty(0, dtype=np.int64)
+        self._low = np.empty(0)
+        self._high = np.empty(0)
+        self._hysteresis = np.empty(0)
+        self._debounce = np.empty(0, dtype=np.int32)
+        self._max_rate = np.empty(0)
+        self._state = np.empty(0, dtype=np.int8)
+        self._pending = np.empty(0, dtype=np.int32)
+        self._last_value = np.empty(0)
+        self._last_ts = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, thresholds: Iterable) -> None:
+        """Перестраивает массивы по активным порогам, сохраняя состояние
+        тревоги для пар, которые остались."""
+        rows = sorted(
+            ((t.device_id << 32) | t.parameter_id, t) for t in thresholds
+        )
+        keys = np.fromiter((k for k, _ in rows), dtype=np.int64, count=len(rows))
+
+        def column(name, default, dtype=float):
+            return np.array(
+                [default if getattr(t, name, None) is None else getattr(t, name) for _, t in rows],
+                dtype=dtype,
+            )
+
+        low = column("low_value", -np.inf)
+        high = column("high_value", np.inf)
+        hysteresis = column("hysteresis", 0.0)
+        debounce = np.maximum(column("debounce", 1, np.int32), 1)
+        max_rate = column("max_rate", np.inf)
+
+        state = np.zeros(len(keys), dtype=np.int8)
+        pending = np.zeros(len(keys), dtype=np.int32)
+        last_value = np.full(len(keys), np.nan)
+        last_ts = np.full(len(keys), np.nan)
+
+        # Переносим состояние существующих пар
+        if len(self._keys) and len(keys):
+            idx = np.searchsorted(self._keys, keys)
+            idx = np.minimum(idx, len(self._keys) - 1)
+            kept = self._keys[idx] == keys
+            state[kept] = self._state[idx[kept]]
+            pending[kept] = self._pending[idx[kept]]
+            last_value[kept] = self._last_value[idx[kept]]
+            last_ts[kept] = self._last_ts[idx[kept]]
+
+        self._keys, self._low, self._high = keys, low, high
+        self._hysteresis, self._debounce, self._max_rate = hysteresis, debounce, max_rate
+        self._state, self._pending = state, pending
+        self._last_value, self._last_ts = last_value, last_ts
+        logger.debug(f"Загружено порогов: {len(keys)}")
+
+    def status(self, device_id: int, parameter_id: int) -> str:
+        slot = self._slot(device_id, parameter_id)
+        return STATUS_NAMES[NO_THRESHOLD if slot is None else int(self._state[slot])]
+
+    def proximity(self, device_ids, parameter_ids, values):
+        """Расстояние до ближайшей границы и ширина диапазона по каждому
+        показанию; без порога — (inf, nan)."""
+        values = np.asarray(values, dtype=float)
+        distance = np.full(len(values), np.inf)
+        span = np.full(len(values), np.nan)
+        if not len(self._keys) or not len(values):
+            return distance, span
+        keys = _pack(device_ids, parameter_ids)
+        idx = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        found = self._keys[idx] == keys
+        low, high = self._low[idx[found]], self._high[idx[found]]
+        v = values[found]
+        distance[found] = np.minimum(np.abs(v - low), np.abs(high - v))
+        with np.errstate(invalid="ignore"):
+            span[found] = high - low
+        return distance, span
+
+    def _slot(self, device_id: int, parameter_id: int) -> Optional[int]:
+        key = (device_id << 32) | parameter_id
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def evaluate(self, device_ids, parameter_ids, values, timestamps):
+        """Оценивает пачку показаний.
+
+        Возвращает (статусы, переходы): массив int8 (NO_THRESHOLD/OK/ALARM)
+        по каждому показанию и список Transition только для пар, у которых
+        сменился статус. Если пара встречается в пачке несколько раз,
+        состояние обновляется по последнему показанию.
+        """
+        values = np.asarray(values, dtype=float)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=float), values.shape)
+        keys = _pack(device_ids, parameter_ids)
+        statuses = np.full(len(values), NO_THRESHOLD, dtype=np.int8)
+        if not len(self._keys) or not len(values):
+            return statuses, []
+
+        idx = np.searchsorted(self._keys, keys)
+        idx = np.minimum(idx, len(self._keys) - 1)
+        found = self._keys[idx] == keys
+
+        # Последнее показание каждой пары в пачке
+        rows = np.flatnonzero(found)
+        slots = idx[rows]
+        _, last = np.unique(slots[::-1], return_index=True)
+        rows = rows[len(rows) - 1 - last]
+        slots = idx[rows]
+
+        v = values[rows]
+        ts = timestamps[rows]
+        low, high, h = self._low[slots], self._high[slots], self._hysteresis[slots]
+        state = self._state[slots]
+
+        enter = (v < low) | (v > high)
+        stay = ~((v >= low + h) & (v <= high - h))
+        raw = np.where(state == ALARM, stay, enter)
+
+        dt = ts - self._last_ts[slots]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.abs(v - self._last_value[slots]) / dt
+        raw |= (dt > 0) & (rate > self._max_rate[slots])
+
+        raw = raw.astype(np.int8)
+        changing = raw != state
+        pending = np.where(changing, self._pending[slots] + 1, 0)
+        flip = changing & (pending >= self._debounce[slots])
+        pending[flip] = 0
+
+        new_state = np.where(flip, raw, state).astype(np.int8)
+        self._state[slots] = new_state
+        self._pending[slots] = pending
+        self._last_value[slots] = v
+        self._last_ts[slots] = ts
+
+        # Статус каждого показания — статус пары после оценки
+        statuses[found] = self._state[idx[found]]
+
+        transitions = [
+            Transition(
+                int(self._keys[s] >> 32), int(self._keys[s] & 0xFFFFFFFF),
+                STATUS_NAMES[int(st)], float(val), float(t),
+            )
+            for s, st, val, t in zip(slots[flip], new_state[flip], v[flip], ts[flip])
+        ]
+        return statuses, transitions
@@ -0,0 +1,399 @@
+import asyncio
+import functools
+import json
+import logging
+from collections import defaultdict
+from contextlib import suppress
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from infrastructure.db.models.models import Device, Parameter, Threshold
+from infrastructure.db.repositories.async_repositories import (
+    AsyncDeviceRepository, AsyncParameterRepository, AsyncThresholdRepository
+)
+from infrastructure.db.repositories.repositories import (
+    DeviceRepository, ParameterRepository, ThresholdRepository
+)
+from infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger("config_cache")
+
+NOTIFY_CHANNEL = "reinhardt_config"
+
+# Триггеры, публикующие изменения конфигурации в канал NOTIFY_CHANNEL
+TRIGGERS_SQL = f"""
+CREATE OR REPLACE FUNCTION reinhardt_notify_config() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{NOTIFY_CHANNEL}', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'new', CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE to_jsonb(NEW) END,
+        'old', CASE WHEN TG_OP = 'INSERT' THEN NULL ELSE to_jsonb(OLD) END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+DROP TRIGGER IF EXISTS reinhardt_notify_{table} ON {table};
+CREATE TRIGGER reinhardt_notify_{table}
+    AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION reinhardt_notify_config();
+"""
+    for table in ("device_type", "device", "parameter", "threshold")
+)
+
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "reinhardt_db_query_seconds", "Время загрузки конфигурации репозиториями", ["query"])
+
+
+def _timed(method):
+    """Замер времени метода источника конфигурации (с ожиданием пула)."""
+    histogram = QUERY_SECONDS.labels(method.__name__)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        with histogram.time():
+            return await method(*args, **kwargs)
+
+    return wrapper
+
+
+def install_triggers(engine) -> None:
+    """Создаёт триггеры NOTIFY на таблицах конфигурации."""
+    with engine.begin() as conn:
+        conn.execute(text(TRIGGERS_SQL))
+
+
+class SyncConfigSource:
+    """Загрузка конфигурации синхронными репозиториями в пуле потоков."""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    @_timed
+    async def fetch_all(self):
+        return await self.executor.run(self._fetch_all)
+
+    @_timed
+    async def fetch_device(self, device_id: int) -> Optional[Device]:
+        return await self.executor.run(
+            lambda s: DeviceRepository(s).get_device_by_id(device_id)
+        )
+
+    @_timed
+    async def fetch_parameters(self, device_type_id: int) -> List[Parameter]:
+        return await self.executor.run(
+            lambda s: ParameterRepository(s).get_parameters_by_device_type(device_type_id)
+        )
+
+    @_timed
+    async def fetch_thresholds(self, device_id: int) -> List[Threshold]:
+        return await self.executor.run(
+            lambda s: ThresholdRepository(s).get_active_thresholds_by_device_id(device_id)
+        )
+
+    @staticmethod
+    def _fetch_all(session):
+        return (
+            DeviceRepository(session).get_devices_by_is_enable_true(),
+            ParameterRepository(session).get_all_parameters(),
+            ThresholdRepository(session).get_all_active_thresholds(),
+        )
+
+
+class AsyncConfigSource:
+    """Загрузка конфигурации асинхронными репозиториями (AsyncPostgresDB)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    @_timed
+    async def fetch_all(self):
+        return await self.db.run(self._fetch_all)
+
+    @_timed
+    async def fetch_device(self, device_id: int) -> Optional[Device]:
+        return await self.db.run(
+            lambda s: AsyncDeviceRepository(s).get_device_by_id(device_id)
+        )
+
+    @_timed
+    async def fetch_parameters(self, device_type_id: int) -> List[Parameter]:
+        return await self.db.run(
+            lambda s: AsyncParameterRepository(s).get_parameters_by_device_type(device_type_id)
+        )
+
+    @_timed
+    async def fetch_thresholds(self, device_id: int) -> List[Threshold]:
+        return await self.db.run(
+            lambda s: AsyncThresholdRepository(s).get_active_thresholds_by_device_id(device_id)
+        )
+
+    @staticmethod
+    async def _fetch_all(session):
+        return (
+            await AsyncDeviceRepository(session).get_devices_by_is_enable_true(),
+            await AsyncParameterRepository(session).get_all_parameters(),
+            await AsyncThresholdRepository(session).get_all_active_thresholds(),
+        )
+
+
+class ConfigCache:
+    """Процессный кеш конфигурации опроса.
+
+    Держит включённые устройства, списки параметров по типу устройства и
+    карты порогов по устройству. Обновляется точечно по уведомлениям
+    PostgreSQL LISTEN/NOTIFY; периодическая полная перезагрузка страхует
+    от потерянных уведомлений. Горячий путь опроса обращается только к
+    словарям в памяти, а загрузка идёт через source (асинхронные
+    репозитории или пул потоков) и не блокирует цикл событий.
+    """
+
+    def __init__(
+            self,
+            source,
+            engine=None,
+            full_refresh_interval: float = 300.0,
+            device_filter: Optional[Callable[[Device], bool]] = None,
+    ):
+        """
+        source                — SyncConfigSource или AsyncConfigSource
+        engine                — движок SQLAlchemy для LISTEN (None — без уведомлений)
+        full_refresh_interval — период полной перезагрузки, с (0 — отключить)
+        device_filter         — какие устройства держать в кеше (шард процесса)
+        """
+        self.source = source
+        self.engine = engine
+        self.full_refresh_interval = full_refresh_interval
+        self.device_filter = device_filter
+
+        self.devices: Dict[int, Device] = {}
+        self.parameters: Dict[int, List[Parameter]] = {}
+        self.thresholds: Dict[int, Dict[int, Threshold]] = {}
+
+        self._listeners: List[Callable[[str, dict], None]] = []
+        self._listen_conn = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._relisten_task: Optional[asyncio.Task] = None
+        # Уведомления применяются по одному, в порядке прихода: строка
+        # уведомления или None — полная перезагрузка
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._worker_task: Optional[asyncio.Task] = None
+        # Сериализует изменения кеша (обработчик очереди и прямые вызовы)
+        self._lock = asyncio.Lock()
+
+    # --- Чтение (горячий путь) ---
+
+    def get_enabled_devices(self) -> List[Device]:
+        return list(self.devices.values())
+
+    def get_device(self, device_id: int) -> Optional[Device]:
+        return self.devices.get(device_id)
+
+    def get_parameters(self, device_type_id: int) -> List[Parameter]:
+        return self.parameters.get(device_type_id, [])
+
+    def get_threshold_map(self, device_id: int) -> Dict[int, Threshold]:
+        """Словарь parameter_id → Threshold для устройства."""
+        return self.thresholds.get(device_id, {})
+
+    def iter_thresholds(self):
+        """Все активные пороги кешированных данных."""
+        for thr_map in self.thresholds.values():
+            yield from thr_map.values()
+
+    def subscribe(self, callback: Callable[[str, dict], None]) -> None:
+        """Подписка на изменения: callback(table, payload).
+        После полной перезагрузки table == "*"."""
+        self._listeners.append(callback)
+
+    def _notify(self, table: str, payload: dict) -> None:
+        for callback in self._listeners:
+            try:
+                callback(table, payload)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика кеша конфигурации: {e}")
+
+    # --- Загрузка ---
+
+    async def load_all(self) -> None:
+        """Полная перезагрузка конфигурации одним проходом."""
+        async with self._lock:
+            await self._load_all()
+
+    async def _load_all(self) -> None:
+        devices, parameters, thresholds = await self.source.fetch_all()
+
+        by_type = defaultdict(list)
+        for param in parameters:
+            by_type[param.device_type_id].append(param)
+        by_device = defaultdict(dict)
+        for thr in thresholds:
+            by_device[thr.device_id][thr.parameter_id] = thr
+
+        self.devices = {d.id: d for d in devices if self._accepts(d)}
+        self.parameters = dict(by_type)
+        self.thresholds = dict(by_device)
+        logger.info(
+            f"Конфигурация загружена: устройств {len(self.devices)}, "
+            f"параметров {len(parameters)}, порогов {len(thresholds)}"
+        )
+        self._notify("*", {})
+
+    def _accepts(self, device: Device) -> bool:
+        return self.device_filter is None or self.device_filter(device)
+
+    async def reload_device(self, device_id: int) -> None:
+        device = await self.source.fetch_device(device_id)
+        if device is not None and device.is_enable and self._accepts(device):
+            self.devices[device_id] = device
+        else:
+            self.devices.pop(device_id, None)
+
+    async def reload_parameters(self, device_type_id: int) -> None:
+        params = await self.source.fetch_parameters(device_type_id)
+        if params:
+            self.parameters[device_type_id] = params
+        else:
+            self.parameters.pop(device_type_id, None)
+
+    async def reload_thresholds(self, device_id: int) -> None:
+        thresholds = await self.source.fetch_thresholds(device_id)
+        if thresholds:
+            self.thresholds[device_id] = {t.parameter_id: t for t in thresholds}
+        else:
+            self.thresholds.pop(device_id, None)
+
+    async def apply_change(self, table: str, payload: dict) -> None:
+        """Точечно обновляет кеш по уведомлению об изменении строки."""
+        async with self._lock:
+            await self._apply_change(table, payload)
+
+    async def _apply_change(self, table: str, payload: dict) -> None:
+        rows = [r for r in (payload.get("new"), payload.get("old")) if r]
+
+        if table == "device":
+            for device_id in {r["id"] for r in rows}:
+                await self.reload_device(device_id)
+        elif table == "parameter":
+            for device_type_id in {r["device_type_id"] for r in rows}:
+                await self.reload_parameters(device_type_id)
+        elif table == "threshold":
+            for device_id in {r["device_id"] for r in rows}:
+                await self.reload_thresholds(device_id)
+        else:
+            # Тип устройства влияет на все его устройства — проще перечитать всё
+            # (подписчики будут уведомлены из load_all)
+            await self._load_all()
+            return
+
+        self._notify(table, payload)
+
+    # --- Жизненный цикл ---
+
+    def install_triggers(self) -> None:
+        """Создаёт триггеры NOTIFY на таблицах конфигурации."""
+        install_triggers(self.engine)
+
+    async def start(self) -> None:
+        await self.load_all()
+        self._worker_task = asyncio.create_task(self._process_queue())
+        if self.engine is not None:
+            try:
+                self._start_listening(await asyncio.to_thread(self._open_listen_connection))
+            except Exception as e:
+                logger.warning(f"LISTEN недоступен, только периодическое обновление: {e}")
+        if self.full_refresh_interval:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._refresh_task, self._relisten_task, self._worker_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._refresh_task = self._relisten_task = self._worker_task = None
+        self._stop_listening()
+
+    def _open_listen_connection(self):
+        """Отдельное соединение с LISTEN (блокирующий вызов)."""
+        raw = self.engine.raw_connection()
+        # Соединение живёт всё время работы — уводим его из пула
+        raw.detach()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return conn
+
+    def _start_listening(self, conn) -> None:
+        self._listen_conn = conn
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+        logger.info(f"Подписка на изменения конфигурации ({NOTIFY_CHANNEL})")
+
+    def _stop_listening(self) -> None:
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is None:
+            return
+        with suppress(Exception):
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        with suppress(Exception):
+            conn.close()
+
+    def _on_notify(self) -> None:
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except Exception as e:
+            # Мёртвое соединение остаётся «читаемым» — снимаем его с цикла,
+            # иначе обработчик будет вызываться без конца
+            logger.error(f"Ошибка LISTEN-соединения, переподключение: {e}")
+            self._stop_listening()
+            if self._relisten_task is None or self._relisten_task.done():
+                self._relisten_task = asyncio.create_task(self._relisten())
+            return
+        while conn.notifies:
+            self._queue.put_nowait(conn.notifies.pop(0).payload)
+
+    async def _relisten(self, initial_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        """Восстанавливает LISTEN с растущей паузой; пропущенные за это время
+        уведомления заменяет полная перезагрузка."""
+        delay = initial_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                conn = await asyncio.to_thread(self._open_listen_connection)
+            except Exception as e:
+                delay = min(delay * 2, max_delay)
+                logger.warning(f"LISTEN недоступен ({e}), повтор через {delay:.0f} с")
+                continue
+            self._start_listening(conn)
+            self._queue.put_nowait(None)
+            return
+
+    async def _process_queue(self) -> None:
+        while True:
+            raw_payload = await self._queue.get()
+            if raw_payload is None:
+                try:
+                    await self.load_all()
+                except Exception as e:
+                    logger.error(f"Ошибка обновления кеша конфигурации: {e}")
+            else:
+                await self._handle_notify(raw_payload)
+
+    async def _handle_notify(self, raw_payload: str) -> None:
+        try:
+            payload = json.loads(raw_payload)
+            await self.apply_change(payload["table"], payload)
+        except Exception as e:
+            logger.error(f"Ошибка обработки уведомления {raw_payload!r}: {e}")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.full_refresh_interval)
+            # В общую очередь — после уже пришедших уведомлений
+            self._queue.put_nowait(None)
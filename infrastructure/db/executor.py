@@ -0,0 +1,27 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DBExecutor:
+    """Запуск синхронных репозиториев в ограниченном пуле потоков.
+
+    Каждый вызов выполняется в своей короткой сессии из session_scope
+    (PostgresDB.session_scope), поэтому сессии не разделяются между потоками
+    и ошибка одной транзакции не затрагивает остальные.
+    """
+
+    def __init__(self, session_scope, max_workers: int = 4):
+        self.session_scope = session_scope
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def run(self, fn, *args):
+        """Выполняет fn(session, *args) в пуле, не блокируя цикл событий."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._call, fn, args)
+
+    def _call(self, fn, args):
+        with self.session_scope() as session:
+            return fn(session, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,204 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger("measurement_writer")
+
+COPY_SQL = (
+    "COPY measurement (device_id, parameter_id, timestamp, value, status) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+_STOP = object()
+
+WRITE_SECONDS = REGISTRY.histogram(
+    "reinhardt_db_write_seconds", "Время записи пачки в БД", ["table"])
+
+
+class MeasurementWriter:
+    """Асинхронная запись показаний в таблицу measurement (write-behind).
+
+    put() только кладёт кортеж в потокобезопасную очередь и никогда не
+    блокирует цикл опроса. Отдельный поток собирает пачки по размеру или
+    по сроку и пишет их через COPY. Если PostgreSQL не успевает или
+    недоступен, пачки сбрасываются в локальный CSV-файл и дозаписываются
+    в БД, когда очередь снова становится короткой.
+    """
+
+    def __init__(
+            self,
+            engine,
+            batch_size: int = 5000,
+            flush_interval: float = 1.0,
+            max_queue: int = 100_000,
+            spill_path: str = "measurements.spill.csv",
+            replay_retry: float = 30.0,
+    ):
+        """
+        engine         — движок SQLAlchemy (psycopg2)
+        batch_size     — размер пачки, при котором запись идёт сразу
+        flush_interval — максимальная задержка записи, с
+        max_queue      — длина очереди, после которой пачки идут в файл
+        spill_path     — файл для сброса при перегрузке БД
+        replay_retry   — пауза перед повторной дозаписью файла после ошибки, с
+        """
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spill_path = spill_path
+        self.replay_retry = replay_retry
+        self._replay_after = 0.0
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._m_write = WRITE_SECONDS.labels("measurement")
+        self._unregister_metrics = None
+
+        # Счётчики
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.errors = 0
+
+    def put(self, device_id: int, parameter_id: int, timestamp: float, value, status: str) -> None:
+        """Поставить показание в очередь записи (timestamp — UNIX-время)."""
+        self._queue.put((device_id, parameter_id, timestamp, value, status))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="measurement-writer", daemon=True
+        )
+        self._thread.start()
+        self._unregister_metrics = REGISTRY.add_collector(self.collect_metrics)
+        logger.info("Запись показаний запущена")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Дописывает очередь и останавливает поток (блокирующий вызов)."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        self._unregister_metrics()
+        logger.info(
+            f"Запись показаний остановлена: записано {self.written}, "
+            f"в файл {self.spilled}, дозаписано {self.replayed}"
+        )
+
+    def collect_metrics(self):
+        yield ("reinhardt_writer_queue", "gauge", "Показания в очереди записи",
+               [({}, self._queue.qsize())])
+        yield ("reinhardt_writer_rows_total", "counter", "Показания по исходу записи",
+               [({"result": "written"}, self.written), ({"result": "spilled"}, self.spilled),
+                ({"result": "replayed"}, self.replayed)])
+        yield ("reinhardt_writer_errors_total", "counter", "Ошибки записи пачек",
+               [({}, self.errors)])
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                if self._queue.qsize() > self.max_queue:
+                    # БД не успевает — разгружаем очередь в файл
+                    self._spill(batch)
+                else:
+                    self._flush(batch)
+
+            # Очередь короткая — дозаписываем накопленное в файле
+            if (
+                    self._queue.qsize() < self.batch_size
+                    and time.monotonic() >= self._replay_after
+                    and os.path.exists(self.spill_path)
+            ):
+                self._replay()
+
+    def _collect(self):
+        """Собирает пачку до batch_size или до истечения flush_interval."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    @staticmethod
+    def _to_csv(batch) -> str:
+        fromtimestamp = datetime.fromtimestamp
+        utc = timezone.utc
+        return "".join(
+            f"{d},{p},{fromtimestamp(ts, utc).isoformat()},{'' if v is None else v},{s}\n"
+            for d, p, ts, v, s in batch
+        )
+
+    def _copy(self, stream) -> None:
+        raw = self.engine.raw_connection()
+        try:
+            with self._m_write.time():
+                with raw.cursor() as cur:
+                    cur.copy_expert(COPY_SQL, stream)
+                raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _flush(self, batch) -> None:
+        try:
+            self._copy(io.StringIO(self._to_csv(batch)))
+            self.written += len(batch)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ошибка записи {len(batch)} показаний: {e}")
+            self._spill(batch)
+
+    def _spill(self, batch) -> None:
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(self._to_csv(batch))
+            self.spilled += len(batch)
+        except OSError as e:
+            logger.error(f"Потеряно {len(batch)} показаний, файл недоступен: {e}")
+
+    def _replay(self) -> None:
+        replay_path = self.spill_path + ".replay"
+        try:
+            os.replace(self.spill_path, replay_path)
+            with open(replay_path, encoding="utf-8") as f:
+                self._copy(f)
+            with open(replay_path, encoding="utf-8") as f:
+                self.replayed += sum(1 for _ in f)
+            os.remove(replay_path)
+        except Exception as e:
+            logger.warning(f"Дозапись из {self.spill_path} отложена: {e}")
+            self._replay_after = time.monotonic() + self.replay_retry
+            self._restore(replay_path)
+
+    def _restore(self, replay_path: str) -> None:
+        """Возвращает недозаписанный файл в начало очереди сброса."""
+        if not os.path.exists(replay_path):
+            return
+        if os.path.exists(self.spill_path):
+            with open(replay_path, "a", encoding="utf-8") as dst, \
+                    open(self.spill_path, encoding="utf-8") as src:
+                dst.write(src.read())
+        os.replace(replay_path, self.spill_path)
@@ -0,0 +1,142 @@
+"""Обновление схемы БД до текущих моделей.
+
+create_all() создаёт только отсутствующие таблицы и не меняет уже
+существующие, поэтому колонки, добавленные к таблицам исходной схемы,
+и новые индексы на старых таблицах дописываются здесь. Все шаги
+идемпотентны: повторный запуск на актуальной схеме ничего не делает.
+
+    python -m infrastructure.db.migrations          # SQL-скрипт для PostgreSQL (psql -f)
+    python -m infrastructure.db.migrations --apply  # применить к DATABASE_URL
+"""
+import argparse
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Index, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from infrastructure.db.models.models import (
+    Base, Device, DeviceType, Measurement, MeasurementDay, MeasurementHour, MeasurementMinute,
+    Parameter, Threshold,
+)
+
+logger = logging.getLogger("migrations")
+
+# Колонки, добавленные к таблицам исходной схемы (определения — в моделях)
+ADDED_COLUMNS = {
+    DeviceType: (
+        "is_pipelined", "pipeline_window", "command_gap", "reply_echo",  # конвейерный опрос
+        "parse_spec",  # разбор ответов
+    ),
+    Device: ("poll_interval", "min_poll_interval", "max_poll_interval"),  # периоды опроса
+    Parameter: (
+        "poll_interval", "min_poll_interval", "max_poll_interval",
+        "parse_spec", "parse_field",
+        "compression", "deadband", "deadband_percent", "max_silence",  # сжатие рядов
+    ),
+    Threshold: ("hysteresis", "debounce", "max_rate"),  # движок порогов
+}
+
+# Таблицы, которых нет в исходной схеме (создаются целиком, с индексами)
+ADDED_TABLES = (Measurement, MeasurementMinute, MeasurementHour, MeasurementDay)
+
+
+def _literal(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return repr(value)
+
+
+def _column_ddl(column, dialect) -> str:
+    """Определение колонки для ALTER TABLE ... ADD COLUMN.
+
+    Умолчание модели задаётся и на стороне БД: существующие строки
+    получают то же значение, что и новые, а не NULL.
+    """
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar and default.arg is not None:
+        ddl += f" DEFAULT {_literal(default.arg)}"
+    return ddl
+
+
+def _added_columns() -> List[Tuple[str, object]]:
+    return [
+        (model.__tablename__, model.__table__.c[name])
+        for model, names in ADDED_COLUMNS.items()
+        for name in names
+    ]
+
+
+def _added_indexes() -> List[Index]:
+    """Индексы таблиц, существовавших до появления индекса (create_all их не создаст)."""
+    return [
+        index
+        for model in ADDED_TABLES
+        for index in sorted(model.__table__.indexes, key=lambda i: i.name)
+    ]
+
+
+def schema_sql() -> str:
+    """Идемпотентный SQL-скрипт обновления схемы для PostgreSQL."""
+    dialect = postgresql.dialect()
+    statements = [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_column_ddl(column, dialect)}"
+        for table, column in _added_columns()
+    ]
+    statements += [
+        str(CreateTable(model.__table__, if_not_exists=True).compile(dialect=dialect)).strip()
+        for model in ADDED_TABLES
+    ]
+    statements += [
+        str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+        for index in _added_indexes()
+    ]
+    return "".join(f"{statement};\n\n" for statement in statements)
+
+
+def migrate(engine) -> Dict[str, List[str]]:
+    """Приводит схему к моделям; возвращает, что было добавлено."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added: Dict[str, List[str]] = {"tables": [], "columns": [], "indexes": []}
+
+    with engine.begin() as conn:
+        for table, column in _added_columns():
+            if table not in existing_tables:
+                continue  # таблицу целиком создаст create_all
+            if column.name in {c["name"] for c in inspector.get_columns(table)}:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {_column_ddl(column, engine.dialect)}"))
+            added["columns"].append(f"{table}.{column.name}")
+
+        for index in _added_indexes():
+            table = index.table.name
+            if table not in existing_tables:
+                continue
+            if index.name in {i["name"] for i in inspector.get_indexes(table)}:
+                continue
+            index.create(conn)
+            added["indexes"].append(index.name)
+
+        new_tables = [t for t in Base.metadata.sorted_tables if t.name not in existing_tables]
+        Base.metadata.create_all(conn, tables=new_tables)
+        added["tables"] = [t.name for t in new_tables]
+
+    if any(added.values()):
+        logger.warning(f"Схема БД обновлена: {added}")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обновление схемы БД Reinhardt")
+    parser.add_argument("--apply", action="store_true", help="применить к DATABASE_URL (иначе — вывести SQL)")
+    args = parser.parse_args()
+    if args.apply:
+        from config import settings
+        from infrastructure.db.postgres import PostgresDB
+        logging.basicConfig(level=logging.INFO)
+        print(migrate(PostgresDB(settings.DATABASE_URL).engine))
+    else:
+        print(schema_sql(), end="")
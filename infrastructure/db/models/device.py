@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
 from sqlalchemy.dialects.postgresql import INET
 from sqlalchemy.orm import relationship
 from infrastructure.db.models.base import Base  # общий declarative_base()
@@ -13,6 +13,9 @@ class Device(Base):
     port = Column(Integer, nullable=False)
     description = Column(String(255))
     is_enable = Column(Boolean, default=True)
+    poll_interval = Column(Float)  # период опроса, с (NULL — по умолчанию)
+    min_poll_interval = Column(Float)  # границы адаптивного периода, с (NULL — доли базового)
+    max_poll_interval = Column(Float)
     device_type_id = Column(Integer, ForeignKey('device_type.id'), nullable=False)
 
     device_type = relationship(
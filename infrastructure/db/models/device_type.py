@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, String, Text, Boolean, Float
+from sqlalchemy.orm import relationship
 
-Base = declarative_base()
+from infrastructure.db.models.base import Base
 
 
 class DeviceType(Base):
@@ -10,6 +10,14 @@ class DeviceType(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100), nullable=False, unique=True)
     description = Column(String(255))
+    # Конвейерный опрос: команды уходят пачкой, ответы читаются потоком
+    is_pipelined = Column(Boolean, default=False)
+    pipeline_window = Column(Integer, default=0)  # 0 — все команды одной записью
+    command_gap = Column(Float, default=0.05)  # пауза между командами/окнами, с
+    # Ответ начинается с эха команды («T= 21.4»): по нему ответы конвейера
+    # сопоставляются с командами; разбирается ответ без эха
+    reply_echo = Column(Boolean, default=False)
+    parse_spec = Column(Text)  # разбор ответа по умолчанию для типа (JSON)
 
     parameters = relationship(
         "Parameter",  # Строковое имя класса
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, ForeignKey, Index
+
+from infrastructure.db.models.base import Base
+
+
+class Measurement(Base):
+    __tablename__ = 'measurement'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    device_id = Column(Integer, ForeignKey('device.id'), nullable=False)
+    parameter_id = Column(Integer, ForeignKey('parameter.id'), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    value = Column(Float)
+    status = Column(String(10), nullable=False)
+
+    __table_args__ = (
+        Index('ix_measurement_device_parameter_timestamp', 'device_id', 'parameter_id', 'timestamp'),
+        # Выборки по времени по всем устройствам (агрегаты, восстановление).
+        # Показания пишутся по возрастанию времени, поэтому BRIN занимает
+        # доли процента таблицы и почти не замедляет вставку
+        Index('ix_measurement_timestamp', 'timestamp', postgresql_using='brin'),
+    )
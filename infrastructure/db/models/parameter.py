@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 
 from infrastructure.db.models.base import Base
@@ -12,6 +12,16 @@ class Parameter(Base):
     command = Column(String(50), nullable=False)
     metric = Column(String(20))
     description = Column(String(255))
+    poll_interval = Column(Float)  # период опроса, с (NULL — как у устройства)
+    min_poll_interval = Column(Float)  # границы адаптивного периода, с (NULL — как у устройства)
+    max_poll_interval = Column(Float)
+    parse_spec = Column(Text)  # разбор ответа (JSON, см. core/service/parsers.py)
+    parse_field = Column(String(50))  # поле многозначного ответа
+    # Сжатие ряда перед записью (см. core/service/compression.py)
+    compression = Column(String(20))  # deadband | swinging_door (NULL — без сжатия)
+    deadband = Column(Float)  # допуск, в единицах параметра или в %
+    deadband_percent = Column(Boolean, default=False)
+    max_silence = Column(Float)  # не дольше, с, без записанной точки
     device_type_id = Column(Integer, ForeignKey('device_type.id'), nullable=False)
 
     # Указываем строковое имя класса 'DeviceType'
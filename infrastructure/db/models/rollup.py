@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, DateTime, ForeignKey, PrimaryKeyConstraint
+from sqlalchemy.orm import declared_attr
+
+from infrastructure.db.models.base import Base
+
+
+class RollupMixin:
+    """Агрегат показаний параметра за интервал [bucket, bucket + период)."""
+
+    @declared_attr
+    def device_id(cls):
+        return Column(Integer, ForeignKey('device.id'), nullable=False)
+
+    @declared_attr
+    def parameter_id(cls):
+        return Column(Integer, ForeignKey('parameter.id'), nullable=False)
+
+    bucket = Column(DateTime(timezone=True), nullable=False)  # начало интервала (UTC)
+    samples = Column(BigInteger, nullable=False)
+    sum_value = Column(Float, nullable=False)  # для слияния частичных агрегатов
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    avg_value = Column(Float, nullable=False)
+
+    # Ключ в порядке выборки: ряд параметра за диапазон времени
+    __table_args__ = (
+        PrimaryKeyConstraint('device_id', 'parameter_id', 'bucket'),
+    )
+
+
+class MeasurementMinute(RollupMixin, Base):
+    __tablename__ = 'measurement_1m'
+    period = 60
+
+
+class MeasurementHour(RollupMixin, Base):
+    __tablename__ = 'measurement_1h'
+    period = 3600
+
+
+class MeasurementDay(RollupMixin, Base):
+    __tablename__ = 'measurement_1d'
+    period = 86400
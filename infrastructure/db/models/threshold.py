@@ -11,6 +11,9 @@ class Threshold(Base):
     low_value = Column(Float)
     high_value = Column(Float)
     is_enable = Column(Boolean, default=True)
+    hysteresis = Column(Float, default=0.0)  # зона возврата из тревоги
+    debounce = Column(Integer, default=1)  # подряд показаний для смены статуса
+    max_rate = Column(Float)  # допустимая скорость изменения, ед/с (NULL — без контроля)
     parameter_id = Column(Integer, ForeignKey('parameter.id'), nullable=False)
     device_id = Column(Integer, ForeignKey('device.id'), nullable=False)
 
@@ -1,8 +1,52 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
 from sqlalchemy import create_engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
 
-from infrastructure.db.models.base import Base
+
+def pool_size_for_pollers(
+        pollers: int,
+        pollers_per_worker: int = 50,
+        min_workers: int = 2,
+        max_workers: int = 16,
+) -> Tuple[int, int]:
+    """Размеры по числу опросчиков: (потоков DBExecutor, соединений в пуле).
+
+    Опросчики в БД не ходят — нагрузку дают потоки DBExecutor, поток записи
+    показаний и LISTEN-соединение кеша конфигурации.
+    """
+    workers = min(max(math.ceil(pollers / pollers_per_worker), min_workers), max_workers)
+    return workers, workers + 2
+
+
+class PoolMetrics:
+    """Метрики пула соединений: задержка выдачи и исчерпание."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+        self.exhausted = 0
+        self.timeouts = 0
+
+    def observe_checkout(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.checkout_time_total += seconds
+        if seconds > self.checkout_time_max:
+            self.checkout_time_max = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "checkout_time_avg": self.checkout_time_total / self.checkouts if self.checkouts else 0.0,
+            "checkout_time_max": self.checkout_time_max,
+            "exhausted": self.exhausted,
+            "timeouts": self.timeouts,
+        }
 
 
 class PostgresDB:
@@ -19,34 +63,102 @@ class PostgresDB:
         max_overflow — сколько дополнительных (в пике) соединений можно создать
         echo         — флаг вывода SQL в лог (для отладки)
         """
-        self.engine = create_engine(
-            url,
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            echo=echo,
-        )
+        self.url = url
+        self.echo = echo
+        self.metrics = PoolMetrics()
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
-            bind=self.engine,
+            # Объекты используются после закрытия сессии (кеш конфигурации)
+            expire_on_commit=False,
         )
+        self._create_engine(pool_size, max_overflow)
 
-    def init_db(self) -> None:
-        """Создаёт таблицы по моделям, если их ещё нет."""
-        from infrastructure.db.models.device import Device
-        from infrastructure.db.models.device_type import DeviceType
-        from infrastructure.db.models.parameter import Parameter
-        from infrastructure.db.models.threshold import Threshold
-        Base.metadata.create_all(bind=self.engine)
+    def _create_engine(self, pool_size: int, max_overflow: int) -> None:
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.engine = create_engine(
+            self.url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            echo=self.echo,
+        )
+        self.SessionLocal.configure(bind=self.engine)
+
+    def resize_pool(self, pool_size: int, max_overflow: int) -> None:
+        """Пересоздаёт движок с новым размером пула (до начала работы)."""
+        if (pool_size, max_overflow) == (self.pool_size, self.max_overflow):
+            return
+        self.engine.dispose()
+        self._create_engine(pool_size, max_overflow)
+
+    def init_db(self) -> dict:
+        """Приводит схему к моделям: недостающие таблицы, колонки и индексы
+        (см. migrations.py); возвращает, что было добавлено."""
+        from infrastructure.db.migrations import migrate
+        return migrate(self.engine)
 
     def get_session(self):
         """Возвращает новую сессию (контекстный менеджер)."""
         return self.SessionLocal()
 
+    @contextmanager
+    def session_scope(self):
+        """Короткая сессия на одну единицу работы: commit/rollback/close."""
+        session = self.SessionLocal()
+        # Все соединения заняты — выдача будет ждать (или упадёт по тайм-ауту)
+        if self.engine.pool.checkedout() >= self.pool_size + self.max_overflow:
+            self.metrics.exhausted += 1
+        start = time.perf_counter()
+        try:
+            # Явно берём соединение, чтобы измерить задержку выдачи из пула
+            session.connection()
+        except BaseException as e:
+            if isinstance(e, PoolTimeoutError):
+                self.metrics.timeouts += 1
+            session.close()
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - start)
+
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def pool_stats(self) -> dict:
+        """Состояние пула и метрики выдачи соединений."""
+        pool = self.engine.pool
+        stats = self.metrics.snapshot()
+        stats.update({
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+        return stats
+
+    def collect_metrics(self):
+        """Пул соединений для /metrics (сборщик MetricsRegistry)."""
+        stats = self.pool_stats()
+        for name, kind, help_text in (
+                ("pool_size", "gauge", "Размер пула соединений"),
+                ("checked_out", "gauge", "Выданные соединения пула"),
+                ("overflow", "gauge", "Соединения сверх размера пула"),
+                ("checkouts", "counter", "Выдачи соединений из пула"),
+                ("exhausted", "counter", "Выдачи при исчерпанном пуле"),
+                ("timeouts", "counter", "Ожидания соединения, закончившиеся таймаутом"),
+        ):
+            suffix = "_total" if kind == "counter" else ""
+            yield (f"reinhardt_db_{name}{suffix}", kind, help_text, [({}, stats[name])])
+
     def check_connection(self) -> bool:
         """Проверяет, что можно подключиться к БД."""
         try:
             with self.engine.connect():
                 return True
         except OperationalError:
-            return False
\ No newline at end of file
+            return False
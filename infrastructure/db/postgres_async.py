@@ -0,0 +1,59 @@
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+def to_async_url(url: str) -> str:
+    """postgresql://... → postgresql+asyncpg://..."""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        scheme = scheme.split("+", 1)[0]
+    return f"{scheme}+asyncpg{sep}{rest}"
+
+
+class AsyncPostgresDB:
+    def __init__(
+            self,
+            url: str,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+            echo: bool = False,
+    ):
+        """
+        url          — строка подключения (драйвер заменяется на asyncpg)
+        pool_size    — число постоянных соединений в пуле
+        max_overflow — сколько дополнительных (в пике) соединений можно создать
+        echo         — флаг вывода SQL в лог (для отладки)
+        """
+        self.engine = create_async_engine(
+            to_async_url(url),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            echo=echo,
+        )
+        self.SessionLocal = async_sessionmaker(
+            bind=self.engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    def get_session(self) -> AsyncSession:
+        """Возвращает новую асинхронную сессию (контекстный менеджер)."""
+        return self.SessionLocal()
+
+    async def run(self, fn, *args):
+        """Выполняет fn(session, *args) в отдельной короткой сессии."""
+        async with self.SessionLocal() as session:
+            return await fn(session, *args)
+
+    async def check_connection(self) -> bool:
+        """Проверяет, что можно подключиться к БД."""
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                return True
+        except OperationalError:
+            return False
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
@@ -0,0 +1,131 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from infrastructure.db.models.models import Device, Parameter, Threshold
+
+# sqlalchemy.ext.asyncio нужен только при DB_ASYNC (его грузит AsyncPostgresDB)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncDeviceRepository:
+    def __init__(self, session: "AsyncSession"):
+        self.session = session
+
+    async def get_device_by_id(self, device_id: int) -> Device:
+        """Получение устройства по ID с предзагрузкой связанных данных"""
+        result = await self.session.execute(
+            select(Device).options(
+                joinedload(Device.device_type),
+                joinedload(Device.thresholds).joinedload(Threshold.parameter)
+            ).filter(Device.id == device_id)
+        )
+        return result.unique().scalars().first()
+
+    async def get_devices_by_is_enable_true(self) -> list[Device]:
+        """Получение всех активных устройств"""
+        result = await self.session.execute(
+            select(Device).options(
+                joinedload(Device.device_type)
+            ).filter(Device.is_enable == True)
+        )
+        return list(result.scalars().all())
+
+    async def get_device_by_ip_and_port(self, ip: str, port: int) -> Device:
+        """Поиск устройства по IP и порту"""
+        result = await self.session.execute(
+            select(Device).filter(
+                Device.ip_address == ip,
+                Device.port == port
+            )
+        )
+        return result.scalars().first()
+
+    async def get_all_devices(self) -> list[Device]:
+        """Получение всех устройств"""
+        result = await self.session.execute(
+            select(Device).options(joinedload(Device.device_type))
+        )
+        return list(result.scalars().all())
+
+
+class AsyncParameterRepository:
+    def __init__(self, session: "AsyncSession"):
+        self.session = session
+
+    async def get_parameter_by_id(self, parameter_id: int) -> Parameter:
+        """Получение параметра по ID"""
+        result = await self.session.execute(
+            select(Parameter).filter(Parameter.id == parameter_id)
+        )
+        return result.scalars().first()
+
+    async def get_parameters_by_device_type(self, device_type_id: int) -> list[Parameter]:
+        """Получение параметров по типу устройства"""
+        result = await self.session.execute(
+            select(Parameter).filter(Parameter.device_type_id == device_type_id)
+        )
+        return list(result.scalars().all())
+
+    async def get_all_parameters(self) -> list[Parameter]:
+        """Получение всех параметров"""
+        result = await self.session.execute(select(Parameter))
+        return list(result.scalars().all())
+
+
+class AsyncThresholdRepository:
+    def __init__(self, session: "AsyncSession"):
+        self.session = session
+
+    async def get_threshold_by_id(self, threshold_id: int) -> Threshold:
+        """Получение порога по ID"""
+        result = await self.session.execute(
+            select(Threshold).filter(Threshold.id == threshold_id)
+        )
+        return result.scalars().first()
+
+    async def get_thresholds_by_parameter_id_and_is_enable_true(
+            self,
+            parameter_id: int
+    ) -> list[Threshold]:
+        """Получение активных порогов для параметра"""
+        result = await self.session.execute(
+            select(Threshold).filter(
+                Threshold.parameter_id == parameter_id,
+                Threshold.is_enable == True
+            )
+        )
+        return list(result.scalars().all())
+
+    async def get_thresholds_by_device_id(self, device_id: int) -> list[Threshold]:
+        """Получение всех порогов для устройства"""
+        result = await self.session.execute(
+            select(Threshold).options(
+                joinedload(Threshold.parameter)
+            ).filter(Threshold.device_id == device_id)
+        )
+        return list(result.scalars().all())
+
+    async def get_all_active_thresholds(self) -> list[Threshold]:
+        """Получение всех активных порогов"""
+        result = await self.session.execute(
+            select(Threshold).filter(Threshold.is_enable == True)
+        )
+        return list(result.scalars().all())
+
+    async def get_active_thresholds_by_device_id(
+            self,
+            device_id: int
+    ) -> list[Threshold]:
+        """Получение активных порогов для устройства"""
+        result = await self.session.execute(
+            select(Threshold).options(
+                joinedload(Threshold.parameter)
+            ).filter(
+                Threshold.device_id == device_id,
+                Threshold.is_enable == True
+            )
+        )
+        return list(result.scalars().all())
@@ -2,8 +2,7 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session, joinedload
 
-from infrastructure.db.models.device import Device
-from infrastructure.db.models.threshold import Threshold
+from infrastructure.db.models.models import Device, Threshold
 from infrastructure.db.repositories.base import BaseRepository
 
 
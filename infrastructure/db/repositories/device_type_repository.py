@@ -2,7 +2,7 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session, joinedload
 
-from infrastructure.db.models.device_type import DeviceType
+from infrastructure.db.models.models import DeviceType
 from infrastructure.db.repositories.base import BaseRepository
 
 
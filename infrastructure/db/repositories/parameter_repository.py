@@ -2,7 +2,7 @@ from typing import List
 
 from sqlalchemy.orm import Session, joinedload
 
-from infrastructure.db.models.parameter import Parameter
+from infrastructure.db.models.models import Parameter
 from infrastructure.db.repositories.base import BaseRepository
 
 
@@ -1,5 +1,10 @@
+import math
+from datetime import datetime
+
 from sqlalchemy.orm import joinedload
-from infrastructure.db.models.models import Device, DeviceType, Parameter, Threshold
+from infrastructure.db.models.models import (
+    Device, DeviceType, Parameter, Threshold, MeasurementMinute, MeasurementHour, MeasurementDay
+)
 
 
 class DeviceTypeRepository:
@@ -35,6 +40,10 @@ class DeviceRepository:
             joinedload(Device.device_type)
         ).filter(Device.is_enable == True).all()
 
+    def count_devices_by_is_enable_true(self) -> int:
+        """Количество активных устройств"""
+        return self.session.query(Device).filter(Device.is_enable == True).count()
+
     def get_device_by_ip_and_port(self, ip: str, port: int) -> Device:
         """Поиск устройства по IP и порту"""
         return self.session.query(Device).filter(
@@ -96,6 +105,12 @@ class ThresholdRepository:
             joinedload(Threshold.parameter)
         ).filter(Threshold.device_id == device_id).all()
 
+    def get_all_active_thresholds(self) -> list[Threshold]:
+        """Получение всех активных порогов"""
+        return self.session.query(Threshold).filter(
+            Threshold.is_enable == True
+        ).all()
+
     def get_active_thresholds_by_device_id(
             self,
             device_id: int
@@ -106,4 +121,42 @@ class ThresholdRepository:
         ).filter(
             Threshold.device_id == device_id,
             Threshold.is_enable == True
-        ).all()
\ No newline at end of file
+        ).all()
+
+
+class RollupRepository:
+    """Ряды агрегатов показаний (measurement_1m/1h/1d) для графиков и отчётов."""
+
+    MODELS = (MeasurementMinute, MeasurementHour, MeasurementDay)
+
+    def __init__(self, session):
+        self.session = session
+
+    @classmethod
+    def choose_model(cls, start: datetime, end: datetime, max_points: int = 1000):
+        """Самое мелкое разрешение, при котором ряд не длиннее max_points."""
+        span = max((end - start).total_seconds(), 0.0)
+        for model in cls.MODELS:
+            if math.ceil(span / model.period) <= max_points:
+                return model
+        return cls.MODELS[-1]
+
+    def get_series(
+            self,
+            device_id: int,
+            parameter_id: int,
+            start: datetime,
+            end: datetime,
+            max_points: int = 1000
+    ) -> list:
+        """Агрегаты параметра за [start, end) в подходящем разрешении:
+        строки (bucket, min_value, max_value, avg_value, samples)"""
+        model = self.choose_model(start, end, max_points)
+        return self.session.query(
+            model.bucket, model.min_value, model.max_value, model.avg_value, model.samples
+        ).filter(
+            model.device_id == device_id,
+            model.parameter_id == parameter_id,
+            model.bucket >= start,
+            model.bucket < end
+        ).order_by(model.bucket).all()
@@ -2,7 +2,7 @@ from typing import List
 
 from sqlalchemy.orm import Session, joinedload
 
-from infrastructure.db.models.threshold import Threshold
+from infrastructure.db.models.models import Threshold
 from infrastructure.db.repositories.base import BaseRepository
 
 
@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from infrastructure.db.models.rollup import MeasurementDay, MeasurementHour, MeasurementMinute
+from infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger("rollups")
+
+# Разрешения от мелкого к крупному; интервалы выровнены по эпохе UNIX,
+# то есть суточные — по полуночи UTC
+ROLLUP_MODELS = (MeasurementMinute, MeasurementHour, MeasurementDay)
+
+# Частичный агрегат: [samples, sum, min, max]
+Key = Tuple[float, int, int]
+
+# Агрегаты сырых показаний за интервалы. Сырой ряд после сжатия (Compressor)
+# прорежен, поэтому восстановленные отсюда min/max точны в пределах допуска,
+# а среднее взвешено по сохранённым точкам, а не по всем опросам.
+RAW_ROLLUP_SQL = """
+    SELECT device_id, parameter_id,
+           floor(extract(epoch FROM "timestamp") / :period) * :period AS bucket,
+           count(value), sum(value), min(value), max(value)
+    FROM measurement
+    WHERE "timestamp" >= :start AND "timestamp" < :end AND value IS NOT NULL
+    GROUP BY 1, 2, 3
+"""
+
+BACKFILL_SQL = """
+    INSERT INTO {table} (device_id, parameter_id, bucket, samples, sum_value, min_value, max_value, avg_value)
+    SELECT device_id, parameter_id, to_timestamp(bucket), count, sum, min, max, sum / count
+    FROM ({raw}) AS raw (device_id, parameter_id, bucket, count, sum, min, max)
+    ON CONFLICT (device_id, parameter_id, bucket) DO UPDATE SET
+        samples = EXCLUDED.samples, sum_value = EXCLUDED.sum_value,
+        min_value = EXCLUDED.min_value, max_value = EXCLUDED.max_value,
+        avg_value = EXCLUDED.avg_value
+"""
+
+_utc = timezone.utc
+
+WRITE_SECONDS = REGISTRY.histogram(
+    "reinhardt_rollup_write_seconds", "Время записи пачки агрегатов в БД", ["table"])
+
+
+def _floor(timestamp: float, period: int) -> float:
+    return timestamp - timestamp % period
+
+
+def backfill(engine, now: Optional[float] = None, horizon: Optional[float] = None) -> int:
+    """Пересчитывает из сырых показаний закрытые интервалы, которых нет в
+    таблицах агрегатов (простой между остановкой и запуском).
+
+    Начало — интервал после последнего записанного, но не раньше now - horizon;
+    конец — начало текущего (открытого) интервала. Возвращает число строк.
+    """
+    now = time.time() if now is None else now
+    total = 0
+    with engine.begin() as conn:
+        # Начало ряда — по первой строке первичного ключа: min("timestamp")
+        # по BRIN-индексу всё равно читает всю таблицу, а показания пишутся
+        # по возрастанию времени
+        first_raw = conn.execute(
+            text('SELECT extract(epoch FROM "timestamp") FROM measurement ORDER BY id LIMIT 1')
+        ).scalar()
+        if first_raw is None:
+            return 0
+        for model in ROLLUP_MODELS:
+            period = model.period
+            end = _floor(now, period)
+            # Только до открытого интервала: его и следующие пишет агрегатор,
+            # который может работать одновременно с восстановлением
+            last = conn.execute(
+                text(f"SELECT extract(epoch FROM max(bucket)) FROM {model.__tablename__} WHERE bucket < :end"),
+                {"end": datetime.fromtimestamp(end, _utc)},
+            ).scalar()
+            start = float(first_raw) if last is None else float(last) + period
+            if horizon is not None:
+                start = max(start, now - horizon)
+            start = _floor(start, period)
+            if start >= end:
+                continue
+            result = conn.execute(
+                text(BACKFILL_SQL.format(table=model.__tablename__, raw=RAW_ROLLUP_SQL)),
+                {"period": period,
+                 "start": datetime.fromtimestamp(start, _utc),
+                 "end": datetime.fromtimestamp(end, _utc)},
+            )
+            total += result.rowcount
+            logger.info(f"{model.__tablename__}: восстановлено {result.rowcount} строк "
+                        f"за {(end - start) / period:.0f} интервалов")
+    return total
+
+
+class RollupAggregator:
+    """Агрегаты min/max/avg по параметрам за минуту, час и сутки.
+
+    Подписчик темы READINGS шины: видит все показания опросчика до сжатия
+    и на каждое только обновляет частичные агрегаты в памяти. Поток записи
+    раз в flush_interval забирает закрытые интервалы (конец + grace уже
+    прошёл) и дописывает их в measurement_1m/1h/1d слиянием: опоздавшие
+    показания добавляются к уже записанной строке. Открытые интервалы при
+    остановке не пишутся — после запуска seed() достраивает их из сырых
+    показаний, а backfill() — интервалы, пропущенные за время простоя.
+    """
+
+    def __init__(self, engine, flush_interval: float = 10.0, grace: float = 5.0, chunk_size: int = 5000):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.grace = grace
+        self.chunk_size = chunk_size
+        self._buckets: List[Tuple[type, Dict[Key, list]]] = [(model, {}) for model in ROLLUP_MODELS]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Счётчики
+        self.received = 0
+        self.written = 0
+        self.errors = 0
+
+    def __call__(self, batch: list) -> None:
+        """Пачка показаний (device_id, parameter_id, timestamp, value, status)."""
+        with self._lock:
+            for device_id, parameter_id, timestamp, value, _ in batch:
+                if value is None or value != value:
+                    continue
+                for model, buckets in self._buckets:
+                    key = (timestamp - timestamp % model.period, device_id, parameter_id)
+                    agg = buckets.get(key)
+                    if agg is None:
+                        buckets[key] = [1, value, value, value]
+                    else:
+                        agg[0] += 1
+                        agg[1] += value
+                        if value < agg[2]:
+                            agg[2] = value
+                        elif value > agg[3]:
+                            agg[3] = value
+            self.received += len(batch)
+
+    def put(self, device_id: int, parameter_id: int, timestamp: float, value, status: str) -> None:
+        self(((device_id, parameter_id, timestamp, value, status),))
+
+    def seed(self, now: Optional[float] = None, keep: Optional[Callable[[int], bool]] = None) -> int:
+        """Начальные агрегаты открытых интервалов из сырых показаний до now.
+
+        keep(device_id) — отбор устройств (шард). Показания после now
+        приходят с шины, поэтому двойного счёта нет.
+        """
+        now = time.time() if now is None else now
+        loaded = 0
+        with self.engine.connect() as conn:
+            for model, buckets in self._buckets:
+                start = _floor(now, model.period)
+                rows = conn.execute(text(RAW_ROLLUP_SQL), {
+                    "period": model.period,
+                    "start": datetime.fromtimestamp(start, _utc),
+                    "end": datetime.fromtimestamp(now, _utc),
+                }).all()
+                with self._lock:
+                    for device_id, parameter_id, bucket, count, total, low, high in rows:
+                        if keep is not None and not keep(device_id):
+                            continue
+                        self._merge(buckets, (float(bucket), device_id, parameter_id),
+                                    [count, total, low, high])
+                        loaded += 1
+        return loaded
+
+    @staticmethod
+    def _merge(buckets: Dict[Key, list], key: Key, part: list) -> None:
+        agg = buckets.get(key)
+        if agg is None:
+            buckets[key] = part
+        else:
+            agg[0] += part[0]
+            agg[1] += part[1]
+            agg[2] = min(agg[2], part[2])
+            agg[3] = max(agg[3], part[3])
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rollups", daemon=True)
+        self._thread.start()
+        logger.info("Агрегация показаний запущена")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Дописывает закрытые интервалы и останавливает поток (блокирующий вызов)."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush(grace=0.0)
+        logger.info(f"Агрегация показаний остановлена: показаний {self.received}, "
+                    f"строк записано {self.written}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self, now: Optional[float] = None, grace: Optional[float] = None) -> int:
+        """Записывает интервалы, закончившиеся раньше now - grace."""
+        now = time.time() if now is None else now
+        grace = self.grace if grace is None else grace
+        written = 0
+        for model, buckets in self._buckets:
+            horizon = now - grace - model.period
+            with self._lock:
+                closed = {key: buckets.pop(key) for key in [k for k in buckets if k[0] <= horizon]}
+            if not closed:
+                continue
+            try:
+                self._write(model, closed)
+                written += len(closed)
+            except Exception as e:
+                # Вернём агрегаты обратно — запишутся при следующем сбросе
+                self.errors += 1
+                logger.error(f"Ошибка записи {len(closed)} строк {model.__tablename__}: {e}")
+                with self._lock:
+                    for key, part in closed.items():
+                        self._merge(buckets, key, part)
+        self.written += written
+        return written
+
+    def _write(self, model, closed: Dict[Key, list]) -> None:
+        rows = [
+            {"device_id": device_id, "parameter_id": parameter_id,
+             "bucket": datetime.fromtimestamp(bucket, _utc),
+             "samples": count, "sum_value": total, "min_value": low, "max_value": high,
+             "avg_value": total / count}
+            for (bucket, device_id, parameter_id), (count, total, low, high) in closed.items()
+        ]
+        table = model.__table__
+        with WRITE_SECONDS.labels(model.__tablename__).time(), self.engine.begin() as conn:
+            for i in range(0, len(rows), self.chunk_size):
+                stmt = insert(table).values(rows[i:i + self.chunk_size])
+                new = stmt.excluded
+                samples = table.c.samples + new.samples
+                sum_value = table.c.sum_value + new.sum_value
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=["device_id", "parameter_id", "bucket"],
+                    set_={
+                        "samples": samples,
+                        "sum_value": sum_value,
+                        "min_value": func.least(table.c.min_value, new.min_value),
+                        "max_value": func.greatest(table.c.max_value, new.max_value),
+                        "avg_value": sum_value / samples,
+                    },
+                ))
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = {model.__tablename__: len(buckets) for model, buckets in self._buckets}
+        return {"received": self.received, "written": self.written,
+                "errors": self.errors, "pending": pending}
+
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from core.service.reading_bus import Event
+
+logger = logging.getLogger("event_store")
+
+# Запись индекса: время, устройство, длина и смещение записи в файле данных
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("device_id", "<i4"), ("length", "<u4"), ("offset", "<u8")])
+
+
+class EventRing:
+    """Последние события в кольцевом буфере фиксированной ёмкости."""
+
+    def __init__(self, capacity: int = 10_000):
+        self._events = deque(maxlen=capacity)
+        self.capacity = capacity
+        self.total = 0
+
+    def overflow(self, count: int) -> int:
+        """Сколько старых событий вытеснит добавление count новых."""
+        return max(0, len(self._events) + count - self.capacity)
+
+    def drop_oldest(self, count: int) -> None:
+        for _ in range(min(count, len(self._events))):
+            self._events.popleft()
+
+    def extend(self, events: Iterable[Event]) -> None:
+        before = len(self._events)
+        self._events.extend(events)
+        self.total += len(self._events) - before
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __getitem__(self, i: int) -> Event:
+        return self._events[i]
+
+
+class EventStore:
+    """Журнал событий на диске: только дозапись, индекс по времени и устройству.
+
+    events.jsonl — события строками JSON; events.idx — записи INDEX_DTYPE
+    (24 байта на событие) в порядке добавления. Индекс читается через
+    memmap, поэтому выборка за недели затрагивает только нужные страницы,
+    а сами события читаются с диска по одному по смещению. Время в индексе
+    монотонно (не меньше предыдущего) — это позволяет искать диапазон
+    двоичным поиском; точное время хранится в самой записи.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 2048):
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, "events.jsonl")
+        self.index_path = os.path.join(directory, "events.idx")
+        self._lock = threading.Lock()
+        self._recover()
+        self._data = open(self.data_path, "ab")
+        self._index_file = open(self.index_path, "ab")
+        self._reader = open(self.data_path, "rb")
+        self._index: Optional[np.ndarray] = None
+        self._indexed = -1
+        self._cache: "OrderedDict[int, Event]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def _recover(self) -> None:
+        """Отбрасывает недописанный хвост после аварийной остановки."""
+        if not os.path.exists(self.index_path):
+            open(self.index_path, "wb").close()
+        if not os.path.exists(self.data_path):
+            open(self.data_path, "wb").close()
+        entries = os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE, count=entries)
+        data_size = os.path.getsize(self.data_path)
+        # Целый префикс индекса: записи идут встык и их данные целиком на диске
+        ends = index["offset"] + index["length"]
+        ok = ends <= data_size
+        if entries:
+            ok[0] &= index["offset"][0] == 0
+            ok[1:] &= index["offset"][1:] == ends[:-1]
+        valid = entries if ok.all() else int(np.argmin(ok))
+        end = int(ends[valid - 1]) if valid else 0
+        if valid != entries or end != data_size:
+            logger.warning(f"Журнал событий: отброшено {entries - valid} записей индекса "
+                           f"и {data_size - end} байт данных")
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid * INDEX_DTYPE.itemsize)
+            with open(self.data_path, "r+b") as f:
+                f.truncate(end)
+        self._offset = end
+        self._last_ts = float(index["ts"][valid - 1]) if valid else 0.0
+
+    def append(self, events: List[Event]) -> None:
+        """Дописывает пачку событий (подписчик темы EVENTS шины)."""
+        if not events:
+            return
+        entries = np.empty(len(events), dtype=INDEX_DTYPE)
+        chunks = []
+        with self._lock:
+            offset = self._offset
+            for i, event in enumerate(events):
+                line = json.dumps(event._asdict(), ensure_ascii=False).encode() + b"\n"
+                self._last_ts = max(self._last_ts, event.timestamp)
+                entries[i] = (self._last_ts, event.device_id, len(line), offset)
+                offset += len(line)
+                chunks.append(line)
+            # Сначала данные, затем индекс: запись индекса не опережает данные
+            self._data.write(b"".join(chunks))
+            self._data.flush()
+            self._index_file.write(entries.tobytes())
+            self._index_file.flush()
+            self._offset = offset
+
+    def __call__(self, events: List[Event]) -> None:
+        self.append(events)
+
+    def _load_index(self) -> np.ndarray:
+        size = os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize
+        if size != self._indexed:
+            self._index = (
+                np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", shape=(size,))
+                if size else np.empty(0, dtype=INDEX_DTYPE)
+            )
+            self._indexed = size
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+    def select(self, start: Optional[float] = None, end: Optional[float] = None,
+               device_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Номера записей за [start, end) по выбранным устройствам."""
+        index = self._load_index()
+        ts = index["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(index) if end is None else int(np.searchsorted(ts, end, side="left"))
+        positions = np.arange(lo, hi, dtype=np.int64)
+        if device_ids is not None:
+            wanted = np.fromiter(device_ids, dtype=np.int32)
+            positions = positions[np.isin(index["device_id"][lo:hi], wanted)]
+        return positions
+
+    def read(self, position: int) -> Event:
+        """Событие по номеру записи (с небольшим LRU-кешем)."""
+        event = self._cache.get(position)
+        if event is not None:
+            self._cache.move_to_end(position)
+            return event
+        entry = self._load_index()[position]
+        raw = os.pread(self._reader.fileno(), int(entry["length"]), int(entry["offset"]))
+        event = Event(**json.loads(raw))
+        self._cache[position] = event
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return event
+
+    def close(self) -> None:
+        with self._lock:
+            self._data.close()
+            self._index_file.close()
+            self._reader.close()
+        self._index = None
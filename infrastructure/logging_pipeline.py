@@ -0,0 +1,179 @@
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Dict, Optional, Tuple
+
+# Атрибуты, которые есть у любой LogRecord; всё остальное пришло через extra
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON; поля из extra (device_id,
+    parameter_id, value, status, ...) выносятся на верхний уровень."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ReadingSampler(logging.Filter):
+    """Прореживание частых записей о показаниях.
+
+    Касается только записей с extra={"reading": True} уровня ниже WARNING:
+    по каждой паре (устройство, параметр) пропускается каждая every-я запись
+    и не чаще раза в min_interval секунд. Смены статуса и всё остальное
+    проходят без ограничений.
+    """
+
+    def __init__(self, every: int = 1, min_interval: float = 0.0):
+        super().__init__()
+        self.every = max(1, every)
+        self.min_interval = min_interval
+        self._state: Dict[Tuple, list] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "reading", False):
+            return True
+        key = (getattr(record, "device_id", None), getattr(record, "parameter_id", None))
+        state = self._state.get(key)
+        if state is None:
+            self._state[key] = [0, record.created]
+            return True
+
+        state[0] += 1
+        if state[0] % self.every or record.created - state[1] < self.min_interval:
+            self.dropped += 1
+            return False
+        state[1] = record.created
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Кладёт запись в очередь как есть: форматирование сообщения
+    (getMessage, JSON) выполняет поток записи, а не цикл событий."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class LogPipeline:
+    """Логирование вне цикла событий.
+
+    Корневой логгер получает только QueueHandler; файл (с ротацией по
+    размеру или по времени) и консоль обслуживает QueueListener в
+    отдельном потоке, так что задержки диска не блокируют опрос.
+    """
+
+    def __init__(
+            self,
+            level: str = "INFO",
+            path: Optional[str] = None,
+            json_format: bool = True,
+            max_bytes: int = 50 * 1024 * 1024,
+            rotate_when: str = "",
+            backup_count: int = 10,
+            reading_every: int = 1,
+            reading_min_interval: float = 0.0,
+            console: bool = True,
+    ):
+        self.level = getattr(logging, level.upper(), logging.INFO) if isinstance(level, str) else level
+        self.sampler = ReadingSampler(reading_every, reading_min_interval)
+        self._queue = queue.SimpleQueue()
+
+        self.handlers = []
+        if path:
+            if rotate_when:
+                file_handler = TimedRotatingFileHandler(
+                    path, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+                )
+            else:
+                file_handler = RotatingFileHandler(
+                    path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+                )
+            file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+            self.handlers.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            self.handlers.append(console_handler)
+
+        self._queue_handler = _DeferredQueueHandler(self._queue)
+        self._queue_handler.addFilter(self.sampler)
+        self._listener = QueueListener(self._queue, *self.handlers, respect_handler_level=True)
+        self._started = False
+
+    def start(self) -> None:
+        """Подменяет обработчики корневого логгера очередью и запускает поток записи."""
+        if self._started:
+            return
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self._queue_handler)
+        root.setLevel(self.level)
+        self._listener.start()
+        self._started = True
+
+    def stop(self) -> None:
+        """Дописывает очередь и закрывает файлы."""
+        if not self._started:
+            return
+        logging.getLogger().removeHandler(self._queue_handler)
+        self._listener.stop()
+        for handler in self.handlers:
+            handler.close()
+        self._started = False
+
+
+def benchmark(records: int = 50_000) -> Dict[str, float]:
+    """Время на логирование одного показания в вызывающем потоке, мкс:
+    синхронный FileHandler против очереди."""
+    import os
+    import tempfile
+
+    logger = logging.getLogger("logging_pipeline.bench")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        file_handler = logging.FileHandler(os.path.join(tmp, "sync.log"), encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        pipeline = LogPipeline(path=os.path.join(tmp, "async.log"), console=False)
+        cases = {"FileHandler": [file_handler], "QueueHandler": [pipeline._queue_handler]}
+        pipeline._listener.start()
+        for name, handlers in cases.items():
+            logger.handlers = handlers
+            start = time.perf_counter()
+            for i in range(records):
+                logger.info(
+                    "%s | %s: %s -> %s", "Reinhardt#1", "T", 21.5, "OK",
+                    extra={"reading": True, "device_id": 1, "parameter_id": i % 8,
+                           "value": 21.5, "status": "OK"},
+                )
+            results[name] = (time.perf_counter() - start) / records * 1e6
+        logger.handlers = []
+        pipeline._listener.stop()
+        file_handler.close()
+        for handler in pipeline.handlers:
+            handler.close()
+    return results
+
+
+if __name__ == "__main__":
+    for name, us in benchmark().items():
+        print(f"{name:<14} {us:6.2f} мкс/запись")
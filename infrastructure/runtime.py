@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("runtime")
+
+# Отсчёт запуска: модуль импортируется первым из модулей проекта
+PROCESS_STARTED = time.perf_counter()
+
+AUTO = "auto"
+ASYNCIO = "asyncio"
+UVLOOP = "uvloop"
+LOOPS = (AUTO, ASYNCIO, UVLOOP)
+
+
+def loop_factory(kind: str = ASYNCIO) -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """Фабрика цикла событий: uvloop, если выбран и установлен; None — стандартный цикл."""
+    if kind == ASYNCIO:
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        # auto — молча; явный выбор без пакета (или на Windows) — с предупреждением
+        if kind == UVLOOP:
+            logger.warning("uvloop не установлен, используется стандартный цикл asyncio")
+        return None
+    return uvloop.new_event_loop
+
+
+def run(main: Awaitable, kind: str = ASYNCIO):
+    """asyncio.run() на выбранном цикле событий."""
+    with asyncio.Runner(loop_factory=loop_factory(kind)) as runner:
+        return runner.run(main)
+
+
+def loop_name() -> str:
+    loop = asyncio.get_running_loop()
+    return "uvloop" if type(loop).__module__.startswith("uvloop") else "asyncio"
+
+
+class FirstReadingProbe:
+    """Приёмник показаний для замера запуска: отмечает первое показание
+    каждого устройства и передаёт строки дальше без изменений."""
+
+    def __init__(self, sink, profile: "StartupProfile"):
+        self.sink = sink
+        self.profile = profile
+
+    def put(self, device_id: int, parameter_id: int, timestamp: float, value, status: str) -> None:
+        if device_id not in self.profile.first_readings:
+            self.profile.first_reading(device_id)
+        if self.sink is not None:
+            self.sink.put(device_id, parameter_id, timestamp, value, status)
+
+
+class StartupProfile:
+    """Замер запуска (--profile-startup): длительность этапов от старта
+    процесса и время до первого показания каждого устройства.
+
+    Этапы отмечаются mark(); первые показания приходят через
+    FirstReadingProbe, поставленный перед записью показаний. Отчёт — в
+    журнал и в JSON-файл (для сравнения перезапусков).
+    """
+
+    def __init__(self, directory: str = ".", timeout: float = 120.0):
+        self.directory = directory
+        self.timeout = timeout
+        self.phases: Dict[str, float] = {}
+        self.first_readings: Dict[int, float] = {}
+        self.expected = 0
+        self._last = PROCESS_STARTED
+        self._all_polled: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - PROCESS_STARTED
+
+    def mark(self, phase: str) -> None:
+        """Конец этапа: его длительность — время от предыдущей отметки."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def probe(self, sink) -> FirstReadingProbe:
+        return FirstReadingProbe(sink, self)
+
+    def first_reading(self, device_id: int) -> None:
+        # Вызывается и из потока агрегатора шардов — событие ставим через цикл
+        self.first_readings[device_id] = self.elapsed()
+        event = self._all_polled
+        if event is not None and len(self.first_readings) >= self.expected:
+            self._loop.call_soon_threadsafe(event.set)
+
+    async def wait_polled(self, expected: int) -> bool:
+        """Ждёт первых показаний от expected устройств (не дольше timeout)."""
+        self.expected = expected
+        self._loop = asyncio.get_running_loop()
+        self._all_polled = asyncio.Event()
+        if len(self.first_readings) >= expected:
+            return True
+        try:
+            await asyncio.wait_for(self._all_polled.wait(), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def report(self) -> dict:
+        latencies = sorted(self.first_readings.values())
+
+        def share(fraction: float) -> Optional[float]:
+            # Время до первого показания от доли fraction ожидаемых устройств
+            needed = max(1, math.ceil(self.expected * fraction))
+            return latencies[needed - 1] if needed <= len(latencies) else None
+
+        return {
+            "pid": os.getpid(),
+            "loop": loop_name(),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "devices": self.expected,
+            "polled": len(latencies),
+            "first_reading": {
+                "p50": share(0.5), "p90": share(0.9), "p99": share(0.99), "all": share(1.0),
+            },
+        }
+
+    def write(self) -> str:
+        """Записывает отчёт в журнал и в файл; возвращает путь к файлу."""
+        report = self.report()
+        phases = ", ".join(f"{name} {seconds:.3f} с" for name, seconds in report["phases"].items())
+        first = ", ".join(
+            f"{name} {'—' if value is None else f'{value:.2f} с'}"
+            for name, value in report["first_reading"].items()
+        )
+        logger.warning(
+            f"Запуск ({report['loop']}): {phases}; первые показания от "
+            f"{report['polled']} из {report['devices']} устройств — {first} от старта процесса"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"startup-{os.getpid()}-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
@@ -1,42 +1,327 @@
 import sys
+import argparse
 import asyncio
 import logging
+import math
+import os
+import signal
+import time
+from typing import TYPE_CHECKING
+from infrastructure import runtime  # первым: от него отсчитывается запуск
 from config import settings
-from infrastructure.db.postgres import PostgresDB
+from infrastructure.db.config_cache import ConfigCache, AsyncConfigSource, SyncConfigSource, install_triggers
+from infrastructure.db.executor import DBExecutor
+from infrastructure.db.measurement_writer import MeasurementWriter
+from infrastructure.db.postgres import PostgresDB, pool_size_for_pollers
+from infrastructure.db.repositories.repositories import DeviceRepository
+from infrastructure.logging_pipeline import LogPipeline
+from infrastructure.metrics import REGISTRY, MetricsServer, TextfileExporter
 from core.service.polling_service import PollingService
+from core.service.reading_bus import EVENTS, ReadingBus
+from core.service.scheduler import PollScheduler
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Вывод в консоль
-        logging.FileHandler("reinhardt_monitor.log")  # Запись в файл
-    ]
-)
+# Агрегаты, журнал событий и шардирование (multiprocessing) нужны не в каждом
+# режиме — импортируются там, где используются, чтобы не удлинять запуск
+if TYPE_CHECKING:
+    from infrastructure.db.rollups import RollupAggregator
 
 
-async def main():
-    try:
-        # Инициализация базы данных
-        db = PostgresDB(
+def create_log_pipeline(path: str = None) -> LogPipeline:
+    """Логирование через очередь: консоль и файл с ротацией пишет отдельный поток."""
+    return LogPipeline(
+        level=settings.LOG_LEVEL,
+        path=path or settings.LOG_FILE,
+        json_format=settings.LOG_JSON,
+        max_bytes=settings.LOG_ROTATE_BYTES,
+        rotate_when=settings.LOG_ROTATE_WHEN,
+        backup_count=settings.LOG_BACKUP_COUNT,
+        reading_every=settings.LOG_READING_EVERY,
+        reading_min_interval=settings.LOG_READING_MIN_INTERVAL,
+    )
+
+
+def start_metrics(db, shard: int = None) -> list:
+    """Выдача метрик процесса; возвращает запущенные экспортёры."""
+    logger = logging.getLogger("main")
+    REGISTRY.add_collector(db.collect_metrics)
+    exporters = []
+    if settings.METRICS_PORT:
+        port = settings.METRICS_PORT if shard is None else settings.METRICS_PORT + 1 + shard
+        exporters.append(MetricsServer(REGISTRY, settings.METRICS_HOST, port))
+    if settings.METRICS_TEXTFILE:
+        path = settings.METRICS_TEXTFILE if shard is None else f"{settings.METRICS_TEXTFILE}.shard{shard}"
+        exporters.append(TextfileExporter(path, REGISTRY))
+    started = []
+    for exporter in exporters:
+        try:
+            exporter.start()
+            started.append(exporter)
+        except OSError as e:
+            logger.warning(f"Выдача метрик не запущена: {e}")
+    return started
+
+
+def count_enabled_devices(db) -> int:
+    with db.session_scope() as session:
+        return DeviceRepository(session).count_devices_by_is_enable_true()
+
+
+def create_database(shards: int = 1, init_schema: bool = False):
+    """БД с пулом по числу опросчиков процесса; возвращает (db, потоков БД).
+
+    init_schema — сначала привести схему к моделям (в главном процессе,
+    до первых запросов: выборки моделей ссылаются на новые колонки).
+    """
+    logger = logging.getLogger("main")
+    db = PostgresDB(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    if init_schema:
+        db.init_db()
+
+    # Размер пула — по числу опросчиков
+    executor_workers = settings.DB_EXECUTOR_WORKERS
+    if settings.DB_POOL_AUTO:
+        pollers = math.ceil(count_enabled_devices(db) / shards)
+        executor_workers, pool_size = pool_size_for_pollers(pollers)
+        db.resize_pool(max(pool_size, settings.DB_POOL_SIZE), settings.DB_MAX_OVERFLOW)
+        logger.info(
+            f"Устройств на процесс: {pollers}, пул БД: {db.pool_size}, "
+            f"потоков БД: {executor_workers}"
+        )
+    return db, executor_workers
+
+
+def create_config_cache(db, executor_workers: int, device_filter=None) -> ConfigCache:
+    # Источник конфигурации: asyncpg или синхронные репозитории в пуле потоков
+    if settings.DB_ASYNC:
+        from infrastructure.db.postgres_async import AsyncPostgresDB
+        async_db = AsyncPostgresDB(
             settings.DATABASE_URL,
             pool_size=settings.DB_POOL_SIZE,
             max_overflow=settings.DB_MAX_OVERFLOW,
         )
-        session = db.get_session()
-        logger = logging.getLogger("main")
+        config_source = AsyncConfigSource(async_db)
+    else:
+        config_source = SyncConfigSource(
+            DBExecutor(db.session_scope, max_workers=executor_workers)
+        )
+
+    # Кеш конфигурации с обновлением по LISTEN/NOTIFY
+    return ConfigCache(config_source, engine=db.engine, device_filter=device_filter)
+
+
+def create_polling_service(config_cache, measurement_sink, bus=None) -> PollingService:
+    return PollingService(
+        config_cache,
+        measurement_writer=measurement_sink,
+        scheduler=PollScheduler(max_concurrency=settings.POLL_MAX_CONCURRENCY),
+        poll_interval=settings.POLL_INTERVAL,
+        bus=bus,
+        adaptive=settings.POLL_ADAPTIVE,
+        max_silence=settings.MEASUREMENT_MAX_SILENCE,
+        stall_threshold=settings.LOOP_STALL_THRESHOLD,
+        check_concurrency=settings.CHECK_MAX_CONCURRENCY,
+        profile_dir=settings.PROFILE_DIR,
+        profile_mode=settings.PROFILE_MODE,
+    )
+
+
+def install_debug_signals(polling_service: PollingService) -> None:
+    """SIGUSR1 — профилирование цикла событий вкл/выкл, SIGUSR2 — отчёт
+    asyncio о медленных колбэках вкл/выкл, SIGHUP — перечитать конфигурацию
+    опроса; всё без перезапуска процесса."""
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, polling_service.toggle_profiling)
+        loop.add_signal_handler(signal.SIGUSR2, polling_service.toggle_slow_callbacks)
+        loop.add_signal_handler(signal.SIGHUP, polling_service.request_reload)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # Windows: нет SIGUSR*/SIGHUP — через toggle_* и request_reload() сервиса
+        logging.getLogger("main").info("Сигналы профилирования недоступны на этой платформе")
+
+
+def start_rollups(db, bus: ReadingBus) -> "RollupAggregator":
+    """Агрегатор минутных/часовых/суточных рядов на шине показаний.
+
+    Подписывается до начала опроса; открытые интервалы до этого момента
+    досчитывает seed_rollups уже в фоне.
+    """
+    from infrastructure.db.rollups import RollupAggregator
+    rollups = RollupAggregator(
+        db.engine,
+        flush_interval=settings.ROLLUP_FLUSH_INTERVAL,
+        grace=settings.ROLLUP_GRACE,
+    )
+    bus.subscribe(rollups)
+    rollups.start()
+    return rollups
+
+
+async def seed_rollups(rollups: "RollupAggregator", now: float, keep=None) -> None:
+    """Открытые интервалы — из сырых показаний до now (keep(device_id) —
+    устройства процесса).
+
+    now — момент до начала опроса: всё позже агрегатор получил с шины, а
+    запись слиянием складывает части интервала, даже если он успел
+    закрыться и записаться раньше, чем закончилось восстановление.
+    """
+    try:
+        await asyncio.to_thread(rollups.seed, now, keep)
+    except Exception as e:
+        logging.getLogger("main").warning(f"Не удалось восстановить открытые интервалы агрегатов: {e}")
+
+
+async def backfill_rollups(db, now: float = None) -> None:
+    """Закрытые интервалы до now, пропущенные за время простоя, — из сырых показаний.
+
+    Интервалы не пересекаются с теми, что seed(now) отдаёт агрегатору,
+    поэтому восстановление может идти параллельно с опросом.
+    """
+    from infrastructure.db.rollups import backfill
+    try:
+        await asyncio.to_thread(
+            backfill, db.engine, now, settings.ROLLUP_BACKFILL_DAYS * 86400
+        )
+    except Exception as e:
+        logging.getLogger("main").warning(f"Не удалось восстановить агрегаты: {e}")
+
+
+def shard_worker(shard: int, shards: int, results, stop_event):
+    """Точка входа рабочего процесса в режиме супервизора."""
+    # У каждого процесса свой файл: ротация одного файла из нескольких
+    # процессов небезопасна
+    log_pipeline = create_log_pipeline(f"{settings.LOG_FILE}.shard{shard}")
+    log_pipeline.start()
+    try:
+        runtime.run(run_shard(shard, shards, results, stop_event), settings.EVENT_LOOP)
+    finally:
+        log_pipeline.stop()
+
+
+async def run_shard(shard: int, shards: int, results, stop_event):
+    from core.service.sharding import HashRing, QueueSink, shard_filter
+    logger = logging.getLogger(f"shard-{shard}")
+    db, executor_workers = create_database(shards)
+    exporters = start_metrics(db, shard)
+    config_cache = create_config_cache(
+        db, executor_workers, device_filter=shard_filter(shard, shards)
+    )
+
+    # Показания и события уходят агрегатору в родительский процесс; агрегаты
+    # по интервалам шард считает сам — по несжатым показаниям своих устройств
+    sink = QueueSink(results)
+    bus = ReadingBus()
+    bus.subscribe(sink.put_events, topic=EVENTS)
+    rollups = seed_task = None
+    started_at = time.time()
+    if settings.ROLLUP_ENABLED:
+        rollups = start_rollups(db, bus)
+    polling_service = create_polling_service(config_cache, sink, bus=bus)
+    await sink.start()
+    await polling_service.start()
+    install_debug_signals(polling_service)
+    if rollups is not None:
+        ring = HashRing(shards)
+        seed_task = asyncio.create_task(
+            seed_rollups(rollups, started_at, keep=lambda device_id: ring.shard_for(device_id) == shard)
+        )
+    logger.info(f"Шард {shard}/{shards} запущен")
+    try:
+        while not stop_event.is_set():
+            await asyncio.sleep(1)
+    finally:
+        if seed_task is not None:
+            seed_task.cancel()
+        await polling_service.stop()
+        await sink.stop()
+        if rollups is not None:
+            await asyncio.to_thread(rollups.stop)
+        for exporter in exporters:
+            exporter.stop()
+
+
+async def main(profile: runtime.StartupProfile = None):
+    logger = logging.getLogger("main")
+    # Замер запуска: отметки этапов (no-op без --profile-startup)
+    mark = profile.mark if profile is not None else (lambda phase: None)
+    mark("import")
+    polling_service = measurement_writer = event_store = None
+    rollups = backfill_task = seed_task = None
+    exporters = ()
+    try:
+        # Инициализация базы данных
+        db, executor_workers = create_database(init_schema=True)
+        exporters = start_metrics(db)
+
+        try:
+            install_triggers(db.engine)
+        except Exception as e:
+            logger.warning(f"Не удалось установить триггеры конфигурации: {e}")
+        mark("database")
+
+        # Фоновая пакетная запись показаний
+        measurement_writer = MeasurementWriter(
+            db.engine,
+            batch_size=settings.MEASUREMENT_BATCH_SIZE,
+            flush_interval=settings.MEASUREMENT_FLUSH_INTERVAL,
+            max_queue=settings.MEASUREMENT_MAX_QUEUE,
+            spill_path=settings.MEASUREMENT_SPILL_FILE,
+        )
+        measurement_writer.start()
+        # При замере запуска первые показания устройств отмечаются по пути к записи
+        sink = measurement_writer if profile is None else profile.probe(measurement_writer)
+
+        # Агрегаты: интервалы до started_at восстанавливаются в фоне после
+        # начала опроса; всё позже агрегатор получает с шины
+        started_at = time.time()
 
-        # Создаем сервис опроса
-        polling_service = PollingService(session)
+        # Смены статуса — в журнал событий на диске (его читает архив в окне);
+        # в режиме супервизора события шардов приходят на шину через агрегатор
+        from infrastructure.event_store import EventStore
+        bus = ReadingBus()
+        event_store = EventStore(settings.EVENT_STORE_DIR)
+        bus.subscribe(event_store, topic=EVENTS)
+
+        # Создаем сервис опроса: в этом процессе или в K рабочих процессах
+        if settings.POLL_SHARDS > 1:
+            from core.service.sharding import ShardSupervisor
+            polling_service = ShardSupervisor(
+                settings.POLL_SHARDS, shard_worker,
+                measurement_writer=sink, bus=bus,
+            )
+        else:
+            config_cache = create_config_cache(db, executor_workers)
+            if settings.ROLLUP_ENABLED:
+                rollups = start_rollups(db, bus)
+            polling_service = create_polling_service(config_cache, sink, bus=bus)
+        mark("setup")
 
         # Запускаем сервис опроса
         await polling_service.start()
+        if isinstance(polling_service, PollingService):
+            install_debug_signals(polling_service)
+        if settings.ROLLUP_ENABLED:
+            backfill_task = asyncio.create_task(backfill_rollups(db, started_at))
+        if rollups is not None:
+            seed_task = asyncio.create_task(seed_rollups(rollups, started_at))
+        mark("start")
         logger.info("Сервис опроса успешно запущен")
 
-        # Бесконечный цикл ожидания
+        if profile is not None:
+            # Ждём первых показаний от всех включённых устройств, пишем отчёт и выходим
+            expected = await asyncio.to_thread(count_enabled_devices, db)
+            await profile.wait_polled(expected)
+            mark("first readings")
+            logger.info(f"Отчёт о запуске: {profile.write()}")
+            return
+
+        # Бесконечный цикл ожидания с периодическим отчётом о пуле БД
         while True:
-            await asyncio.sleep(1)
+            await asyncio.sleep(60)
+            logger.info(f"Пул БД: {db.pool_stats()}")
 
     except KeyboardInterrupt:
         logger.info("Приложение остановлено пользователем")
@@ -45,9 +330,43 @@ async def main():
         sys.exit(1)
     finally:
         # Останавливаем сервис при выходе
-        if 'polling_service' in locals():
+        if polling_service is not None:
             await polling_service.stop()
+        if measurement_writer is not None:
+            await asyncio.to_thread(measurement_writer.stop)
+        if backfill_task is not None:
+            # Прерванное восстановление продолжится при следующем запуске
+            backfill_task.cancel()
+        if seed_task is not None:
+            seed_task.cancel()
+        if rollups is not None:
+            await asyncio.to_thread(rollups.stop)
+        if event_store is not None:
+            event_store.close()
+        for exporter in exporters:
+            exporter.stop()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сервис опроса станций Reinhardt")
+    parser.add_argument("--loop", choices=runtime.LOOPS, default=settings.EVENT_LOOP,
+                        help="цикл событий (auto — uvloop, если установлен)")
+    parser.add_argument("--profile-startup", type=float, nargs="?", const=120.0, metavar="SECONDS",
+                        help="замерить запуск и время до первых показаний всех устройств "
+                             "(ждать не дольше SECONDS), записать отчёт в PROFILE_DIR и выйти")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    # Рабочие процессы шардов запускаются через spawn и читают настройки заново
+    os.environ["EVENT_LOOP"] = args.loop
+    profile = None
+    if args.profile_startup is not None:
+        profile = runtime.StartupProfile(settings.PROFILE_DIR, timeout=args.profile_startup)
+    log_pipeline = create_log_pipeline()
+    log_pipeline.start()
+    try:
+        runtime.run(main(profile), args.loop)
+    finally:
+        log_pipeline.stop()
@@ -1,7 +1,7 @@
-import asyncio
 import logging
 import sys
 
+from infrastructure import runtime
 from config import settings
 from infrastructure.db.postgres import PostgresDB
 from core.service.polling import SensorPollingService
@@ -40,7 +40,7 @@ async def main():
 if __name__ == "__main__":
     setup_logging()
     try:
-        asyncio.run(main())
+        runtime.run(main(), settings.EVENT_LOOP)
     except Exception:
         logging.getLogger("main").exception("Неожиданная ошибка")
         sys.exit(1)
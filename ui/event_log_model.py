@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+from infrastructure.event_store import EventRing, EventStore
+
+ALARM_TEXT_COLOR = QColor("#B00020")
+
+
+class EventLogModel(QAbstractListModel):
+    """Журнал событий для QListView.
+
+    Текущий режим — кольцевой буфер последних событий: новые дописываются
+    в конец, вытесненные удаляются из начала, без перестройки всего списка.
+    Архивный режим — выборка номеров записей из EventStore: в памяти только
+    массив номеров, а текст события читается с диска, когда вид запрашивает
+    видимую строку.
+    """
+
+    def __init__(self, ring: EventRing, store: EventStore = None, parent=None):
+        super().__init__(parent)
+        self.ring = ring
+        self.store = store
+        self._positions = None  # номера записей архива; None — текущий режим
+
+    @property
+    def is_history(self) -> bool:
+        return self._positions is not None
+
+    def append_events(self, events: list):
+        """Новые события (в поток GUI их доставляет ReadingBridge)."""
+        if self.is_history:
+            self.ring.extend(events)
+            return
+        if len(events) >= self.ring.capacity:
+            self.beginResetModel()
+            self.ring.extend(events)
+            self.endResetModel()
+            return
+        dropped = self.ring.overflow(len(events))
+        if dropped:
+            self.beginRemoveRows(QModelIndex(), 0, dropped - 1)
+            self.ring.drop_oldest(dropped)
+            self.endRemoveRows()
+        first = len(self.ring)
+        self.beginInsertRows(QModelIndex(), first, first + len(events) - 1)
+        self.ring.extend(events)
+        self.endInsertRows()
+
+    def show_history(self, start=None, end=None, device_ids=None):
+        if self.store is None:
+            return
+        self.beginResetModel()
+        self._positions = self.store.select(start, end, device_ids)
+        self.endResetModel()
+
+    def show_live(self):
+        self.beginResetModel()
+        self._positions = None
+        self.endResetModel()
+
+    def event(self, row: int):
+        if self.is_history:
+            return self.store.read(int(self._positions[row]))
+        return self.ring[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._positions) if self.is_history else len(self.ring)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            event = self.event(index.row())
+            return f"{datetime.fromtimestamp(event.timestamp):%d.%m.%Y %H:%M:%S} {event.message}"
+        if role == Qt.ForegroundRole and self.event(index.row()).status == "ALARM":
+            return ALARM_TEXT_COLOR
+        return None
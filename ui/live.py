@@ -0,0 +1,204 @@
+"""Главное окно с живыми показаниями.
+
+Опрос работает в своём цикле событий (в фоновом потоке или, если
+установлен qasync, прямо в цикле Qt), показания идут через ReadingBus,
+схлопываются по (устройство, параметр) и доставляются в окно не чаще
+UI_MAX_FPS раз в секунду. При POLL_SHARDS > 1 опрашивают процессы-шарды,
+а их показания публикует в шину агрегатор супервизора:
+
+    python -m ui.live
+"""
+import asyncio
+import sys
+import threading
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtWidgets import QApplication
+
+from core.service.reading_bus import EVENTS, LatestValues, ReadingBus
+
+try:
+    import qasync
+except ImportError:  # работаем через фоновый поток
+    qasync = None
+
+
+class ReadingBridge(QObject):
+    """Мост шины показаний в поток GUI.
+
+    Подписчик на шине (LatestValues) только запоминает последнее показание
+    пары; таймер Qt раз в кадр забирает накопленное и отдаёт его сигналом
+    readings — уже в потоке GUI и одной пачкой.
+    """
+
+    readings = Signal(dict)
+    # События не схлопываются: за кадр приходят все накопившиеся
+    events = Signal(list)
+    # Поменялся состав устройств или параметров — раскладку таблицы пора перестроить
+    config_changed = Signal()
+
+    def __init__(self, bus: ReadingBus, max_fps: float = 10.0, parent=None):
+        super().__init__(parent)
+        self._latest = LatestValues()
+        self._pending_events = []
+        self._events_lock = threading.Lock()
+        self._unsubscribe = [
+            bus.subscribe(self._latest),
+            bus.subscribe(self._queue_events, topic=EVENTS),
+        ]
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, int(1000 / max_fps)))
+        self._timer.timeout.connect(self._deliver)
+        self._timer.start()
+
+    def watch_config(self, config_cache):
+        # Сигнал из потока опроса доставляется в поток GUI очередью Qt
+        config_cache.subscribe(self._on_config_change)
+
+    def _on_config_change(self, table: str, payload: dict):
+        if table in ("device", "device_type", "parameter", "*"):
+            self.config_changed.emit()
+
+    def _queue_events(self, events: list):
+        with self._events_lock:
+            self._pending_events.extend(events)
+
+    def _deliver(self):
+        updates = self._latest.drain()
+        if updates:
+            self.readings.emit(updates)
+        with self._events_lock:
+            events, self._pending_events = self._pending_events, []
+        if events:
+            self.events.emit(events)
+
+    def stats(self) -> dict:
+        return {"received": self._latest.received, "coalesced": self._latest.coalesced}
+
+    def close(self):
+        self._timer.stop()
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+
+
+class PollingThread(threading.Thread):
+    """Сервис опроса в собственном цикле событий в фоновом потоке."""
+
+    def __init__(self, service):
+        super().__init__(name="polling", daemon=True)
+        self.service = service
+        self._loop = None
+        self._stop_event = None
+        self._ready = threading.Event()
+
+    def run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._ready.set()
+        await self.service.start()
+        try:
+            await self._stop_event.wait()
+        finally:
+            await self.service.stop()
+
+    def stop(self, timeout: float = 15.0):
+        if self._ready.wait(timeout) and self.is_alive():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        self.join(timeout)
+
+
+class SupervisedPolling:
+    """Опрос в процессах-шардах для окна.
+
+    Устройства опрашивает ShardSupervisor; кеш конфигурации (имена
+    устройств и параметров для таблицы) обновляется в процессе окна.
+    """
+
+    def __init__(self, supervisor, config_cache):
+        self.supervisor = supervisor
+        self.config_cache = config_cache
+
+    async def start(self):
+        await self.config_cache.start()
+        await self.supervisor.start()
+
+    async def stop(self):
+        await self.supervisor.stop()
+        await self.config_cache.stop()
+
+
+def main():
+    from config import settings
+    from reinhardt_application import (
+        create_config_cache, create_database, create_log_pipeline, create_polling_service,
+        shard_worker,
+    )
+    from core.service.sharding import ShardSupervisor
+    from infrastructure.db.measurement_writer import MeasurementWriter
+    from infrastructure.event_store import EventStore
+    from ui.main_window import MeteoMonitor
+
+    log_pipeline = create_log_pipeline()
+    log_pipeline.start()
+
+    app = QApplication(sys.argv)
+    db, executor_workers = create_database()
+    config_cache = create_config_cache(db, executor_workers)
+    measurement_writer = MeasurementWriter(
+        db.engine,
+        batch_size=settings.MEASUREMENT_BATCH_SIZE,
+        flush_interval=settings.MEASUREMENT_FLUSH_INTERVAL,
+        max_queue=settings.MEASUREMENT_MAX_QUEUE,
+        spill_path=settings.MEASUREMENT_SPILL_FILE,
+    )
+    measurement_writer.start()
+
+    bus = ReadingBus()
+    # Смены статуса — в журнал событий на диске; в режиме супервизора
+    # события шардов приходят на шину через агрегатор
+    event_store = EventStore(settings.EVENT_STORE_DIR)
+    bus.subscribe(event_store, topic=EVENTS)
+    if settings.POLL_SHARDS > 1:
+        supervisor = ShardSupervisor(
+            settings.POLL_SHARDS, shard_worker,
+            measurement_writer=measurement_writer, bus=bus,
+        )
+        service = SupervisedPolling(supervisor, config_cache)
+    else:
+        service = create_polling_service(config_cache, measurement_writer, bus=bus)
+    bridge = ReadingBridge(bus, max_fps=settings.UI_MAX_FPS)
+    bridge.watch_config(config_cache)
+
+    window = MeteoMonitor(
+        bridge=bridge, config_cache=config_cache,
+        event_store=event_store, event_capacity=settings.EVENT_LOG_CAPACITY,
+    )
+    window.show()
+
+    try:
+        if qasync is not None:
+            loop = qasync.QEventLoop(app)
+            asyncio.set_event_loop(loop)
+            with loop:
+                loop.run_until_complete(service.start())
+                closed = asyncio.Event()
+                app.aboutToQuit.connect(closed.set)
+                loop.run_until_complete(closed.wait())
+                loop.run_until_complete(service.stop())
+        else:
+            polling = PollingThread(service)
+            polling.start()
+            app.exec()
+            polling.stop()
+    finally:
+        bridge.close()
+        event_store.close()
+        measurement_writer.stop()
+        log_pipeline.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QLineEdit, QTextEdit, QFrame, QDialog,
+    QTableWidget, QTableWidgetItem, QTableView, QListView, QLineEdit, QTextEdit, QFrame, QDialog,
     QFormLayout, QGroupBox, QComboBox, QDialogButtonBox
 )
 from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QFont, QPalette, QColor
 
+from core.service.reading_bus import Event
+from infrastructure.event_store import EventRing
+from ui.event_log_model import EventLogModel
+from ui.readings_model import ReadingsTableModel, make_proxy
+
 
 class EditDialog(QDialog):
     def __init__(self, parent=None):
@@ -185,7 +193,7 @@ class CustomTitleBar(QWidget):
 
 
 class MeteoMonitor(QWidget):
-    def __init__(self):
+    def __init__(self, bridge=None, config_cache=None, event_store=None, event_capacity=10_000):
         super().__init__()
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setMinimumSize(910, 450)
@@ -266,11 +274,26 @@ class MeteoMonitor(QWidget):
         # Центральная панель
         center_panel = QVBoxLayout()
 
-        self.table = QTableWidget(0, 7)
-        self.table.setHorizontalHeaderLabels([
-            "Датчик", "Температура", "Влажность", "Давление",
-            "Скорость ветра", "Направление", "CVF"
-        ])
+        # Таблица показаний: модель поверх столбцового снимка; сортировка
+        # и фильтр — через прокси, без копирования данных
+        self.model = ReadingsTableModel(config_cache, self)
+        self.proxy = make_proxy(self.model, self)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Фильтр по датчику")
+        self.filter_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #FFFFFF;
+                border: 2px solid #925FE2;
+                border-radius: 5px;
+                padding: 4px;
+            }
+        """)
+        self.filter_input.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
         self.table.setStyleSheet("""
             QHeaderView::section {
                 background-color: #925FE2;
@@ -281,22 +304,6 @@ class MeteoMonitor(QWidget):
         self.table.setFixedHeight(180)
         self.table.verticalHeader().setVisible(False)
 
-        data = [
-            ["Reinhardt#1", "20,38", "55,5", "99,165", "---", "---", "---"],
-            ["Reinhardt#2", "21,4", "30,23", "99,059", "---", "---", "---"],
-            ["Reinhardt#3", "19,02", "64,41", "98,953", "---", "---", "---"],
-            ["Reinhardt#4", "17,97", "98,74", "99,104", "10,12", "341,08", "16,58"],
-            ["Reinhardt#5", "25,38", "84,21", "98,714", "0", "266,58", "25,38"],
-            ["Reinhardt#13", "25,38", "84,21", "98,714", "0", "266,58", "25,38"]
-        ]
-        for row_data in data:
-            row_idx = self.table.rowCount()
-            self.table.insertRow(row_idx)
-            for col_idx, value in enumerate(row_data):
-                item = QTableWidgetItem(value)
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row_idx, col_idx, item)
-
         # Лог событий
         log_frame = QFrame()
         log_frame.setFixedHeight(220)
@@ -305,24 +312,93 @@ class MeteoMonitor(QWidget):
             border-radius: 15px;
         """)
         log_layout = QVBoxLayout(log_frame)
+        log_header = QHBoxLayout()
         log_label = QLabel("События")
         log_label.setFont(QFont("Arial", 10, QFont.Bold))
-        log_text = QTextEdit()
-        log_text.setReadOnly(True)
-        log_text.setStyleSheet("background-color: #F8F8F8; border: none;")
-        log_text.setText("\n".join([
-         "01.08.2024 10:34:20 Станция контроля метеорологических параметров №2 (ОС2): Температура выше порога: (24.0 "
-         "> 23.8999996185303)"
-        ] * 12))
-        log_layout.addWidget(log_label)
-        log_layout.addWidget(log_text)
-
+        # Архив за неделю по устройствам, видимым в таблице (с учётом фильтра)
+        self.btn_history = QPushButton("Архив за неделю")
+        self.btn_history.setCheckable(True)
+        self.btn_history.setEnabled(event_store is not None)
+        self.btn_history.toggled.connect(self.toggle_history)
+        log_header.addWidget(log_label)
+        log_header.addStretch()
+        log_header.addWidget(self.btn_history)
+
+        # Вид рисует только видимые строки; память ограничена ёмкостью буфера
+        self.events_model = EventLogModel(EventRing(event_capacity), event_store, self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.events_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setStyleSheet("background-color: #F8F8F8; border: none;")
+        self.events_model.rowsInserted.connect(self._follow_log)
+        log_layout.addLayout(log_header)
+        log_layout.addWidget(self.log_view)
+
+        center_panel.addWidget(self.filter_input)
         center_panel.addWidget(self.table)
         center_panel.addWidget(log_frame)
 
         content.addWidget(left_panel_widget, 1)
         content.addLayout(center_panel, 4)
 
+        if bridge is not None:
+            bridge.readings.connect(self.model.apply_readings)
+            bridge.config_changed.connect(self.model.reload_layout)
+            bridge.events.connect(self.events_model.append_events)
+        else:
+            # Без источника показаний — демонстрационные данные
+            self._load_demo()
+
+    def toggle_history(self, checked: bool):
+        if checked:
+            self.events_model.show_history(time.time() - 7 * 24 * 3600, None, self._visible_device_ids())
+        else:
+            self.events_model.show_live()
+        self.log_view.scrollToBottom()
+
+    def _visible_device_ids(self):
+        """Устройства, оставшиеся в таблице после фильтра; None — все."""
+        if not self.filter_input.text():
+            return None
+        return [
+            int(self.model.store.device_ids[self.proxy.mapToSource(self.proxy.index(row, 0)).row()])
+            for row in range(self.proxy.rowCount())
+        ]
+
+    def _follow_log(self):
+        # Прокручиваем за новыми событиями, только если оператор внизу списка
+        bar = self.log_view.verticalScrollBar()
+        if bar.value() >= bar.maximum() - 2 * self.log_view.sizeHintForRow(0):
+            self.log_view.scrollToBottom()
+
+    def _load_demo(self):
+        names = ["Температура", "Влажность", "Давление", "Скорость ветра", "Направление", "CVF"]
+        data = [
+            ["Reinhardt#1", 20.38, 55.5, 99.165, None, None, None],
+            ["Reinhardt#2", 21.4, 30.23, 99.059, None, None, None],
+            ["Reinhardt#3", 19.02, 64.41, 98.953, None, None, None],
+            ["Reinhardt#4", 17.97, 98.74, 99.104, 10.12, 341.08, 16.58],
+            ["Reinhardt#5", 25.38, 84.21, 98.714, 0, 266.58, 25.38],
+            ["Reinhardt#13", 25.38, 84.21, 98.714, 0, 266.58, 25.38]
+        ]
+        devices = [
+            SimpleNamespace(id=i, name=row[0], device_type_id=1) for i, row in enumerate(data, 1)
+        ]
+        parameters = [SimpleNamespace(id=i, name=name) for i, name in enumerate(names, 1)]
+        self.model.set_layout(devices, {1: parameters})
+        self.model.apply_readings({
+            (device.id, param.id): (device.id, param.id, 0.0, value, "OK")
+            for device, row in zip(devices, data)
+            for param, value in zip(parameters, row[1:]) if value is not None
+        })
+        self.events_model.append_events([
+            Event(
+                datetime(2024, 8, 1, 10, 34, 20).timestamp(), 2, 1, "ALARM", 24.0,
+                "Станция контроля метеорологических параметров №2 (ОС2): "
+                "Температура выше порога: (24.0 > 23.8999996185303)",
+            )
+        ] * 12)
+
     def update_polling_period(self):
         try:
             value = int(self.period_input.text())
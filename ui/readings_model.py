@@ -0,0 +1,110 @@
+import math
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from PySide6.QtGui import QColor
+
+from ui.snapshot_store import SnapshotStore, dirty_ranges
+
+ALARM_COLOR = QColor("#F4B6B6")
+# Роль для сортировки по числу, а не по тексту
+SORT_ROLE = Qt.UserRole
+
+
+class ReadingsTableModel(QAbstractTableModel):
+    """Таблица последних показаний поверх SnapshotStore.
+
+    Столбец 0 — устройство, далее — параметры типов устройств. Ячейки не
+    хранятся объектами: data() читает массивы хранилища, а apply_readings()
+    сообщает виду только изменившиеся прямоугольники.
+    """
+
+    def __init__(self, config_cache=None, parent=None):
+        super().__init__(parent)
+        self.config_cache = config_cache
+        self.store = SnapshotStore()
+        # Ключи, которых нет и после перестройки (например, параметр выключен)
+        self._unknown = set()
+
+    # --- раскладка ---
+
+    def reload_layout(self):
+        """Строки и столбцы заново из кеша конфигурации."""
+        if self.config_cache is None:
+            return
+        devices = self.config_cache.get_enabled_devices()
+        parameters = {
+            type_id: self.config_cache.get_parameters(type_id)
+            for type_id in {d.device_type_id for d in devices}
+        }
+        self.set_layout(devices, parameters)
+
+    def set_layout(self, devices, parameters_by_type):
+        self._unknown.clear()
+        self.beginResetModel()
+        self.store.set_layout(devices, parameters_by_type)
+        self.endResetModel()
+
+    # --- обновления ---
+
+    def apply_readings(self, updates: dict):
+        """Пачка {(device_id, parameter_id): row} за кадр."""
+        rows, cols, missing = self.store.apply(updates)
+        if self.config_cache is not None and not self._unknown.issuperset(missing):
+            # Новое устройство или параметр — перестраиваем раскладку и
+            # дописываем то, что не легло
+            self.reload_layout()
+            _, _, still_missing = self.store.apply({key: updates[key] for key in missing})
+            self._unknown.update(still_missing)
+            return
+        for row0, row1, col0, col1 in dirty_ranges(rows, cols):
+            self.dataChanged.emit(
+                self.index(row0, col0 + 1), self.index(row1, col1 + 1),
+                [Qt.DisplayRole, Qt.BackgroundRole, SORT_ROLE],
+            )
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.store.shape[0]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.store.shape[1] + 1
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return "Датчик" if section == 0 else self.store.column_names[section - 1]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        if col == 0:
+            if role in (Qt.DisplayRole, SORT_ROLE):
+                return self.store.device_names[row]
+            return None
+
+        cell = (row, col - 1)
+        if role == Qt.DisplayRole:
+            value = self.store.values[cell]
+            return "---" if math.isnan(value) else f"{value:g}".replace(".", ",")
+        if role == SORT_ROLE:
+            value = float(self.store.values[cell])
+            return -math.inf if math.isnan(value) else value
+        if role == Qt.BackgroundRole and self.store.statuses[cell] == 1:
+            return ALARM_COLOR
+        return None
+
+
+def make_proxy(model: ReadingsTableModel, parent=None) -> QSortFilterProxyModel:
+    """Сортировка и фильтр по имени устройства без копирования данных:
+    прокси хранит только перестановку индексов."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    proxy.setFilterKeyColumn(0)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    proxy.setDynamicSortFilter(True)
+    return proxy
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+NO_STATUS = -1
+STATUS_CODES = {"OK": 0, "ALARM": 1}
+
+
+class SnapshotStore:
+    """Последние показания в виде столбцовых массивов.
+
+    Строка — устройство, столбец — параметр. Столбцы строятся по строкам
+    Parameter типов устройств; одноимённые параметры разных типов делят
+    столбец. Значения, статусы и время лежат в трёх плотных массивах
+    (строки × столбцы), так что модель Qt читает ячейку по индексам без
+    объектов на ячейку.
+    """
+
+    def __init__(self):
+        self.device_ids = np.empty(0, dtype=np.int64)
+        self.device_names: List[str] = []
+        self.column_names: List[str] = []
+        self.values = np.empty((0, 0))
+        self.statuses = np.empty((0, 0), dtype=np.int8)
+        self.timestamps = np.empty((0, 0))
+        self._row_of: Dict[int, int] = {}
+        self._cell_of: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def set_layout(self, devices: Iterable, parameters_by_type: Dict[int, list]) -> None:
+        """Перестраивает строки и столбцы; показания сохранившихся ячеек остаются."""
+        devices = sorted(devices, key=lambda d: d.name)
+        # Порядок столбцов — по типам устройств и порядку их параметров
+        columns: Dict[str, int] = {}
+        for type_id in sorted(parameters_by_type):
+            for param in parameters_by_type[type_id]:
+                columns.setdefault(param.name, len(columns))
+        cell_of = {}
+        for row, device in enumerate(devices):
+            for param in parameters_by_type.get(device.device_type_id, ()):
+                cell_of[(device.id, param.id)] = (row, columns[param.name])
+
+        values = np.full((len(devices), len(columns)), np.nan)
+        statuses = np.full(values.shape, NO_STATUS, dtype=np.int8)
+        timestamps = np.full(values.shape, np.nan)
+        for key, (row, col) in cell_of.items():
+            old = self._cell_of.get(key)
+            if old is not None:
+                values[row, col] = self.values[old]
+                statuses[row, col] = self.statuses[old]
+                timestamps[row, col] = self.timestamps[old]
+
+        self.device_ids = np.array([d.id for d in devices], dtype=np.int64)
+        self.device_names = [d.name for d in devices]
+        self.column_names = list(columns)
+        self.values, self.statuses, self.timestamps = values, statuses, timestamps
+        self._row_of = {d.id: row for row, d in enumerate(devices)}
+        self._cell_of = cell_of
+
+    def row_of(self, device_id: int):
+        return self._row_of.get(device_id)
+
+    def apply(self, updates: Dict[Tuple[int, int], tuple]):
+        """Записывает пачку {(device_id, parameter_id): (.., ts, value, status)}.
+
+        Возвращает (строки, столбцы) изменённых ячеек и список ключей,
+        которых нет в текущей раскладке.
+        """
+        rows, cols, missing = [], [], []
+        for key, (_, _, timestamp, value, status) in updates.items():
+            cell = self._cell_of.get(key)
+            if cell is None:
+                missing.append(key)
+                continue
+            rows.append(cell[0])
+            cols.append(cell[1])
+            self.values[cell] = value
+            self.statuses[cell] = STATUS_CODES.get(status, NO_STATUS)
+            self.timestamps[cell] = timestamp
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), missing
+
+
+def dirty_ranges(rows: np.ndarray, cols: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Изменённые ячейки → прямоугольники (row0, row1, col0, col1) по
+    подряд идущим строкам: на кадр — несколько сигналов dataChanged
+    вместо одного на ячейку или полной перерисовки."""
+    if not len(rows):
+        return []
+    order = np.argsort(rows, kind="stable")
+    rows, cols = rows[order], cols[order]
+    # Границы серий подряд идущих строк
+    breaks = np.flatnonzero(np.diff(rows) > 1) + 1
+    ranges = []
+    for run_rows, run_cols in zip(np.split(rows, breaks), np.split(cols, breaks)):
+        ranges.append((int(run_rows[0]), int(run_rows[-1]), int(run_cols.min()), int(run_cols.max())))
+    return ranges